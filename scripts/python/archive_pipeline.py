@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+archive_pipeline.py
+Parallel, pipelined archive writers for compressed vault backups
+
+Used by backup-vault.py --compress / --format. Compression runs on a thread
+pool (zlib, lzma and zstandard release the GIL) while a single writer thread
+appends finished pieces to the archive in their original order.
+
+- zip: each entry is read and deflated by a worker, then written as-is
+- tar.gz / tar.xz / tar.zst: the tar stream is cut into fixed-size blocks
+  that are compressed independently and concatenated. Concatenated gzip
+  members, xz streams and zstd frames are valid single archives, so the
+  output opens with tar, tarfile and the usual tools.
+
+Each entry is hashed as it is read for compression, so the backup's file
+manifest costs no extra pass over the data.
+
+tar.zst requires the optional 'zstandard' package.
+"""
+
+import io
+import os
+import lzma
+import zlib
+import queue
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from copy_engine import new_hasher
+
+FORMATS = ['zip', 'tar.gz', 'tar.xz', 'tar.zst']
+
+DEFAULT_LEVELS = {'zip': 6, 'tar.gz': 6, 'tar.xz': 6, 'tar.zst': 3}
+
+# Files above this size are streamed by the writer instead of buffered in memory
+LARGE_FILE_SIZE = 8 * 1024 * 1024
+
+# Uncompressed bytes of zip entries read or deflated but not yet written.
+# A buffered entry holds its data and its deflated copy while in flight, so
+# peak memory is about twice this, however many workers there are
+ZIP_PENDING_BYTES = 128 * 1024 * 1024
+
+# write_zip appends pre-deflated entries itself, since zipfile has no public
+# API for that. It relies on these ZipFile internals, which ZipFile.write and
+# ZipFile.close use the same way in CPython 3.8 to 3.13 (checked against each
+# of those releases): fp, filelist, NameToInfo, start_dir and _didModify,
+# plus ZipInfo._compresslevel (compress_level from 3.13, see
+# set_compress_level). If any is missing, every entry is written through
+# ZipFile.open() on the writer thread instead: slower, but still correct
+ZIPFILE_INTERNALS = ('fp', 'filelist', 'NameToInfo', 'start_dir', '_didModify')
+
+# Uncompressed tar data per independently compressed block
+TAR_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def get_zstandard():
+    """Import the optional zstandard module, or return None."""
+    try:
+        import zstandard
+    except ImportError:
+        print("❌ Error: 'zstandard' package required for tar.zst. Install: pip install zstandard")
+        return None
+    return zstandard
+
+
+class OrderedWriter:
+    """Writer thread that consumes queued items (usually futures) in submission order.
+
+    At most max_pending results are in flight, so memory stays bounded by
+    the number of workers rather than the size of the vault. With
+    max_pending_bytes, reserve(size) before starting the work for an item
+    waits until the sizes of the items in flight leave room for it (a
+    single item larger than the budget still goes through on its own); the
+    reservation is released once the item submitted with that size is written.
+    """
+
+    def __init__(self, write, max_pending: int, max_pending_bytes: Optional[int] = None):
+        self.write = write
+        self.pending: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.max_pending_bytes = max_pending_bytes
+        self.pending_bytes = 0
+        self.budget = threading.Condition()
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def reserve(self, size: int):
+        with self.budget:
+            self.budget.wait_for(lambda: self.error or not self.pending_bytes
+                                 or self.pending_bytes + size <= self.max_pending_bytes)
+            self.pending_bytes += size
+
+    def submit(self, item, size: int = 0):
+        """Queue an item; size is what was reserve()d for it."""
+        if self.error:
+            raise self.error
+        self.pending.put((item, size))
+
+    def run(self):
+        while True:
+            item, size = self.pending.get()
+            if item is None:
+                return
+            if not self.error:
+                try:
+                    self.write(item)
+                except BaseException as e:
+                    self.error = e
+            if size:
+                with self.budget:
+                    self.pending_bytes -= size
+                    self.budget.notify_all()
+
+    def close(self):
+        self.pending.put((None, 0))
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+
+class HashingReader:
+    """Read-only file wrapper that hashes everything read through it."""
+
+    def __init__(self, f):
+        self.f = f
+        self.hasher = new_hasher()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.f.read(size)
+        self.hasher.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+
+def set_compress_level(zinfo: zipfile.ZipInfo, level: int):
+    """Set a ZipInfo's deflate level for ZipFile.open(zinfo, 'w')."""
+    if hasattr(zinfo, 'compress_level'):
+        zinfo.compress_level = level
+    else:
+        zinfo._compresslevel = level
+
+
+def _deflate_file(path: Path, level: int) -> Tuple[bytes, int, int, str]:
+    """Read and raw-deflate a file; returns (compressed data, crc, size, content hash)."""
+    data = path.read_bytes()
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    hasher = new_hasher()
+    hasher.update(data)
+    return compressed, zlib.crc32(data), len(data), hasher.hexdigest()
+
+
+def write_zip(files: Iterable[Tuple[Path, str, int]], output: Path,
+              level: Optional[int] = None, jobs: Optional[int] = None,
+              record: Optional[Callable[[str, int, str], None]] = None) -> Dict:
+    """Write (path, arcname, size) files to a zip archive, deflating entries in parallel.
+
+    record(arcname, size, content hash) is called for each entry as it is
+    written, from the writer thread. Entries waiting to be written are
+    limited to ZIP_PENDING_BYTES, not just to a number of files.
+    """
+    level = DEFAULT_LEVELS['zip'] if level is None else level
+    jobs = jobs or default_jobs()
+    stats = {'files': 0, 'bytes_in': 0}
+
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as zipf, \
+            ThreadPoolExecutor(max_workers=jobs) as pool:
+        # Without the internals used below, every entry goes through zipf.open()
+        parallel = all(hasattr(zipf, name) for name in ZIPFILE_INTERNALS)
+
+        def write_entry(item):
+            path, arcname, future = item
+            if future is None:
+                # Stream large files, hashing them on the way in
+                zinfo = zipfile.ZipInfo.from_file(path, arcname)
+                zinfo.compress_type = zipfile.ZIP_DEFLATED
+                set_compress_level(zinfo, level)
+                with open(path, 'rb') as src, zipf.open(zinfo, 'w', force_zip64=True) as dest:
+                    reader = HashingReader(src)
+                    while True:
+                        block = reader.read(1024 * 1024)
+                        if not block:
+                            break
+                        dest.write(block)
+                if record is not None:
+                    record(arcname, zinfo.file_size, reader.hexdigest())
+                return
+
+            compressed, crc, size, digest = future.result()
+            zinfo = zipfile.ZipInfo.from_file(path, arcname)
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            zinfo.CRC = crc
+            zinfo.file_size = size
+            zinfo.compress_size = len(compressed)
+            zinfo.header_offset = zipf.fp.tell()
+
+            # zipfile has no public API for pre-compressed data, so append the
+            # entry the way ZipFile._open_to_write / _ZipWriteFile.close do and
+            # let close() write the central directory (see ZIPFILE_INTERNALS)
+            zipf.fp.write(zinfo.FileHeader())
+            zipf.fp.write(compressed)
+            zipf.filelist.append(zinfo)
+            zipf.NameToInfo[zinfo.filename] = zinfo
+            zipf.start_dir = zipf.fp.tell()
+            zipf._didModify = True
+            if record is not None:
+                record(arcname, size, digest)
+
+        deflate = partial(_deflate_file, level=level)
+        writer = OrderedWriter(write_entry, max_pending=jobs * 4, max_pending_bytes=ZIP_PENDING_BYTES)
+        try:
+            for path, arcname, size in files:
+                if size > LARGE_FILE_SIZE or not parallel:
+                    writer.submit((path, arcname, None))
+                else:
+                    # Reserve the budget before a worker reads the file in
+                    writer.reserve(size)
+                    writer.submit((path, arcname, pool.submit(deflate, path)), size)
+                stats['files'] += 1
+                stats['bytes_in'] += size
+
+                if stats['files'] % 100 == 0:
+                    print(f"  Added {stats['files']} files...", end='\r')
+        finally:
+            writer.close()
+
+    return stats
+
+
+def block_compressor(archive_format: str, level: int):
+    """Return a function compressing one block into a self-contained member."""
+    if archive_format == 'tar.gz':
+        def compress(block: bytes) -> bytes:
+            # wbits 31 = gzip container; each block is a complete gzip member
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            return compressor.compress(block) + compressor.flush()
+        return compress
+
+    if archive_format == 'tar.xz':
+        return lambda block: lzma.compress(block, format=lzma.FORMAT_XZ, preset=level)
+
+    if archive_format == 'tar.zst':
+        zstandard = get_zstandard()
+        if zstandard is None:
+            return None
+        local = threading.local()
+
+        def compress(block: bytes) -> bytes:
+            # ZstdCompressor instances are not thread-safe; keep one per worker
+            if not hasattr(local, 'compressor'):
+                local.compressor = zstandard.ZstdCompressor(level=level)
+            return local.compressor.compress(block)
+        return compress
+
+    raise ValueError(f"Unknown archive format: {archive_format}")
+
+
+class BlockSink(io.RawIOBase):
+    """File-like target for tarfile that hands fixed-size blocks to a callback."""
+
+    def __init__(self, emit, block_size: int = TAR_BLOCK_SIZE):
+        self.emit = emit
+        self.block_size = block_size
+        self.buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self.emit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def flush_remaining(self):
+        if self.buffer:
+            self.emit(bytes(self.buffer))
+            self.buffer.clear()
+
+
+def write_tar(files: Iterable[Tuple[Path, str, int]], output: Path, archive_format: str,
+              level: Optional[int] = None, jobs: Optional[int] = None,
+              record: Optional[Callable[[str, int, str], None]] = None) -> Optional[Dict]:
+    """Write (path, arcname, size) files to a compressed tar, compressing blocks in parallel.
+
+    record(arcname, size, content hash) is called for each member as it is added.
+    """
+    level = DEFAULT_LEVELS[archive_format] if level is None else level
+    jobs = jobs or default_jobs()
+    compress = block_compressor(archive_format, level)
+    if compress is None:
+        return None
+
+    stats = {'files': 0, 'bytes_in': 0}
+
+    with open(output, 'wb') as out, ThreadPoolExecutor(max_workers=jobs) as pool:
+        writer = OrderedWriter(lambda future: out.write(future.result()), max_pending=jobs * 2)
+        sink = BlockSink(lambda block: writer.submit(pool.submit(compress, block)))
+        try:
+            with tarfile.open(fileobj=sink, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+                for path, arcname, size in files:
+                    tarinfo = tar.gettarinfo(str(path), arcname)
+                    with open(path, 'rb') as f:
+                        reader = HashingReader(f)
+                        tar.addfile(tarinfo, reader)
+                    if record is not None:
+                        record(arcname, tarinfo.size, reader.hexdigest())
+                    stats['files'] += 1
+                    stats['bytes_in'] += size
+
+                    if stats['files'] % 100 == 0:
+                        print(f"  Added {stats['files']} files...", end='\r')
+            sink.flush_remaining()
+        finally:
+            writer.close()
+
+    return stats
+
+
+def open_tar(path: Path):
+    """Open a compressed tar backup for streaming reads."""
+    name = Path(path).name
+    if name.endswith('.tar.zst'):
+        zstandard = get_zstandard()
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        raw = open(path, 'rb')
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        return tarfile.open(fileobj=stream, mode='r|')
+    return tarfile.open(path, mode='r:*')
+
+
+def archive_format_of(path: Path) -> Optional[str]:
+    """Return the archive format of a backup file name, if it is an archive."""
+    name = Path(path).name
+    for archive_format in FORMATS:
+        if name.endswith('.' + archive_format):
+            return archive_format
+    return None
+
+
+def verify_tar(path: Path) -> bool:
+    """Read every member of a compressed tar, checking the codec's checksums."""
+    try:
+        with open_tar(path) as tar:
+            for member in tar:
+                if member.isfile():
+                    f = tar.extractfile(member)
+                    while f.read(1024 * 1024):
+                        pass
+        return True
+    except Exception as e:
+        print(f"❌ Error verifying archive: {e}")
+        return False
@@ -6,36 +6,81 @@ Automated backup system for Obsidian vaults
 Usage:
     python backup-vault.py --vault /path/to/vault --destination ~/Backups/
     python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --compress
+    python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --format tar.zst --compression-level 10
+    python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --type incremental
     python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --retention 30
+    python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --watch --debounce 10
+    python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --list
+    python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --rebuild-catalog
+    python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --verify --sample 500
+    python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --type dedup
+    python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --restore --target ~/restored
+    python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --restore --target ~/restored \
+        --as-of 2024-03-01 --paths 'Projects/' 'Daily/2024-02-*.md'
+    python backup-vault.py --vault /path/to/vault --destination ~/Backups/ --exclude-from .backupignore
 
 Features:
 - Full vault backup
-- Incremental backups
-- Compression (zip/tar.gz)
+- Incremental backups, diffed against a snapshot of the vault taken with the
+  base backup (renames and deletions detected without reading the base)
+- Deduplicated backups (content-defined chunks, see dedup_store.py)
+- Compression (zip/tar.gz/tar.xz/tar.zst), parallel across CPU cores
+- Parallel, zero-copy file copying for directory backups (--jobs)
 - Retention policy
-- Backup verification
-- Exclude patterns
+- Backup catalog at the destination root, so --list and retention never rescan backups
+- Backup verification against per-file content hashes, in parallel (--verify)
+- Restore of the whole vault, folders or globs from any backup, optionally as
+  of a point in time, reading only the selected files (--restore)
+- Exclude patterns (.gitignore syntax, including '!' negation)
+- Watch mode: continuous incremental/dedup backups driven by inotify (polling
+  elsewhere), re-indexing only the changed paths, with periodic full sweeps
 """
 
 import argparse
-import shutil
+import os
+import time
 import zipfile
-import tarfile
 import hashlib
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Set
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 import json
 
+import archive_pipeline
+import backup_restore
+import backup_verify
+import copy_engine
+from backup_catalog import BackupCatalog
+from dedup_store import DedupStore
+from exclude_matcher import ExcludeMatcher, read_exclude_file
+from source_snapshot import SNAPSHOT_SUFFIX, SourceSnapshot
+from vault_watcher import DEFAULT_POLL_INTERVAL, InotifyWatcher, open_watcher
+from vault_index import IndexEntry, VaultIndex
+
+
+# Per-file manifest written next to each directory backup
+FILES_MANIFEST_SUFFIX = '_files.json'
+FILES_MANIFEST_VERSION = 1
+
+# Watch mode: a steady stream of changes is backed up after at most
+# this many debounce windows, even if the vault never goes quiet
+WATCH_MAX_DELAY_WINDOWS = 10
+
+# Files written next to a backup (not backups themselves)
+SIDECAR_SUFFIXES = ('_metadata.json', FILES_MANIFEST_SUFFIX, SNAPSHOT_SUFFIX)
+
 
 class VaultBackup:
-    def __init__(self, vault_path: str, destination: str):
+    def __init__(self, vault_path: str, destination: str, index_path: str = None,
+                 jobs: int = None):
         self.vault_path = Path(vault_path).resolve()
         self.destination = Path(destination).resolve()
         self.destination.mkdir(parents=True, exist_ok=True)
+        self.index = VaultIndex(str(self.vault_path), index_path)
+        self.jobs = jobs or archive_pipeline.default_jobs()
         
-        # Default exclusions
-        self.exclude_patterns = {
+        # Default exclusions (.gitignore syntax; order matters for '!' patterns)
+        self.exclude_patterns = [
             '.obsidian/workspace*',
             '.obsidian/cache',
             '.trash',
@@ -43,21 +88,35 @@ class VaultBackup:
             'Thumbs.db',
             '*.tmp',
             '__pycache__',
-        }
+        ]
+        self._exclude_matcher = None
+        self.catalog = BackupCatalog(self.destination)
         
     def create_backup(self, compress: bool = False, 
                      backup_type: str = 'full',
-                     incremental_base: str = None) -> str:
+                     incremental_base: str = None,
+                     archive_format: str = 'zip',
+                     compression_level: int = None) -> str:
         """Create a backup of the vault."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         vault_name = self.vault_path.name
         
-        if compress:
-            backup_name = f"{vault_name}_backup_{timestamp}.zip"
+        if backup_type == 'dedup':
+            backup_name = f"{vault_name}_backup_{timestamp}.dedup"
+            backup_path = self.destination / backup_name
+            
+            print(f"🧩 Creating deduplicated backup: {backup_name}")
+            stats = self.create_dedup_backup(backup_path, timestamp, incremental_base)
+            
+        elif compress:
+            backup_name = f"{vault_name}_backup_{timestamp}.{archive_format}"
             backup_path = self.destination / backup_name
             
             print(f"🗜️  Creating compressed backup: {backup_name}")
-            self.create_zip_backup(backup_path)
+            stats = self.create_archive_backup(backup_path, archive_format, compression_level)
+            if not stats:
+                print(f"❌ Backup failed!")
+                return None
             
         else:
             backup_name = f"{vault_name}_backup_{timestamp}"
@@ -65,13 +124,17 @@ class VaultBackup:
             
             print(f"📦 Creating backup: {backup_name}")
             
+            if backup_type == 'incremental':
+                incremental_base = incremental_base or self.latest_snapshot_base()
             if backup_type == 'incremental' and incremental_base:
-                self.create_incremental_backup(backup_path, incremental_base)
+                stats = self.create_incremental_backup(backup_path, incremental_base)
             else:
-                self.create_full_backup(backup_path)
+                stats = self.create_full_backup(backup_path)
         
-        # Create backup metadata
-        self.create_backup_metadata(backup_path, backup_type, timestamp)
+        # Create backup metadata and record the backup in the catalog
+        metadata = self.create_backup_metadata(backup_path, backup_type, timestamp, stats)
+        self.catalog.add(dict(metadata, name=backup_path.name))
+        self.write_source_snapshot(backup_path, stats.get('manifest'))
         
         # Verify backup
         if self.verify_backup(backup_path):
@@ -81,30 +144,83 @@ class VaultBackup:
             print(f"❌ Backup verification failed!")
             return None
     
-    def create_full_backup(self, backup_path: Path):
-        """Create a full backup by copying all files."""
-        backup_path.mkdir(parents=True, exist_ok=True)
-        
-        files_copied = 0
-        total_size = 0
-        
-        for item in self.vault_path.rglob('*'):
-            if item.is_file() and not self.should_exclude(item):
-                relative_path = item.relative_to(self.vault_path)
-                dest_path = backup_path / relative_path
-                
-                dest_path.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(item, dest_path)
+    def watch(self, backup_type: str = 'incremental', debounce: float = 5.0,
+              sweep_interval: float = 3600.0, poll_interval: float = DEFAULT_POLL_INTERVAL,
+              polling: bool = False, retention_days: int = None):
+        """Back up continuously as the vault changes, until interrupted.
+        
+        Change events are collected until the vault has been quiet for
+        debounce seconds; only those paths are re-indexed before the next
+        incremental (or dedup) backup, so nothing is rescanned. Every
+        sweep_interval seconds, and whenever events were lost, the whole
+        vault is re-walked to catch anything the watcher missed.
+        """
+        if backup_type == 'full':
+            backup_type = 'incremental'
+        # Backup names have one-second resolution
+        debounce = max(debounce, 1.0)
+        matcher = self.exclude_matcher
+        self.index.ensure_fresh(skip_dir=matcher.excludes_dir)
+        
+        watcher = open_watcher(self.vault_path, lambda: self.index.walk(matcher.excludes_dir),
+                               matcher.excludes_dir, poll_interval, polling)
+        method = 'inotify' if isinstance(watcher, InotifyWatcher) else 'polling'
+        print(f"👀 Watching {self.vault_path} ({method}, debounce {debounce:g}s, "
+              f"full sweep every {sweep_interval:g}s). Press Ctrl+C to stop.\n")
+        
+        def backup():
+            if self.create_backup(backup_type=backup_type) and retention_days:
+                self.apply_retention_policy(retention_days)
+            print()
+        
+        backup()
+        pending: Set[str] = set()
+        first_change = 0.0
+        last_sweep = time.monotonic()
+        
+        try:
+            while True:
+                now = time.monotonic()
+                timeout = debounce if pending else max(last_sweep + sweep_interval - now, 0)
+                changed = {path for path in watcher.wait(timeout) if not matcher.is_excluded(path)}
+                now = time.monotonic()
                 
-                files_copied += 1
-                total_size += item.stat().st_size
+                if changed:
+                    if not pending:
+                        first_change = now
+                    pending |= changed
+                    if now - first_change < debounce * WATCH_MAX_DELAY_WINDOWS:
+                        continue
                 
-                if files_copied % 100 == 0:
-                    print(f"  Copied {files_copied} files...", end='\r')
-        
-        print(f"\n  📁 Copied {files_copied} files ({self.format_size(total_size)})")
+                if watcher.overflowed or now - last_sweep >= sweep_interval:
+                    print("🧹 Full consistency sweep")
+                    watcher.overflowed = False
+                    pending.clear()
+                    last_sweep = now
+                    before = self.vault_state()
+                    self.index.refresh(skip_dir=matcher.excludes_dir)
+                    if self.vault_state() != before:
+                        backup()
+                elif pending:
+                    updated, removed = self.index.update_paths(pending)
+                    pending.clear()
+                    if updated or removed:
+                        print(f"🔔 {len(updated)} changed, {len(removed)} removed")
+                        backup()
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+        finally:
+            watcher.close()
     
-    def create_incremental_backup(self, backup_path: Path, base_backup: str):
+    def vault_state(self) -> Dict[str, Tuple[int, int, int]]:
+        """(size, mtime_ns, inode) of every file that would be backed up, from the index."""
+        return {entry.path: (entry.size, entry.mtime_ns, entry.inode) for _, entry in self.iter_vault_files()}
+    
+    def create_full_backup(self, backup_path: Path) -> Dict:
+        """Create a full backup by copying all files."""
+        return self.copy_vault_files(backup_path)
+    
+    def create_incremental_backup(self, backup_path: Path, base_backup: str) -> Dict:
         """Create incremental backup (only changed files)."""
         base_path = Path(base_backup)
         
@@ -112,99 +228,326 @@ class VaultBackup:
             print(f"⚠️  Base backup not found, creating full backup instead")
             return self.create_full_backup(backup_path)
         
+        return self.copy_vault_files(backup_path, base_path)
+    
+    def copy_vault_files(self, backup_path: Path, base_path: Path = None) -> Dict:
+        """Copy the vault into a directory backup, hard-linking files unchanged since base_path.
+        
+        Source stat data comes from the vault index walk and hashes are
+        computed while copying, so the per-file manifest and the metadata
+        totals need no second pass over the vault or the backup. Changes
+        since base_path are taken from its source snapshot when it has one.
+        """
         backup_path.mkdir(parents=True, exist_ok=True)
+        vault_files = list(self.iter_vault_files())
+        
+        unchanged = None
+        base_hashes = None
+        renamed = None
+        changes = None
+        snapshot = SourceSnapshot.load(base_path) if base_path is not None else None
+        if snapshot is not None:
+            diff = snapshot.diff((entry for _, entry in vault_files),
+                                 lambda path: copy_engine.hash_file(self.vault_path / path))
+            linkable = set(diff.unchanged).union(diff.renamed)
+            
+            def unchanged(relative_path: str, size: int, mtime_ns: int) -> bool:
+                return relative_path in linkable
+            snapshot_hashes = snapshot.hashes()
+            base_hashes = {path: snapshot_hashes[path] for path in diff.unchanged if path in snapshot_hashes}
+            base_hashes.update((path, snapshot_hashes[old]) for path, old in diff.renamed.items()
+                               if old in snapshot_hashes)
+            renamed = diff.renamed
+            changes = diff.counts()
+            print(f"  🔎 Since {base_path.name}: {changes['added']} added, {changes['modified']} modified, "
+                  f"{changes['renamed']} renamed, {changes['deleted']} deleted")
+        elif base_path is not None:
+            base_files = self.load_files_manifest(base_path)
+            if base_files is not None:
+                # Decide from the base manifest instead of stat()ing every base file
+                def unchanged(relative_path: str, size: int, mtime_ns: int) -> bool:
+                    info = base_files.get(relative_path)
+                    return (info is not None and info['size'] == size
+                            and abs(info['mtime_ns'] - mtime_ns) <= copy_engine.MTIME_TOLERANCE_NS)
+                base_hashes = {path: info['hash'] for path, info in base_files.items()}
+        
+        files = {}
+        
+        def record(relative_path: str, size: int, mtime_ns: int, digest: str):
+            files[relative_path] = {'size': size, 'mtime_ns': mtime_ns, 'hash': digest}
+        
+        tasks = (
+            (item, entry.path, entry.size, entry.mtime_ns)
+            for item, entry in vault_files
+        )
+        stats = copy_engine.copy_files(tasks, backup_path, self.jobs, base=base_path, unchanged=unchanged,
+                                       base_hashes=base_hashes, record=record, renamed=renamed)
         
-        files_copied = 0
-        files_skipped = 0
+        if base_path is None:
+            print(f"\n  📁 Copied {stats['copied']} files ({self.format_size(stats['bytes_copied'])})")
+        else:
+            print(f"\n  📁 Copied {stats['copied']} new/changed files, linked {stats['linked']} unchanged")
+        self.print_copy_throughput(stats)
+        
+        self.write_files_manifest(backup_path, files)
+        stats['total_size'] = stats['bytes_copied'] + stats['bytes_linked']
+        stats['logical_size'] = stats['total_size']
+        # Linked files share the base backup's data
+        stats['disk_size'] = stats['bytes_copied']
+        stats['base'] = base_path.name if base_path is not None else None
+        stats['changes'] = changes
+        stats['manifest'] = files
+        return stats
+    
+    def files_manifest_path(self, backup_path: Path) -> Path:
+        return backup_path.parent / f"{backup_path.name}{FILES_MANIFEST_SUFFIX}"
+    
+    def write_files_manifest(self, backup_path: Path, files: Dict[str, Dict]):
+        """Write the per-file size, mtime and content hash manifest of a backup."""
+        manifest = {'version': FILES_MANIFEST_VERSION, 'hash': 'blake2b-128', 'files': files}
+        self.files_manifest_path(backup_path).write_text(json.dumps(manifest, separators=(',', ':')))
+    
+    def load_files_manifest(self, backup_path: Path) -> Optional[Dict[str, Dict]]:
+        """Per-file manifest of a backup, or None for backups made without one."""
+        manifest_file = self.files_manifest_path(backup_path)
+        try:
+            manifest = json.loads(manifest_file.read_text())
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != FILES_MANIFEST_VERSION:
+            return None
+        return manifest['files']
+    
+    def write_source_snapshot(self, backup_path: Path, manifest: Dict[str, Dict] = None):
+        """Record the vault files this backup was taken from, for the next incremental backup."""
+        entries = (entry for _, entry in self.iter_vault_files())
+        SourceSnapshot.from_entries(backup_path.name, entries, manifest).save(backup_path)
+    
+    def latest_snapshot_base(self) -> Optional[str]:
+        """Newest directory backup of this vault that has a source snapshot, if any."""
+        self.ensure_catalog()
+        for record in self.catalog.backups(self.vault_path.name):
+            path = self.destination / record['name']
+            if path.is_dir() and SourceSnapshot.path_for(path).exists():
+                print(f"  Base backup: {path.name}")
+                return str(path)
+        return None
+    
+    def print_copy_throughput(self, stats: Dict):
+        elapsed = max(stats['elapsed'], 1e-6)
+        print(f"  ⚡ Throughput: {stats['bytes_copied'] / elapsed / (1024 * 1024):.1f} MB/s, "
+              f"{stats['files'] / elapsed:.0f} files/s on {self.jobs} threads")
+    
+    def create_dedup_backup(self, backup_path: Path, timestamp: str, base_manifest: str = None) -> Dict:
+        """Create a deduplicated backup: new chunks go to the store, plus a manifest."""
+        store = self.get_dedup_store()
+        
+        previous = None
+        base_path = Path(base_manifest) if base_manifest else self.latest_dedup_manifest()
+        if base_path and base_path.suffix == '.dedup' and base_path.exists():
+            previous = store.load_manifest(base_path)
+            print(f"  Base manifest: {base_path.name}")
+        
+        files = (
+            (item, entry.path, entry.size, entry.mtime_ns)
+            for item, entry in self.iter_vault_files()
+        )
+        stats = store.backup(files, backup_path, previous, metadata={
+            'timestamp': timestamp,
+            'vault_path': str(self.vault_path),
+        })
         
-        for item in self.vault_path.rglob('*'):
-            if item.is_file() and not self.should_exclude(item):
-                relative_path = item.relative_to(self.vault_path)
-                dest_path = backup_path / relative_path
-                base_file = base_path / relative_path
-                
-                # Check if file changed
-                if self.file_changed(item, base_file):
-                    dest_path.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(item, dest_path)
-                    files_copied += 1
-                else:
-                    # Create hardlink to save space
-                    dest_path.parent.mkdir(parents=True, exist_ok=True)
-                    if base_file.exists():
-                        try:
-                            dest_path.hardlink_to(base_file)
-                            files_skipped += 1
-                        except:
-                            shutil.copy2(item, dest_path)
-                            files_copied += 1
-                
-                if (files_copied + files_skipped) % 100 == 0:
-                    print(f"  Processed {files_copied + files_skipped} files...", end='\r')
+        print(f"\n  🧩 {stats['files']} files ({self.format_size(stats['total_size'])}), "
+              f"{stats['reused']} unchanged")
+        print(f"  💾 Wrote {stats['chunks_written']} new chunks ({self.format_size(stats['bytes_written'])})")
         
-        print(f"\n  📁 Copied {files_copied} new/changed files, linked {files_skipped} unchanged")
+        stats['logical_size'] = stats['total_size']
+        stats['disk_size'] = stats['bytes_written'] + backup_path.stat().st_size
+        stats['base'] = base_path.name if previous else None
+        return stats
     
-    def create_zip_backup(self, backup_path: Path):
+    def get_dedup_store(self) -> DedupStore:
+        return DedupStore(self.destination / f"{self.vault_path.name}_dedup_store")
+    
+    def latest_dedup_manifest(self) -> Path:
+        """Most recent dedup manifest for this vault, if any."""
+        manifests = sorted(self.destination.glob(f"{self.vault_path.name}_backup_*.dedup"))
+        return manifests[-1] if manifests else None
+    
+    def restore_dedup_backup(self, manifest_path: Path, target: Path, paths: List[str] = None) -> int:
+        """Rebuild files from a dedup manifest into target."""
+        return self.get_dedup_store().restore(manifest_path, target, paths, self.jobs)
+    
+    def create_zip_backup(self, backup_path: Path, compression_level: int = None) -> Optional[Dict]:
         """Create compressed zip backup."""
-        files_added = 0
+        return self.create_archive_backup(backup_path, 'zip', compression_level)
+    
+    def create_archive_backup(self, backup_path: Path, archive_format: str = 'zip',
+                              compression_level: int = None) -> Optional[Dict]:
+        """Create a compressed zip or tar backup, compressing on self.jobs threads.
         
-        with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for item in self.vault_path.rglob('*'):
-                if item.is_file() and not self.should_exclude(item):
-                    arcname = item.relative_to(self.vault_path)
-                    zipf.write(item, arcname)
-                    files_added += 1
-                    
-                    if files_added % 100 == 0:
-                        print(f"  Added {files_added} files...", end='\r')
+        Returns the archive stats, or None if the archive could not be written.
+        """
+        # iter_vault_files refreshes the index, pruning excluded directories;
+        # entries are hashed by the archive writers as they compress them
+        manifest = {}
+        mtimes = {}
         
-        print(f"\n  📦 Compressed {files_added} files")
-        print(f"  💾 Backup size: {self.format_size(backup_path.stat().st_size)}")
-    
-    def should_exclude(self, path: Path) -> bool:
-        """Check if path should be excluded from backup."""
-        relative_path = str(path.relative_to(self.vault_path))
+        def files():
+            for item, entry in self.iter_vault_files():
+                mtimes[entry.path] = entry.mtime_ns
+                yield item, entry.path, entry.size
         
-        for pattern in self.exclude_patterns:
-            if Path(relative_path).match(pattern):
-                return True
+        def record(arcname: str, size: int, digest: str):
+            manifest[arcname] = {'size': size, 'mtime_ns': mtimes[arcname], 'hash': digest}
         
-        return False
-    
-    def file_changed(self, file1: Path, file2: Path) -> bool:
-        """Check if file has changed (by modification time and size)."""
-        if not file2.exists():
-            return True
+        start = time.perf_counter()
         
-        stat1 = file1.stat()
-        stat2 = file2.stat()
+        if archive_format == 'zip':
+            stats = archive_pipeline.write_zip(files(), backup_path, compression_level, self.jobs, record)
+        else:
+            stats = archive_pipeline.write_tar(files(), backup_path, archive_format,
+                                               compression_level, self.jobs, record)
         
-        # Compare size and modification time
-        if stat1.st_size != stat2.st_size:
-            return True
+        if stats is None:
+            backup_path.unlink(missing_ok=True)
+            return None
         
-        if abs(stat1.st_mtime - stat2.st_mtime) > 1:  # 1 second tolerance
-            return True
+        self.write_files_manifest(backup_path, manifest)
+        stats['manifest'] = manifest
         
-        return False
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        archive_size = backup_path.stat().st_size
+        ratio = archive_size / stats['bytes_in'] if stats['bytes_in'] else 0
+        
+        print(f"\n  📦 Compressed {stats['files']} files ({self.format_size(stats['bytes_in'])})")
+        print(f"  💾 Backup size: {self.format_size(archive_size)} ({ratio:.0%} of original)")
+        print(f"  ⚡ Throughput: {stats['bytes_in'] / elapsed / (1024 * 1024):.1f} MB/s "
+              f"on {self.jobs} threads")
+        
+        stats['total_size'] = archive_size
+        stats['logical_size'] = stats['bytes_in']
+        stats['disk_size'] = archive_size
+        return stats
+    
+    def iter_vault_files(self) -> Iterator[Tuple[Path, IndexEntry]]:
+        """Yield (path, index entry) for every vault file not excluded from backup."""
+        matcher = self.exclude_matcher
+        # Excluded directories are pruned from the walk instead of filtered afterwards
+        self.index.ensure_fresh(skip_dir=matcher.excludes_dir)
+        
+        for entry in self.index.files():
+            if not matcher.is_excluded(entry.path):
+                yield self.vault_path / entry.path, entry
+    
+    @property
+    def exclude_matcher(self) -> ExcludeMatcher:
+        """Matcher compiled from exclude_patterns, rebuilt when the patterns change."""
+        if self._exclude_matcher is None or self._exclude_matcher.patterns != list(self.exclude_patterns):
+            self._exclude_matcher = ExcludeMatcher(self.exclude_patterns)
+        return self._exclude_matcher
+    
+    def should_exclude(self, path: Path) -> bool:
+        """Check if path should be excluded from backup."""
+        return self.exclude_matcher.is_excluded(str(path.relative_to(self.vault_path)))
     
-    def create_backup_metadata(self, backup_path: Path, backup_type: str, timestamp: str):
-        """Create metadata file for backup."""
+    def create_backup_metadata(self, backup_path: Path, backup_type: str, timestamp: str,
+                               stats: Dict = None) -> Dict:
+        """Create metadata file for backup.
+        
+        Totals come from the stats gathered while the backup was written;
+        without them the finished backup is scanned.
+        """
+        if stats is None:
+            if backup_path.suffix == '.dedup':
+                files = DedupStore.load_manifest(backup_path)['files']
+                files_count = len(files)
+                total_size = sum(info['size'] for info in files.values())
+            else:
+                files_count = self.count_files(backup_path)
+                total_size = self.get_directory_size(backup_path)
+            stats = {'files': files_count, 'total_size': total_size,
+                     'logical_size': total_size, 'disk_size': total_size}
+        
         metadata = {
             'timestamp': timestamp,
             'backup_type': backup_type,
             'vault_path': str(self.vault_path),
             'vault_name': self.vault_path.name,
             'created': datetime.now().isoformat(),
-            'files_count': self.count_files(backup_path),
-            'total_size': self.get_directory_size(backup_path),
+            'files_count': stats['files'],
+            'total_size': stats['total_size'],
+            'logical_size': stats['logical_size'],
+            'disk_size': stats['disk_size'],
+            'base': stats.get('base'),
         }
+        if stats.get('changes'):
+            metadata['changes'] = stats['changes']
         
         metadata_file = backup_path.parent / f"{backup_path.name}_metadata.json"
         metadata_file.write_text(json.dumps(metadata, indent=2))
+        return metadata
     
     def verify_backup(self, backup_path: Path) -> bool:
-        """Verify backup integrity."""
+        """Verify backup integrity right after it was written.
+        
+        Archives are fully re-read against their file manifest (in parallel
+        for zip); directory backups only get a structural check, use
+        verify_backup_contents for a full re-hash.
+        """
+        if backup_path.suffix == '.zip' or archive_pipeline.archive_format_of(backup_path):
+            return self.verify_backup_contents(backup_path)
+        elif backup_path.suffix == '.dedup':
+            try:
+                missing = self.get_dedup_store().missing_chunks(DedupStore.load_manifest(backup_path))
+            except Exception as e:
+                print(f"❌ Error verifying manifest: {e}")
+                return False
+            if missing:
+                print(f"⚠️  {len(missing)} chunks missing from the dedup store")
+                return False
+            return True
+        else:
+            # For directory backups, just check if it exists and has files
+            return backup_path.exists() and any(item.is_file() for item in backup_path.rglob('*'))
+    
+    def verify_backup_contents(self, backup_path: Path, sample: int = None) -> bool:
+        """Re-hash a backup (or a random sample of sample files) against its file manifest."""
+        start = time.perf_counter()
+        
+        try:
+            if backup_path.suffix == '.dedup':
+                files = backup_verify.sample_files(DedupStore.load_manifest(backup_path)['files'], sample)
+                checked, failures = backup_verify.verify_dedup(self.get_dedup_store(), files, self.jobs)
+            else:
+                manifest = self.load_files_manifest(backup_path)
+                if manifest is None:
+                    return self.verify_without_manifest(backup_path)
+                
+                files = backup_verify.sample_files(manifest, sample)
+                if backup_path.is_dir():
+                    checked, failures = backup_verify.verify_directory(backup_path, files, self.jobs)
+                elif backup_path.suffix == '.zip':
+                    checked, failures = backup_verify.verify_zip(backup_path, files, self.jobs)
+                else:
+                    checked, failures = backup_verify.verify_tar(backup_path, files)
+        except Exception as e:
+            print(f"❌ Error verifying {backup_path.name}: {e}")
+            return False
+        
+        elapsed = time.perf_counter() - start
+        scope = f"sample of {checked}" if sample is not None else f"{checked}"
+        print(f"  🔍 Verified {scope} files in {elapsed:.1f}s on {self.jobs} threads")
+        
+        for path, problem in failures[:20]:
+            print(f"⚠️  {path}: {problem}")
+        if len(failures) > 20:
+            print(f"⚠️  ... and {len(failures) - 20} more")
+        return not failures
+    
+    def verify_without_manifest(self, backup_path: Path) -> bool:
+        """Fallback for backups written before file manifests existed."""
+        print(f"⚠️  No file manifest for {backup_path.name}, falling back to a basic check")
         if backup_path.suffix == '.zip':
             try:
                 with zipfile.ZipFile(backup_path, 'r') as zipf:
@@ -216,76 +559,243 @@ class VaultBackup:
             except Exception as e:
                 print(f"❌ Error verifying zip: {e}")
                 return False
-        else:
-            # For directory backups, just check if it exists and has files
-            return backup_path.exists() and self.count_files(backup_path) > 0
+        elif archive_pipeline.archive_format_of(backup_path):
+            return archive_pipeline.verify_tar(backup_path)
+        return backup_path.exists() and any(item.is_file() for item in backup_path.rglob('*'))
+    
+    def find_backup(self, as_of: str = None) -> Optional[Path]:
+        """Newest backup of this vault, or the newest taken at or before as_of (YYYYMMDD_HHMMSS)."""
+        self.ensure_catalog()
+        for record in self.catalog.backups(self.vault_path.name):
+            if as_of is None or record['timestamp'] <= as_of:
+                return self.destination / record['name']
+        return None
+    
+    def resolve_backup(self, name: str) -> Path:
+        """A backup given on the command line: a path, or a name as --list prints it."""
+        path = Path(name)
+        if not path.exists() and (self.destination / name).exists():
+            path = self.destination / name
+        return path.resolve()
+    
+    def restore_backup(self, backup_path: Path, target: Path, patterns: List[str] = None,
+                       overwrite: bool = False) -> bool:
+        """Restore the files matching patterns (.gitignore syntax; all files if none) into target."""
+        target = Path(target).resolve()
+        target.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        
+        try:
+            if archive_pipeline.archive_format_of(backup_path) and backup_path.suffix != '.zip':
+                # A tar can only be read front to back: select members while streaming
+                files = self.load_files_manifest(backup_path)
+                names = list(backup_restore.select_files(files, patterns)) if files is not None else None
+                restored, restored_bytes = backup_restore.restore_tar(backup_path, target, patterns,
+                                                                      overwrite, names)
+            else:
+                if backup_path.suffix == '.dedup':
+                    files = DedupStore.load_manifest(backup_path)['files']
+                elif backup_path.suffix == '.zip':
+                    files = self.load_files_manifest(backup_path) or backup_restore.zip_files(backup_path)
+                else:
+                    files = self.load_files_manifest(backup_path) or backup_restore.directory_files(backup_path)
+                
+                files = backup_restore.select_files(files, patterns)
+                if not files:
+                    print("⚠️  No files in the backup match the selection")
+                    return False
+                existing = backup_restore.conflicts(target, files)
+                if existing and not overwrite:
+                    print(f"❌ {len(existing)} selected files already exist in {target} "
+                          f"(e.g. {existing[0]}); use --overwrite to replace them")
+                    return False
+                
+                if backup_path.suffix == '.dedup':
+                    for path in files:
+                        backup_restore.target_path(target, path)
+                    restored = self.restore_dedup_backup(backup_path, target, list(files))
+                    restored_bytes = sum(info['size'] for info in files.values())
+                elif backup_path.suffix == '.zip':
+                    restored, restored_bytes = backup_restore.restore_zip(backup_path, files, target, self.jobs)
+                else:
+                    restored, restored_bytes = backup_restore.restore_directory(backup_path, files, target,
+                                                                               self.jobs)
+        except (OSError, ValueError, zipfile.BadZipFile, KeyError) as e:
+            print(f"❌ Restore failed: {e}")
+            return False
+        
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        print(f"\n  ♻️  Restored {restored} files ({self.format_size(restored_bytes)}) to {target}")
+        print(f"  ⚡ Throughput: {restored_bytes / elapsed / (1024 * 1024):.1f} MB/s on {self.jobs} threads")
+        return True
     
     def apply_retention_policy(self, days: int):
         """Delete backups older than specified days."""
         print(f"\n🗑️  Applying retention policy ({days} days)...")
         
-        cutoff_date = datetime.now() - timedelta(days=days)
-        deleted_count = 0
+        cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y%m%d_%H%M%S")
+        self.ensure_catalog()
+        expired = self.catalog.backups(self.vault_path.name, older_than=cutoff)
+        
+        deleted = []
         freed_space = 0
         
-        for backup in self.destination.iterdir():
-            if not backup.name.startswith(self.vault_path.name):
-                continue
-            
-            # Get backup timestamp
+        for record in expired:
+            backup = self.destination / record['name']
             try:
-                timestamp_str = backup.name.split('_backup_')[1].split('.')[0]
-                backup_date = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                
-                if backup_date < cutoff_date:
-                    size = self.get_directory_size(backup) if backup.is_dir() else backup.stat().st_size
-                    
-                    if backup.is_dir():
-                        shutil.rmtree(backup)
-                    else:
-                        backup.unlink()
-                    
-                    # Delete metadata if exists
-                    metadata_file = backup.parent / f"{backup.name}_metadata.json"
-                    if metadata_file.exists():
-                        metadata_file.unlink()
-                    
-                    deleted_count += 1
-                    freed_space += size
-                    
-                    print(f"  Deleted: {backup.name}")
-            except:
+                freed_space += self.delete_backup(backup)
+            except OSError as e:
+                print(f"⚠️  Could not delete {backup.name}: {e}")
                 continue
-        
-        if deleted_count > 0:
-            print(f"✅ Deleted {deleted_count} old backups, freed {self.format_size(freed_space)}")
+            deleted.append(record['name'])
+            print(f"  Deleted: {backup.name}")
+        
+        self.catalog.remove(deleted)
+        
+        store = self.get_dedup_store()
+        if deleted and store.store_path.exists():
+            # Drop chunks that only the deleted manifests referenced
+            manifests = self.destination.glob(f"{self.vault_path.name}_backup_*.dedup")
+            removed_chunks, chunk_space = store.collect_garbage(manifests)
+            freed_space += chunk_space
+            if removed_chunks:
+                print(f"  Removed {removed_chunks} unreferenced chunks")
+        
+        if deleted:
+            print(f"✅ Deleted {len(deleted)} old backups, freed {self.format_size(freed_space)}")
         else:
             print("  No old backups to delete")
     
+    def delete_backup(self, backup: Path) -> int:
+        """Delete a backup and its sidecar files; returns the bytes actually freed.
+        
+        Files still hard-linked from other backups free nothing, so only
+        files with a single link are counted.
+        """
+        freed = 0
+        if backup.is_dir():
+            for root, dirs, files in os.walk(backup, topdown=False):
+                for name in files:
+                    path = os.path.join(root, name)
+                    stat = os.lstat(path)
+                    if stat.st_nlink == 1:
+                        freed += stat.st_size
+                    os.unlink(path)
+                for name in dirs:
+                    os.rmdir(os.path.join(root, name))
+            os.rmdir(backup)
+        elif backup.exists():
+            freed += backup.stat().st_size
+            backup.unlink()
+        
+        # Delete metadata and file manifest if they exist
+        metadata_file = backup.parent / f"{backup.name}_metadata.json"
+        metadata_file.unlink(missing_ok=True)
+        self.files_manifest_path(backup).unlink(missing_ok=True)
+        SourceSnapshot.path_for(backup).unlink(missing_ok=True)
+        return freed
+    
     def list_backups(self) -> List[Dict]:
-        """List all available backups."""
+        """List all available backups, newest first, from the backup catalog."""
+        self.ensure_catalog()
+        backups = self.catalog.backups(self.vault_path.name)
+        
+        for record in backups:
+            record['path'] = str(self.destination / record['name'])
+            record['size'] = record['logical_size']
+        
+        return backups
+    
+    def ensure_catalog(self):
+        """Catalog existing backups the first time this vault is seen in the destination."""
+        if not self.catalog.is_cataloged(self.vault_path.name):
+            self.rebuild_catalog()
+    
+    def backup_paths(self) -> List[Tuple[str, Path]]:
+        """(timestamp, path) of this vault's backups in the destination, oldest first."""
+        prefix = f"{self.vault_path.name}_backup_"
         backups = []
         
         for item in self.destination.iterdir():
-            if item.name.startswith(self.vault_path.name) and '_backup_' in item.name:
-                metadata_file = item.parent / f"{item.name}_metadata.json"
-                
-                if metadata_file.exists():
-                    metadata = json.loads(metadata_file.read_text())
-                else:
-                    # Basic metadata
-                    metadata = {
-                        'timestamp': item.name.split('_backup_')[1].split('.')[0],
-                        'created': datetime.fromtimestamp(item.stat().st_ctime).isoformat(),
-                    }
-                
-                metadata['name'] = item.name
-                metadata['path'] = str(item)
-                metadata['size'] = self.get_directory_size(item) if item.is_dir() else item.stat().st_size
-                
-                backups.append(metadata)
+            if not item.name.startswith(prefix) or item.name.endswith(SIDECAR_SUFFIXES):
+                continue
+            timestamp = item.name[len(prefix):].split('.')[0]
+            try:
+                datetime.strptime(timestamp, "%Y%m%d_%H%M%S")
+            except ValueError:
+                continue
+            backups.append((timestamp, item))
         
-        return sorted(backups, key=lambda x: x['timestamp'], reverse=True)
+        return sorted(backups)
+    
+    def rebuild_catalog(self) -> List[Dict]:
+        """Re-create this vault's catalog records by scanning the backups on disk.
+        
+        Unique on-disk sizes are attributed to the oldest backup holding
+        each hard-linked file or dedup chunk.
+        """
+        print(f"🔄 Building backup catalog for {self.vault_path.name}...")
+        records = []
+        seen_inodes: Set[Tuple[int, int]] = set()
+        seen_chunks: Set[str] = set()
+        store = self.get_dedup_store()
+        
+        for timestamp, backup in self.backup_paths():
+            metadata_file = backup.parent / f"{backup.name}_metadata.json"
+            try:
+                metadata = json.loads(metadata_file.read_text())
+            except (OSError, ValueError):
+                metadata = {}
+            
+            stat = backup.stat()
+            record = {
+                'name': backup.name,
+                'vault_name': self.vault_path.name,
+                'backup_type': metadata.get('backup_type'),
+                'timestamp': timestamp,
+                'created': metadata.get('created') or datetime.fromtimestamp(stat.st_ctime).isoformat(),
+                'base': metadata.get('base'),
+            }
+            
+            if backup.is_dir():
+                files_count = logical_size = disk_size = 0
+                for root, _, files in os.walk(backup):
+                    for name in files:
+                        file_stat = os.lstat(os.path.join(root, name))
+                        files_count += 1
+                        logical_size += file_stat.st_size
+                        inode = (file_stat.st_dev, file_stat.st_ino)
+                        if inode not in seen_inodes:
+                            seen_inodes.add(inode)
+                            disk_size += file_stat.st_size
+                record.update(files_count=files_count, logical_size=logical_size, disk_size=disk_size)
+                record['backup_type'] = record['backup_type'] or 'full'
+            elif backup.suffix == '.dedup':
+                files = DedupStore.load_manifest(backup)['files']
+                disk_size = stat.st_size
+                for info in files.values():
+                    for digest in info['chunks']:
+                        if digest not in seen_chunks:
+                            seen_chunks.add(digest)
+                            try:
+                                object_file = store.object_path(digest)
+                            except ValueError:
+                                continue
+                            if object_file.exists():
+                                disk_size += object_file.stat().st_size
+                record.update(files_count=len(files), logical_size=sum(info['size'] for info in files.values()),
+                              disk_size=disk_size, backup_type='dedup')
+            else:
+                record.update(files_count=metadata.get('files_count'),
+                              logical_size=metadata.get('logical_size', stat.st_size),
+                              disk_size=stat.st_size)
+                record['backup_type'] = record['backup_type'] or 'full'
+            
+            records.append(record)
+        
+        self.catalog.replace_all(self.vault_path.name, records)
+        print(f"  📇 Cataloged {len(records)} backups")
+        return records
     
     def count_files(self, path: Path) -> int:
         """Count files in directory."""
@@ -318,22 +828,99 @@ def main():
     parser.add_argument('--vault', required=True, help='Path to Obsidian vault')
     parser.add_argument('--destination', required=True, help='Backup destination directory')
     parser.add_argument('--compress', action='store_true', help='Create compressed zip backup')
-    parser.add_argument('--type', choices=['full', 'incremental'], default='full',
+    parser.add_argument('--format', choices=archive_pipeline.FORMATS,
+                       help='Archive format for compressed backups (implies --compress)')
+    parser.add_argument('--compression-level', type=int,
+                       help='Compression level (default: 6 for zip/gz/xz, 3 for zst)')
+    parser.add_argument('--jobs', type=int, help='Worker threads for copying and compression (default: CPU count)')
+    parser.add_argument('--type', choices=['full', 'incremental', 'dedup'], default='full',
                        help='Backup type')
-    parser.add_argument('--base', help='Base backup for incremental backup')
+    parser.add_argument('--base', help='Base backup for incremental backup (default: the latest directory '
+                                       'backup) or base manifest for dedup')
     parser.add_argument('--retention', type=int, help='Delete backups older than N days')
     parser.add_argument('--list', action='store_true', help='List existing backups')
+    parser.add_argument('--verify', nargs='?', const='latest', metavar='BACKUP',
+                       help='Re-hash a backup (a path, or a name from --list) against its file manifest '
+                            '(default: the latest backup)')
+    parser.add_argument('--sample', type=int, metavar='N',
+                       help='With --verify, only check N randomly chosen files')
+    parser.add_argument('--rebuild-catalog', action='store_true',
+                       help='Rebuild the backup catalog by scanning the destination')
+    parser.add_argument('--watch', action='store_true',
+                       help='Keep running and back up whenever the vault changes (incremental or dedup)')
+    parser.add_argument('--debounce', type=float, default=5.0, metavar='SECONDS',
+                       help='With --watch, wait until the vault is quiet this long (default: 5)')
+    parser.add_argument('--sweep-interval', type=float, default=3600.0, metavar='SECONDS',
+                       help='With --watch, re-walk the whole vault this often (default: 3600)')
+    parser.add_argument('--poll', action='store_true',
+                       help='With --watch, poll instead of using inotify (e.g. for network mounts)')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL, metavar='SECONDS',
+                       help='Seconds between rescans when polling (default: 10)')
+    parser.add_argument('--restore', nargs='?', const='latest', metavar='BACKUP',
+                       help='Restore files from a backup, given as a path or a name from --list '
+                            '(default: the latest, or the one given by --as-of)')
+    parser.add_argument('--target', help='With --restore, directory to restore into')
+    parser.add_argument('--paths', nargs='+', metavar='PATTERN',
+                       help="With --restore, only restore matching folders or notes ('Projects/', 'Daily/*.md')")
+    parser.add_argument('--as-of', metavar='DATE',
+                       help="With --restore, use the newest backup taken at or before DATE "
+                            "(YYYY-MM-DD, 'YYYY-MM-DD HH:MM' or a backup timestamp)")
+    parser.add_argument('--overwrite', action='store_true',
+                       help='With --restore, replace files that already exist in the target')
     parser.add_argument('--exclude', nargs='*', help='Additional exclude patterns')
+    parser.add_argument('--exclude-from', action='append', metavar='FILE',
+                       help='Read exclude patterns from a .gitignore-style file')
+    parser.add_argument('--index', help='Path to the vault index database (default: user cache dir)')
     
     args = parser.parse_args()
     
-    backup = VaultBackup(args.vault, args.destination)
+    backup = VaultBackup(args.vault, args.destination, index_path=args.index, jobs=args.jobs)
     
-    # Add custom exclusions
+    # Add custom exclusions (files first so command-line patterns can override them)
+    for exclude_file in args.exclude_from or []:
+        backup.exclude_patterns.extend(read_exclude_file(exclude_file))
     if args.exclude:
-        backup.exclude_patterns.update(args.exclude)
+        backup.exclude_patterns.extend(args.exclude)
     
-    if args.list:
+    if args.rebuild_catalog:
+        backup.rebuild_catalog()
+    
+    if args.restore:
+        if not args.target:
+            parser.error('--restore requires --target')
+        if args.restore == 'latest':
+            try:
+                as_of = backup_restore.parse_as_of(args.as_of) if args.as_of else None
+            except ValueError as e:
+                parser.error(str(e))
+            backup_path = backup.find_backup(as_of)
+            if backup_path is None:
+                print("No backups found" + (f" taken before {args.as_of}" if args.as_of else ""))
+                return
+        else:
+            backup_path = backup.resolve_backup(args.restore)
+        
+        print(f"♻️  Restoring from {backup_path.name}...")
+        if backup.restore_backup(backup_path, Path(args.target), args.paths, args.overwrite):
+            print("✅ Restore complete")
+        else:
+            print("❌ Restore failed!")
+    elif args.verify:
+        if args.verify == 'latest':
+            backups = backup.list_backups()
+            if not backups:
+                print("No backups found")
+                return
+            backup_path = Path(backups[0]['path'])
+        else:
+            backup_path = backup.resolve_backup(args.verify)
+        
+        print(f"🔍 Verifying {backup_path.name}...")
+        if backup.verify_backup_contents(backup_path, args.sample):
+            print("✅ Backup verified")
+        else:
+            print("❌ Backup verification failed!")
+    elif args.list:
         # List existing backups
         print(f"\n📋 Backups in {args.destination}:\n")
         backups = backup.list_backups()
@@ -343,19 +930,33 @@ def main():
         else:
             for i, b in enumerate(backups, 1):
                 print(f"{i}. {b['name']}")
-                print(f"   Created: {b.get('created', 'Unknown')}")
-                print(f"   Size: {backup.format_size(b['size'])}")
-                print(f"   Files: {b.get('files_count', 'Unknown')}")
+                print(f"   Created: {b.get('created') or 'Unknown'}")
+                print(f"   Type: {b.get('backup_type') or 'Unknown'}"
+                      + (f" (base: {b['base']})" if b.get('base') else ""))
+                print(f"   Size: {backup.format_size(b['size'] or 0)} "
+                      f"({backup.format_size(b['disk_size'] or 0)} unique on disk)")
+                print(f"   Files: {b.get('files_count') or 'Unknown'}")
                 print()
-    else:
+    elif args.watch:
+        backup.watch(
+            backup_type=args.type,
+            debounce=args.debounce,
+            sweep_interval=args.sweep_interval,
+            poll_interval=args.poll_interval,
+            polling=args.poll,
+            retention_days=args.retention
+        )
+    elif not args.rebuild_catalog:
         # Create backup
         print(f"🎒 Starting backup of: {args.vault}")
         print(f"📁 Destination: {args.destination}\n")
         
         backup_path = backup.create_backup(
-            compress=args.compress,
+            compress=args.compress or bool(args.format),
             backup_type=args.type,
-            incremental_base=args.base
+            incremental_base=args.base,
+            archive_format=args.format or 'zip',
+            compression_level=args.compression_level
         )
         
         # Apply retention policy if specified
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+backup_catalog.py
+Catalog of the backups in a destination directory
+
+Used by backup-vault.py. Each backup is recorded when it is created, so
+--list and retention read one small SQLite file instead of walking and
+stat()ing every snapshot. The catalog lives at the destination root
+(.backup-catalog.sqlite3) and can be rebuilt from the backups themselves
+with --rebuild-catalog.
+
+Recorded per backup: name, vault, type, timestamp, base backup, file count,
+logical size (the vault data it holds) and unique on-disk size (bytes not
+shared with older backups through hard links or the dedup store).
+
+Destinations holding backups from before the catalog existed are cataloged
+automatically the first time --list or retention runs for that vault.
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+CATALOG_FILE = '.backup-catalog.sqlite3'
+CATALOG_VERSION = 1
+
+COLUMNS = ['name', 'vault_name', 'backup_type', 'timestamp', 'created', 'base',
+           'files_count', 'logical_size', 'disk_size']
+
+
+class BackupCatalog:
+    def __init__(self, destination: Path):
+        self.path = Path(destination) / CATALOG_FILE
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def connect(self) -> sqlite3.Connection:
+        """Open the catalog, recreating it if the schema is outdated."""
+        conn = sqlite3.connect(str(self.path))
+        conn.row_factory = sqlite3.Row
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or int(row[0]) != CATALOG_VERSION:
+            conn.execute("DROP TABLE IF EXISTS backups")
+            conn.execute("DELETE FROM meta WHERE key LIKE 'vault:%'")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CATALOG_VERSION),))
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS backups (
+                name TEXT PRIMARY KEY,
+                vault_name TEXT NOT NULL,
+                backup_type TEXT,
+                timestamp TEXT NOT NULL,
+                created TEXT,
+                base TEXT,
+                files_count INTEGER,
+                logical_size INTEGER,
+                disk_size INTEGER
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS backups_vault ON backups (vault_name, timestamp)")
+        return conn
+
+    def add(self, record: Dict):
+        """Record a backup (replacing an existing record with the same name)."""
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO backups ({', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                    [record.get(column) for column in COLUMNS]
+                )
+        finally:
+            conn.close()
+
+    def remove(self, names: Iterable[str]):
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany("DELETE FROM backups WHERE name = ?", [(name,) for name in names])
+        finally:
+            conn.close()
+
+    def backups(self, vault_name: str, older_than: Optional[str] = None) -> List[Dict]:
+        """Backups of a vault, newest first; optionally only those with timestamp < older_than."""
+        sql = "SELECT * FROM backups WHERE vault_name = ?"
+        params: List = [vault_name]
+        if older_than is not None:
+            sql += " AND timestamp < ?"
+            params.append(older_than)
+        sql += " ORDER BY timestamp DESC"
+
+        conn = self.connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def is_cataloged(self, vault_name: str) -> bool:
+        """Whether the vault's backups have been cataloged (by a rebuild) at least once."""
+        if not self.exists():
+            return False
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (f"vault:{vault_name}",)).fetchone()
+            return row is not None
+        finally:
+            conn.close()
+
+    def replace_all(self, vault_name: str, records: Iterable[Dict]):
+        """Replace every record of a vault (used when rebuilding the catalog)."""
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM backups WHERE vault_name = ?", (vault_name,))
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO backups ({', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                    [[record.get(column) for column in COLUMNS] for record in records]
+                )
+                conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (f"vault:{vault_name}", '1'))
+        finally:
+            conn.close()
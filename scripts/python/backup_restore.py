@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+backup_restore.py
+Selective, parallel restore of files from vault backups
+
+Used by backup-vault.py --restore. Only the selected files are read:
+
+- directory (full or incremental): files are copied back on a thread pool
+  with the zero-copy copier from copy_engine.py. Incremental backups are
+  complete trees (unchanged files are hard links), so no chain of earlier
+  backups needs to be replayed.
+- zip: selected entries are looked up in the central directory and
+  decompressed in parallel, one ZipFile handle per thread
+- tar: the archive is streamed once and only matching members are written,
+  since a compressed tar has no index. Conflicts with existing files are
+  found first, from the backup's file manifest (or, without one, a pass
+  over the member headers), so a refused restore writes nothing
+- dedup: files are rebuilt from their chunks in parallel (DedupStore.restore)
+
+Selections use .gitignore syntax, so 'Projects/' restores a folder,
+'Daily/2024-*.md' a glob of notes, and no pattern the whole vault.
+"""
+
+import os
+import shutil
+import threading
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import copy_engine
+from archive_pipeline import open_tar
+from exclude_matcher import ExcludeMatcher
+from read_ahead import read_ahead
+
+ZIP_READ_SIZE = 1024 * 1024
+
+
+def select_files(files: Dict[str, Dict], patterns: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+    """Manifest entries matching any of the patterns (all entries without patterns)."""
+    matcher = path_matcher(patterns)
+    if matcher is None:
+        return files
+    return {path: info for path, info in files.items() if matcher.is_excluded(path)}
+
+
+def path_matcher(patterns: Optional[Iterable[str]]) -> Optional[ExcludeMatcher]:
+    # An exclude matcher "excludes" exactly the paths the patterns select
+    patterns = list(patterns or [])
+    return ExcludeMatcher(patterns) if patterns else None
+
+
+def target_path(target: Path, relative_path: str) -> Path:
+    """Destination of a backed-up path, refusing paths that would escape target."""
+    dest = (target / relative_path).resolve()
+    if dest != target and target not in dest.parents:
+        raise ValueError(f"Refusing to restore outside the target: {relative_path}")
+    return dest
+
+
+def conflicts(target: Path, paths: Iterable[str]) -> List[str]:
+    """Selected paths that already exist in target."""
+    return [path for path in paths if os.path.lexists(target / path)]
+
+
+def make_parent_dirs(target: Path, paths: Iterable[str]):
+    """Create each destination directory once, before the parallel writes."""
+    for parent in sorted({os.path.dirname(path) for path in paths}):
+        target_path(target, parent).mkdir(parents=True, exist_ok=True)
+
+
+def directory_files(backup_path: Path) -> Dict[str, Dict]:
+    """Files of a directory backup made without a file manifest."""
+    files = {}
+    for root, _, names in os.walk(backup_path):
+        for name in names:
+            full_path = os.path.join(root, name)
+            stat = os.stat(full_path)
+            files[os.path.relpath(full_path, backup_path)] = {'size': stat.st_size,
+                                                             'mtime_ns': stat.st_mtime_ns}
+    return files
+
+
+def zip_files(backup_path: Path) -> Dict[str, Dict]:
+    """Files of a zip backup made without a file manifest, from its central directory."""
+    files = {}
+    with zipfile.ZipFile(backup_path) as zipf:
+        for info in zipf.infolist():
+            if not info.is_dir():
+                mtime = datetime(*info.date_time).timestamp()
+                files[info.filename.replace('/', os.sep)] = {'size': info.file_size,
+                                                             'mtime_ns': int(mtime * 1e9)}
+    return files
+
+
+def restore_directory(backup_path: Path, files: Dict[str, Dict], target: Path, jobs: int) -> Tuple[int, int]:
+    """Copy the selected files out of a directory backup; returns (files, bytes)."""
+    for path in files:
+        target_path(target, path)
+    tasks = ((backup_path / path, path, info['size'], info['mtime_ns']) for path, info in files.items())
+    stats = copy_engine.copy_files(tasks, target, jobs, hash_files=False)
+    return stats['files'], stats['bytes_copied']
+
+
+def restore_zip(backup_path: Path, files: Dict[str, Dict], target: Path, jobs: int) -> Tuple[int, int]:
+    """Extract the selected entries of a zip backup on jobs threads; returns (files, bytes)."""
+    local = threading.local()
+    handles = []
+    make_parent_dirs(target, files)
+
+    def extract(item: Tuple[str, Dict]) -> int:
+        path, info = item
+        if not hasattr(local, 'zipf'):
+            local.zipf = zipfile.ZipFile(backup_path)
+            handles.append(local.zipf)
+        dest = target_path(target, path)
+        with local.zipf.open(path.replace(os.sep, '/')) as src, open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst, ZIP_READ_SIZE)
+        os.utime(dest, ns=(info['mtime_ns'], info['mtime_ns']))
+        return info['size']
+
+    try:
+        restored = 0
+        restored_bytes = 0
+        for _, size in read_ahead(list(files.items()), extract, jobs):
+            restored += 1
+            restored_bytes += size
+        return restored, restored_bytes
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def tar_files(backup_path: Path, matcher: Optional[ExcludeMatcher] = None) -> List[str]:
+    """Names of the (selected) files of a tar backup, from a pass over its headers."""
+    with open_tar(backup_path) as tar:
+        return [member.name for member in tar
+                if member.isfile() and (matcher is None or matcher.is_excluded(member.name))]
+
+
+def restore_tar(backup_path: Path, target: Path, patterns: Optional[Iterable[str]] = None,
+                overwrite: bool = False, names: Optional[Iterable[str]] = None) -> Tuple[int, int]:
+    """Stream a tar backup once, writing the matching members; returns (files, bytes).
+
+    names are the selected members if already known (from the backup's file
+    manifest); without them and without overwrite, the headers are read in
+    a first pass so that conflicts are refused before anything is written.
+    """
+    matcher = path_matcher(patterns)
+    restored = 0
+    restored_bytes = 0
+
+    if not overwrite:
+        names = list(names) if names is not None else tar_files(backup_path, matcher)
+        for name in names:
+            target_path(target, name)
+        existing = conflicts(target, names)
+        if existing:
+            raise FileExistsError(f"{len(existing)} selected files already exist in {target} "
+                                  f"(e.g. {existing[0]}); use --overwrite to replace them")
+
+    with open_tar(backup_path) as tar:
+        for member in tar:
+            if not member.isfile() or (matcher is not None and not matcher.is_excluded(member.name)):
+                continue
+            dest = target_path(target, member.name)
+            if not overwrite and os.path.lexists(dest):
+                raise FileExistsError(f"{member.name} already exists in {target}")
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            with tar.extractfile(member) as src, open(dest, 'wb') as dst:
+                shutil.copyfileobj(src, dst, ZIP_READ_SIZE)
+            os.utime(dest, (member.mtime, member.mtime))
+            restored += 1
+            restored_bytes += member.size
+
+    return restored, restored_bytes
+
+
+def parse_as_of(value: str) -> str:
+    """Backup timestamp (YYYYMMDD_HHMMSS) for an --as-of value.
+
+    Accepts a backup timestamp, an ISO date (meaning the end of that day)
+    or an ISO date and time.
+    """
+    value = value.strip()
+    for fmt in ("%Y%m%d_%H%M%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S",
+                "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y%m%d_%H%M%S")
+        except ValueError:
+            continue
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y%m%d_235959")
+    except ValueError:
+        raise ValueError(f"Unrecognized date: {value!r} (use YYYY-MM-DD, 'YYYY-MM-DD HH:MM' "
+                         f"or YYYYMMDD_HHMMSS)")
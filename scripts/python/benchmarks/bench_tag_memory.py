@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+bench_tag_memory.py
+Measure TagAnalyzer's peak RSS with interned tag_files against per-tag path lists
+
+Usage:
+    python bench_tag_memory.py --vault /tmp/bench-vault --notes 100000
+
+- lists: the previous layout, a list of path strings per tag and a fresh
+  string for every tag of every note
+- interned: a single path table, CSR postings of note ids (tag_postings.py)
+  and one shared string per tag
+
+The index is built once, then each layout scans it in a fresh process so
+peak RSS (ru_maxrss) is not shared between runs. Peak RSS is mostly the
+index itself, so the RSS growth during the scan is reported too (Linux,
+from /proc/self/statm). The generated reports are compared, minus their
+timestamps, to check the output is unchanged.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from synthetic_vault import generate_vault, load_script
+
+import vault_index
+
+LAYOUTS = ['lists', 'interned']
+
+
+def postings_bytes(analyzer) -> int:
+    """Size of tag_files and the path table (path strings, shared with the index, not included)."""
+    tag_files = analyzer.tag_files
+    if isinstance(tag_files, dict):
+        return sys.getsizeof(tag_files) + sum(sys.getsizeof(files) for files in tag_files.values())
+    return (sys.getsizeof(tag_files.tag_ids) + sys.getsizeof(tag_files.tag_names)
+            + tag_files.memory_bytes() + sys.getsizeof(analyzer.paths))
+
+
+def current_rss_kb() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return 0
+
+
+def run_child(vault: str, index: str, layout: str):
+    """Scan in this process and print its measurements as JSON."""
+    tag_analyzer = load_script('tag-analyzer')
+    analyzer = tag_analyzer.TagAnalyzer(vault, index_path=index)
+    analyzer.index.ensure_fresh()
+
+    if layout == 'lists':
+        def parsed_tags(entry):
+            if isinstance(entry._tags, str):
+                entry._tags = json.loads(entry._tags)
+            return entry._tags or []
+        vault_index.IndexEntry.tags = property(parsed_tags)
+
+        # The previous layout: one list of path strings per tag
+        def scan_vault():
+            analyzer.tag_files = defaultdict(list)
+            notes = analyzer.index.notes()
+            analyzer.note_count = len(notes)
+            for note in notes:
+                for tag in note.tags:
+                    analyzer.tags[tag] += 1
+                    analyzer.tag_files[tag].append(note.path)
+                    parts = tag.split('/')
+                    for i in range(1, len(parts)):
+                        analyzer.hierarchical_tags['/'.join(parts[:i])].add('/'.join(parts[:i + 1]))
+        analyzer.scan_vault = scan_vault
+
+    rss_before = current_rss_kb()
+    start = time.perf_counter()
+    analyzer.scan_vault()
+    seconds = time.perf_counter() - start
+    scan_rss_kb = current_rss_kb() - rss_before
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report_file = os.path.join(tmp, 'report.md')
+        analyzer.generate_report(output_path=report_file, similarity_threshold=1.1)
+        report = [line for line in Path(report_file).read_text(encoding='utf-8').splitlines()
+                  if not line.startswith(('created:', '**Generated**'))]
+
+    print(json.dumps({
+        'seconds': seconds,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'scan_rss_kb': scan_rss_kb,
+        'postings_bytes': postings_bytes(analyzer),
+        'postings': sum(len(v) for v in analyzer.tag_files.values()),
+        'report': hashlib.blake2b('\n'.join(report).encode('utf-8'), digest_size=16).hexdigest(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark TagAnalyzer memory use')
+    parser.add_argument('--vault', required=True, help='Synthetic vault directory (created if needed)')
+    parser.add_argument('--notes', type=int, default=100000, help='Number of synthetic notes')
+    parser.add_argument('--child', choices=LAYOUTS, help=argparse.SUPPRESS)
+    parser.add_argument('--index', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.vault, args.index, args.child)
+        return
+
+    print(f"📂 Preparing synthetic vault ({args.notes} notes)...")
+    vault = generate_vault(args.vault, args.notes)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = os.path.join(tmp, 'index.sqlite3')
+        load_script('tag-analyzer').TagAnalyzer(str(vault), index_path=index).index.ensure_fresh()
+
+        results = {}
+        for layout in LAYOUTS:
+            output = subprocess.run([sys.executable, __file__, '--vault', str(vault), '--index', index,
+                                     '--child', layout], capture_output=True, text=True, check=True).stdout
+            results[layout] = json.loads(output.strip().splitlines()[-1])
+
+    baseline = results['lists']
+    print(f"\n{baseline['postings']} tag occurrences\n")
+    print("| tag_files | Scan (s) | Peak RSS (MB) | Scan RSS growth (MB) | tag_files (MB) | Same report |")
+    print("|-----------|----------|---------------|----------------------|----------------|-------------|")
+    for layout, result in results.items():
+        print(f"| {layout} | {result['seconds']:.2f} | {result['peak_rss_kb'] / 1024:.1f} | "
+              f"{result['scan_rss_kb'] / 1024:.1f} | "
+              f"{result['postings_bytes'] / (1024 * 1024):.1f} | "
+              f"{'yes' if result['report'] == baseline['report'] else 'NO'} |")
+
+
+if __name__ == '__main__':
+    main()
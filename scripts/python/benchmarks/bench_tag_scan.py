@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+bench_tag_scan.py
+Benchmark TagAnalyzer.scan_vault parsing by number of worker processes
+
+Usage:
+    python bench_tag_scan.py --vault /tmp/bench-vault --notes 100000
+    python bench_tag_scan.py --vault /tmp/bench-vault --workers 1 2 4 8 16 32
+
+Each run starts from an empty index so every note is read and parsed, and
+the collected tags are checked against the serial run.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_vault import generate_vault, load_script
+
+
+def run_scan(tag_analyzer, vault: Path, workers: int):
+    """Scan the vault with a fresh index and return (seconds, analyzer)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = tag_analyzer.TagAnalyzer(str(vault), index_path=os.path.join(tmp, 'index.sqlite3'),
+                                            workers=workers)
+        start = time.perf_counter()
+        analyzer.scan_vault()
+        return time.perf_counter() - start, analyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel tag extraction')
+    parser.add_argument('--vault', required=True, help='Synthetic vault directory (created if needed)')
+    parser.add_argument('--notes', type=int, default=100000, help='Number of synthetic notes')
+    parser.add_argument('--workers', type=int, nargs='*',
+                        help='Worker counts to test (default: powers of two up to the CPU count)')
+
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, cpu_count} | {2 ** i for i in range(8) if 2 ** i <= cpu_count})
+
+    print(f"📂 Preparing synthetic vault ({args.notes} notes)...")
+    vault = generate_vault(args.vault, args.notes)
+    tag_analyzer = load_script('tag-analyzer')
+
+    results = []
+    baseline = None
+    for workers in worker_counts:
+        seconds, analyzer = run_scan(tag_analyzer, vault, workers)
+        snapshot = (list(analyzer.tags.items()), dict(analyzer.tag_files), dict(analyzer.hierarchical_tags))
+        if baseline is None:
+            baseline = (seconds, snapshot)
+        identical = snapshot == baseline[1]
+        results.append((workers, seconds, baseline[0] / seconds, identical))
+
+    print("\n| Workers | Seconds | Notes/s | Speedup | Identical |")
+    print("|---------|---------|---------|---------|-----------|")
+    for workers, seconds, speedup, identical in results:
+        print(f"| {workers} | {seconds:.2f} | {args.notes / seconds:,.0f} | {speedup:.2f}x | "
+              f"{'yes' if identical else 'NO'} |")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+bench_transforms.py
+Benchmark note_transforms.py against the per-call regex passes it replaced
+
+Usage:
+    python bench_transforms.py --vault /tmp/bench-vault --notes 20000
+    python bench_transforms.py --vault /tmp/bench-vault --repeat 5
+
+The whole corpus is read into memory first, so only the transforms are
+timed. Outputs are compared with the old functions; differences are
+expected only in notes with fenced code blocks, which are now left as-is.
+Skipping those blocks costs time, so the new functions are not all faster.
+"""
+
+import argparse
+import re
+import time
+from pathlib import Path
+
+from synthetic_vault import generate_vault
+
+import note_transforms
+
+
+def legacy_strip_frontmatter(content: str) -> str:
+    return re.sub(r'^---.*?---\s*', '', content, flags=re.DOTALL)
+
+
+def legacy_clean_text(content: str) -> str:
+    content = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', content)  # Links
+    content = re.sub(r'\[\[([^\]]+)\]\]', r'\1', content)  # Wiki links
+    content = re.sub(r'[*_]{1,2}([^*_]+)[*_]{1,2}', r'\1', content)  # Bold/italic
+    content = re.sub(r'^#+\s+', '', content, flags=re.MULTILINE)  # Headers
+    return content
+
+
+def legacy_inline_tags(content: str):
+    return re.findall(r'#([\w/\-]+)', content)
+
+
+CASES = [
+    ('strip frontmatter', legacy_strip_frontmatter, note_transforms.strip_frontmatter),
+    ('text cleanup', lambda c: legacy_clean_text(legacy_strip_frontmatter(c)),
+     lambda c: note_transforms.clean_text(note_transforms.strip_frontmatter(c))),
+    ('inline tags', legacy_inline_tags, note_transforms.inline_tags),
+]
+
+
+def best_time(function, corpus, repeat: int):
+    """Fastest of repeat runs over the corpus, and the outputs of the last run."""
+    best = float('inf')
+    outputs = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs = [function(content) for content in corpus]
+        best = min(best, time.perf_counter() - start)
+    return best, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shared note transforms')
+    parser.add_argument('--vault', required=True, help='Synthetic vault directory (created if needed)')
+    parser.add_argument('--notes', type=int, default=20000, help='Number of synthetic notes')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per transform (the best is reported)')
+
+    args = parser.parse_args()
+
+    print(f"📂 Preparing synthetic vault ({args.notes} notes)...")
+    vault = generate_vault(args.vault, args.notes)
+    corpus = [path.read_text(encoding='utf-8') for path in sorted(Path(vault).rglob('*.md'))]
+    megabytes = sum(len(content) for content in corpus) / (1024 * 1024)
+    with_code = sum('```' in content for content in corpus)
+    print(f"  {len(corpus)} notes, {megabytes:.1f} MB of text, {with_code} with code blocks")
+
+    print("\n| Transform | Old (s) | New (s) | New MB/s | Speedup | Identical |")
+    print("|-----------|---------|---------|----------|---------|-----------|")
+    for name, legacy, current in CASES:
+        old_seconds, old_outputs = best_time(legacy, corpus, args.repeat)
+        new_seconds, new_outputs = best_time(current, corpus, args.repeat)
+        identical = sum(old == new for old, new in zip(old_outputs, new_outputs))
+        print(f"| {name} | {old_seconds:.3f} | {new_seconds:.3f} | {megabytes / new_seconds:.1f} | "
+              f"{old_seconds / new_seconds:.2f}x | {identical}/{len(corpus)} |")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+synthetic_vault.py
+Generate reproducible synthetic Obsidian vaults for the benchmarks
+
+Usage:
+    python synthetic_vault.py --output /tmp/vault --notes 100000
+
+Also provides load_script() so benchmarks can import the hyphenated scripts
+(tag-analyzer.py, export-notes.py, backup-vault.py) from the parent folder.
+"""
+
+import argparse
+import random
+import sys
+import importlib.util
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+WORDS = (
+    "note idea project meeting review draft research book article person task "
+    "plan goal habit journal summary reference archive inbox weekly daily"
+).split()
+
+FOLDERS = ["Inbox", "Projects", "Areas", "Resources", "Archive", "Daily", "People", "Meetings"]
+
+
+def load_script(name: str):
+    """Import one of the hyphenated scripts as a module."""
+    path = SCRIPTS_DIR / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_tag(rng: random.Random, tag_pool: int) -> str:
+    """Pick a tag from a skewed pool, some of them hierarchical."""
+    n = int(tag_pool * rng.random() ** 3)
+    root = WORDS[n % len(WORDS)]
+    if n % 3 == 0:
+        return f"{root}/{WORDS[(n // 3) % len(WORDS)]}-{n}"
+    return f"{root}-{n}"
+
+
+def make_note(rng: random.Random, index: int, notes: int, tag_pool: int) -> str:
+    """Build one note with frontmatter, inline tags, wikilinks and a code block."""
+    fm_tags = sorted({make_tag(rng, tag_pool) for _ in range(rng.randint(1, 4))})
+    inline_tags = [make_tag(rng, tag_pool) for _ in range(rng.randint(0, 3))]
+    links = [f"[[note-{rng.randrange(notes)}]]" for _ in range(rng.randint(0, 5))]
+
+    lines = [
+        "---",
+        f"type: {rng.choice(['project', 'task', 'idea', 'meeting', 'book'])}",
+        f"created: 2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "tags:",
+        *[f"  - {tag}" for tag in fm_tags],
+        "---",
+        "",
+        f"# Note {index}",
+        "",
+    ]
+    for _ in range(rng.randint(2, 12)):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 30)))
+        lines.append(f"{words} **{rng.choice(WORDS)}** *{rng.choice(WORDS)}*")
+    lines.append(" ".join(f"#{tag}" for tag in inline_tags))
+    lines.append("See also " + ", ".join(links))
+    if index % 10 == 0:
+        lines += ["```c", "#include <stdio.h>", "```"]
+    return "\n".join(lines) + "\n"
+
+
+def generate_vault(output: str, notes: int = 100000, tag_pool: int = 25000,
+                   seed: int = 42) -> Path:
+    """Write a synthetic vault, reusing it if it already has the requested notes."""
+    root = Path(output)
+    marker = root / ".synthetic"
+    expected = f"{notes} {tag_pool} {seed}"
+    if marker.exists() and marker.read_text() == expected:
+        return root
+
+    rng = random.Random(seed)
+    for i in range(notes):
+        folder = root / FOLDERS[i % len(FOLDERS)] / f"{(i // 1000):03d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"note-{i}.md").write_text(make_note(rng, i, notes, tag_pool), encoding='utf-8')
+
+    marker.write_text(expected)
+    return root
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Obsidian vault')
+    parser.add_argument('--output', required=True, help='Vault directory to create')
+    parser.add_argument('--notes', type=int, default=100000, help='Number of notes')
+    parser.add_argument('--tags', type=int, default=25000, help='Size of the tag pool')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+
+    args = parser.parse_args()
+
+    vault = generate_vault(args.output, args.notes, args.tags, args.seed)
+    print(f"✅ Synthetic vault with {args.notes} notes at {vault}")
+
+
+if __name__ == '__main__':
+    main()
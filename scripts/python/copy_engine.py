@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+copy_engine.py
+Parallel file copier for directory (full and incremental) vault backups
+
+Used by backup-vault.py. Copies run on a thread pool so SSD and network
+targets see several requests in flight, and each destination directory is
+created once rather than once per file.
+
+- Data is moved with os.copy_file_range where the kernel supports it (no
+  user-space copy, reflinks on btrfs/XFS, server-side copy on NFS 4.2),
+  then os.sendfile, then a plain buffered copy.
+- Small files are grouped into batches so each thread hand-off copies a
+  meaningful amount of data; large files are copied one per task.
+- Unchanged files in an incremental backup are hard-linked to the base
+  backup instead of copied, including files renamed since the base.
+- Per-file content hashes can be computed in the same pass as the copy,
+  so the backup's file manifest needs no second read of the data.
+"""
+
+import os
+import time
+import errno
+import shutil
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Files below this size are batched together
+SMALL_FILE_SIZE = 256 * 1024
+BATCH_BYTES = 8 * 1024 * 1024
+BATCH_FILES = 128
+
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# Per-file content hashes: BLAKE2b with a 128-bit digest
+HASH_SIZE = 16
+
+# Matches the 1 second tolerance incremental backups have always used
+MTIME_TOLERANCE_NS = 1_000_000_000
+
+# Errors meaning "this copy method does not work here", before any data moved
+UNSUPPORTED_ERRNOS = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP,
+                      errno.ENOTSUP, errno.EBADF, errno.ETXTBSY}
+
+# Cleared after ENOSYS so later files skip straight to the next method
+_use_copy_file_range = hasattr(os, 'copy_file_range')
+_use_sendfile = hasattr(os, 'sendfile') and os.name == 'posix'
+
+# (source, path relative to the backup root, size, mtime_ns)
+CopyTask = Tuple[Path, str, int, int]
+
+
+def _copy_file_range(src_fd: int, dst_fd: int) -> bool:
+    global _use_copy_file_range
+    copied = 0
+    try:
+        while True:
+            n = os.copy_file_range(src_fd, dst_fd, COPY_CHUNK_SIZE)
+            if n == 0:
+                return True
+            copied += n
+    except OSError as e:
+        if copied or e.errno not in UNSUPPORTED_ERRNOS:
+            raise
+        if e.errno == errno.ENOSYS:
+            _use_copy_file_range = False
+        return False
+
+
+def _sendfile(src_fd: int, dst_fd: int) -> bool:
+    global _use_sendfile
+    offset = 0
+    try:
+        while True:
+            n = os.sendfile(dst_fd, src_fd, offset, COPY_CHUNK_SIZE)
+            if n == 0:
+                return True
+            offset += n
+    except OSError as e:
+        if offset or e.errno not in UNSUPPORTED_ERRNOS:
+            raise
+        if e.errno == errno.ENOSYS:
+            _use_sendfile = False
+        return False
+
+
+def copy_file(source: Path, dest: Path, hash_data: bool = False) -> Optional[str]:
+    """Copy data and metadata like shutil.copy2; returns the content hash if hash_data.
+
+    Without hashing, zero-copy system calls are used when possible. With
+    hashing, data passes through user space once and is hashed on the way.
+    """
+    digest = None
+    with open(source, 'rb') as fsrc, open(dest, 'wb') as fdst:
+        if hash_data:
+            hasher = new_hasher()
+            buffer = bytearray(HASH_BUFFER_SIZE)
+            view = memoryview(buffer)
+            while True:
+                n = fsrc.readinto(buffer)
+                if not n:
+                    break
+                hasher.update(view[:n])
+                fdst.write(view[:n])
+            digest = hasher.hexdigest()
+        else:
+            src_fd = fsrc.fileno()
+            dst_fd = fdst.fileno()
+            done = (_use_copy_file_range and _copy_file_range(src_fd, dst_fd)) or \
+                   (_use_sendfile and _sendfile(src_fd, dst_fd))
+            if not done:
+                shutil.copyfileobj(fsrc, fdst, HASH_BUFFER_SIZE)
+    shutil.copystat(source, dest)
+    return digest
+
+
+def new_hasher():
+    """Hasher for the per-file content hashes recorded in backup manifests."""
+    return hashlib.blake2b(digest_size=HASH_SIZE)
+
+
+def hash_file(path: Path) -> str:
+    """Content hash of a file, as recorded by copy_file(hash_data=True)."""
+    hasher = new_hasher()
+    buffer = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb') as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            hasher.update(view[:n])
+    return hasher.hexdigest()
+
+
+def same_stat(path: Path, size: int, mtime_ns: int) -> bool:
+    """Whether path exists with this size and mtime (1 second tolerance)."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    return stat.st_size == size and abs(stat.st_mtime_ns - mtime_ns) <= MTIME_TOLERANCE_NS
+
+
+def _run_batch(batch: List[CopyTask], target: Path, base: Optional[Path],
+               unchanged: Optional[Callable[[str, int, int], bool]],
+               hash_files: bool, base_hashes: Dict[str, str],
+               renamed: Dict[str, str]) -> List[Tuple[Optional[str], bool]]:
+    """Copy or link a batch of files; returns (hash, was linked) for each."""
+    results = []
+    for source, relative_path, size, mtime_ns in batch:
+        dest = target / relative_path
+        if base is not None:
+            base_file = base / renamed.get(relative_path, relative_path)
+            is_unchanged = (unchanged(relative_path, size, mtime_ns) if unchanged is not None
+                            else same_stat(base_file, size, mtime_ns))
+            if is_unchanged:
+                try:
+                    os.link(base_file, dest)
+                except OSError:
+                    pass
+                else:
+                    digest = base_hashes.get(relative_path)
+                    if digest is None and hash_files:
+                        digest = hash_file(base_file)
+                    results.append((digest, True))
+                    continue
+        results.append((copy_file(source, dest, hash_files), False))
+    return results
+
+
+def _batches(tasks: Iterable[CopyTask]) -> Iterator[List[CopyTask]]:
+    batch: List[CopyTask] = []
+    batch_bytes = 0
+    for task in tasks:
+        size = task[2]
+        if size >= SMALL_FILE_SIZE:
+            yield [task]
+            continue
+        batch.append(task)
+        batch_bytes += size
+        if len(batch) >= BATCH_FILES or batch_bytes >= BATCH_BYTES:
+            yield batch
+            batch = []
+            batch_bytes = 0
+    if batch:
+        yield batch
+
+
+def copy_files(tasks: Iterable[CopyTask], target: Path, jobs: int,
+               base: Optional[Path] = None,
+               unchanged: Optional[Callable[[str, int, int], bool]] = None,
+               hash_files: bool = True,
+               base_hashes: Optional[Dict[str, str]] = None,
+               record: Optional[Callable[[str, int, int, Optional[str]], None]] = None,
+               renamed: Optional[Dict[str, str]] = None) -> Dict:
+    """Copy (source, relative path, size, mtime_ns) files into target on jobs threads.
+
+    With a base directory, files that are unchanged are hard-linked to their
+    copy in base instead (falling back to a copy if linking fails).
+    unchanged(relative path, size, mtime_ns) decides that without touching
+    base; by default base's copy is stat()ed. Hashes of linked files are
+    taken from base_hashes, or re-computed from base if missing. renamed
+    maps relative paths to the path the same file had in base.
+
+    record(relative path, size, mtime_ns, hash) is called for every file as
+    it completes, on the calling thread. Returns counts of copied and linked
+    files and bytes, and elapsed seconds.
+    """
+    stats = {'files': 0, 'copied': 0, 'linked': 0, 'bytes_copied': 0, 'bytes_linked': 0}
+    base_hashes = base_hashes or {}
+    renamed = renamed or {}
+    created_dirs = set()
+    pending = deque()
+    start = time.perf_counter()
+
+    def collect(item):
+        batch, future = item
+        reported = stats['files'] // 100
+        for (_, relative_path, size, mtime_ns), (digest, linked) in zip(batch, future.result()):
+            stats['files'] += 1
+            if linked:
+                stats['linked'] += 1
+                stats['bytes_linked'] += size
+            else:
+                stats['copied'] += 1
+                stats['bytes_copied'] += size
+            if record is not None:
+                record(relative_path, size, mtime_ns, digest)
+        if stats['files'] // 100 != reported:
+            print(f"  Processed {stats['files']} files...", end='\r')
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        try:
+            for batch in _batches(tasks):
+                for _, relative_path, _, _ in batch:
+                    parent = os.path.dirname(relative_path)
+                    if parent not in created_dirs:
+                        (target / parent).mkdir(parents=True, exist_ok=True)
+                        created_dirs.add(parent)
+
+                future = pool.submit(_run_batch, batch, target, base, unchanged, hash_files,
+                                     base_hashes, renamed)
+                pending.append((batch, future))
+                if len(pending) >= jobs * 2:
+                    collect(pending.popleft())
+
+            while pending:
+                collect(pending.popleft())
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    stats['elapsed'] = time.perf_counter() - start
+    return stats
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+dedup_store.py
+Content-addressed chunk store for deduplicated vault backups
+
+Used by backup-vault.py --type dedup. Files are split into content-defined
+chunks (gear rolling hash), each chunk is stored once under its BLAKE2b
+digest, and every backup is a small manifest listing the chunks of each file.
+A one-line edit to a large file only writes the chunks around the edit, and
+files whose size and mtime match the previous manifest are not read at all.
+
+Files up to MAX_CHUNK_SIZE (most notes) are stored as one chunk without
+running the rolling hash. Larger files are chunked at roughly 100-150 MB/s
+with NumPy installed, or about 15 MB/s in pure Python, which then bounds
+the first dedup backup of a vault with large attachments.
+
+Layout under the backup destination:
+    <vault>_dedup_store/objects/ab/abcdef...   chunk data
+    <vault>_backup_<timestamp>.dedup           JSON manifest
+"""
+
+import os
+import re
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+MANIFEST_VERSION = 1
+
+MIN_CHUNK_SIZE = 2 * 1024
+AVG_CHUNK_BITS = 13          # ~8 KB average chunk
+MAX_CHUNK_SIZE = 64 * 1024
+READ_SIZE = 1024 * 1024
+
+# A chunk digest as written by put(); anything else in a manifest is refused
+DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+# Boundary when the top AVG_CHUNK_BITS bits of the rolling hash are zero
+BOUNDARY_MASK = ((1 << AVG_CHUNK_BITS) - 1) << (64 - AVG_CHUNK_BITS)
+HASH_MASK = (1 << 64) - 1
+
+# Fixed pseudo-random gear table; must never change or old chunks stop matching
+GEAR = [
+    int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=8).digest(), 'little')
+    for i in range(256)
+]
+
+
+# The rolling hash at a position depends only on the last WINDOW bytes
+# (each byte's gear value is shifted out of the 64-bit hash after 64 steps)
+WINDOW = 64
+
+
+def load_numpy():
+    """NumPy, or None to use the pure-Python chunker."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def boundary_candidates(np, data) -> 'numpy.ndarray':
+    """Positions of data whose 64-byte window hash is a chunk boundary.
+
+    The window hash of every position is built in log2(WINDOW) vector
+    passes: the hash of a window of 2n bytes is the hash of its last n
+    bytes plus the hash of the n before them shifted left by n.
+    """
+    hashes = np.asarray(GEAR, dtype=np.uint64)[np.frombuffer(data, dtype=np.uint8)]
+    span = 1
+    while span < WINDOW:
+        # The shifted operand is a new array, taken before the add
+        hashes[span:] += hashes[:-span] << np.uint64(span)
+        span *= 2
+    candidates = np.flatnonzero(hashes & np.uint64(BOUNDARY_MASK) == 0)
+    return candidates[candidates >= WINDOW - 1]
+
+
+def find_boundary(data: bytes, start: int, end: int, candidates=None) -> int:
+    """Return the end offset of the chunk starting at start, or -1 if data runs out first.
+
+    candidates (from boundary_candidates) replaces the per-byte loop once
+    the hash covers a full window; the first WINDOW - 1 bytes after
+    MIN_CHUNK_SIZE are still hashed here, since the hash starts from zero.
+    """
+    limit = min(end, start + MAX_CHUNK_SIZE)
+    pos = start + MIN_CHUNK_SIZE
+    if pos >= limit:
+        return limit if limit - start == MAX_CHUNK_SIZE else -1
+
+    gear = GEAR
+    mask = BOUNDARY_MASK
+    h = 0
+    head = limit if candidates is None else min(limit, pos + WINDOW - 1)
+    for pos in range(pos, head):
+        h = ((h << 1) + gear[data[pos]]) & HASH_MASK
+        if not h & mask:
+            return pos + 1
+
+    if candidates is not None and head < limit:
+        i = candidates.searchsorted(head)
+        if i < len(candidates) and candidates[i] < limit:
+            return int(candidates[i]) + 1
+
+    return limit if limit - start == MAX_CHUNK_SIZE else -1
+
+
+def iter_chunks(path: Path) -> Iterator[bytes]:
+    """Split a file into content-defined chunks.
+
+    Files of at most MAX_CHUNK_SIZE (most notes) are a single chunk and
+    are not hashed byte by byte. Larger files are scanned through a
+    bytearray window refilled in place, with NumPy when it is installed.
+    """
+    np = load_numpy()
+    with open(path, 'rb') as f:
+        buffer = bytearray(f.read(READ_SIZE))
+        if len(buffer) <= MAX_CHUNK_SIZE:
+            if buffer:
+                yield bytes(buffer)
+            return
+
+        offset = 0
+        eof = False
+        candidates = boundary_candidates(np, buffer) if np else None
+        while True:
+            if not eof and len(buffer) - offset < MAX_CHUNK_SIZE:
+                block = f.read(READ_SIZE)
+                eof = not block
+                del buffer[:offset]
+                buffer += block
+                offset = 0
+                if np:
+                    candidates = boundary_candidates(np, buffer)
+
+            if offset >= len(buffer):
+                return
+
+            boundary = find_boundary(buffer, offset, len(buffer), candidates)
+            if boundary < 0:
+                if not eof:
+                    continue
+                boundary = len(buffer)
+
+            yield bytes(buffer[offset:boundary])
+            offset = boundary
+
+
+class DedupStore:
+    def __init__(self, store_path: Path):
+        self.store_path = Path(store_path)
+        self.objects_path = self.store_path / 'objects'
+
+    def object_path(self, digest: str) -> Path:
+        if not isinstance(digest, str) or not DIGEST_PATTERN.fullmatch(digest):
+            raise ValueError(f"Invalid chunk digest in manifest: {digest!r}")
+        return self.objects_path / digest[:2] / digest
+
+    def put(self, chunk: bytes) -> Tuple[str, bool]:
+        """Store a chunk, returning (digest, whether it was newly written)."""
+        digest = hashlib.blake2b(chunk, digest_size=32).hexdigest()
+        object_file = self.object_path(digest)
+        if object_file.exists():
+            return digest, False
+
+        object_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = object_file.with_name(f"{digest}.tmp{os.getpid()}")
+        tmp_file.write_bytes(chunk)
+        os.replace(tmp_file, object_file)
+        return digest, True
+
+    def get(self, digest: str) -> bytes:
+        return self.object_path(digest).read_bytes()
+
+    def backup(self, files: Iterable[Tuple[Path, str, int, int]], manifest_path: Path,
+               previous: Optional[Dict] = None, metadata: Optional[Dict] = None) -> Dict:
+        """Back up (path, relative path, size, mtime_ns) files and write a manifest.
+
+        Files whose size and mtime_ns match the previous manifest reuse its
+        chunk list without being read.
+        """
+        previous_files = previous['files'] if previous else {}
+        manifest_files = {}
+        stats = {'files': 0, 'reused': 0, 'chunks_written': 0, 'bytes_written': 0, 'total_size': 0}
+
+        for path, relative_path, size, mtime_ns in files:
+            old = previous_files.get(relative_path)
+            if old and old['size'] == size and old['mtime_ns'] == mtime_ns:
+                manifest_files[relative_path] = old
+                stats['reused'] += 1
+            else:
+                chunks = []
+                try:
+                    for chunk in iter_chunks(path):
+                        digest, written = self.put(chunk)
+                        chunks.append(digest)
+                        if written:
+                            stats['chunks_written'] += 1
+                            stats['bytes_written'] += len(chunk)
+                except OSError as e:
+                    print(f"⚠️  Error reading {path}: {e}")
+                    continue
+                manifest_files[relative_path] = {'size': size, 'mtime_ns': mtime_ns, 'chunks': chunks}
+
+            stats['files'] += 1
+            stats['total_size'] += size
+            if stats['files'] % 100 == 0:
+                print(f"  Processed {stats['files']} files...", end='\r')
+
+        manifest = dict(metadata or {})
+        manifest['version'] = MANIFEST_VERSION
+        manifest['store'] = self.store_path.name
+        manifest['files'] = manifest_files
+
+        tmp_file = manifest_path.with_name(manifest_path.name + '.tmp')
+        tmp_file.write_text(json.dumps(manifest, separators=(',', ':')), encoding='utf-8')
+        os.replace(tmp_file, manifest_path)
+        return stats
+
+    @staticmethod
+    def load_manifest(manifest_path: Path) -> Dict:
+        return json.loads(Path(manifest_path).read_text(encoding='utf-8'))
+
+    def restore(self, manifest_path: Path, target: Path, paths: Optional[Iterable[str]] = None,
+                jobs: int = 1) -> int:
+        """Rebuild files from a manifest into target on jobs threads; returns the number of files restored."""
+        manifest = self.load_manifest(manifest_path)
+        selected = manifest['files'] if paths is None else {
+            p: manifest['files'][p] for p in paths if p in manifest['files']
+        }
+
+        # Refuse a tampered manifest before writing anything
+        for info in selected.values():
+            for digest in info['chunks']:
+                self.object_path(digest)
+
+        for parent in sorted({os.path.dirname(p) for p in selected}):
+            (Path(target) / parent).mkdir(parents=True, exist_ok=True)
+
+        def rebuild(item: Tuple[str, Dict]):
+            relative_path, info = item
+            dest_path = Path(target) / relative_path
+            with open(dest_path, 'wb') as f:
+                for digest in info['chunks']:
+                    f.write(self.get(digest))
+            os.utime(dest_path, ns=(info['mtime_ns'], info['mtime_ns']))
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            return sum(1 for _ in pool.map(rebuild, selected.items()))
+
+    def missing_chunks(self, manifest: Dict) -> List[str]:
+        """Chunks referenced by a manifest that are not in the store."""
+        referenced = {d for info in manifest['files'].values() for d in info['chunks']}
+        return sorted(d for d in referenced if not self.object_path(d).exists())
+
+    def collect_garbage(self, manifest_paths: Iterable[Path]) -> Tuple[int, int]:
+        """Delete chunks no longer referenced by any manifest; returns (count, bytes)."""
+        live: Set[str] = set()
+        for manifest_path in manifest_paths:
+            manifest = self.load_manifest(manifest_path)
+            for info in manifest['files'].values():
+                live.update(info['chunks'])
+
+        removed = 0
+        freed = 0
+        if not self.objects_path.exists():
+            return removed, freed
+
+        for bucket in self.objects_path.iterdir():
+            for object_file in bucket.iterdir():
+                if object_file.name not in live:
+                    freed += object_file.stat().st_size
+                    object_file.unlink()
+                    removed += 1
+
+        return removed, freed
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+exclude_matcher.py
+Compiled .gitignore-style exclusion matcher for vault backups
+
+Used by backup-vault.py. Patterns are compiled once into a few combined
+regexes and literal sets, and directory matches let the vault walk skip
+whole subtrees (.trash, .obsidian/cache, ...).
+
+Pattern rules follow .gitignore:
+- '#' starts a comment and blank lines are ignored (in exclude files)
+- '!pattern' re-includes paths excluded by an earlier pattern
+- a trailing '/' only matches directories
+- a pattern containing '/' (other than trailing) is anchored at the vault
+  root; otherwise it matches a file or directory name at any depth
+- '*' and '?' do not cross '/', '**' does, '[...]' is a character class
+- a matched directory excludes everything beneath it
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+GLOB_CHARS = set('*?[')
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate a gitignore glob into a regex fragment (without anchors)."""
+    i = 0
+    n = len(pattern)
+    out = []
+    while i < n:
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+        elif char == '*':
+            out.append('[^/]*')
+            i += 1
+        elif char == '?':
+            out.append('[^/]')
+            i += 1
+        elif char == '[':
+            end = pattern.find(']', i + 2)
+            if end < 0:
+                out.append(re.escape(char))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            out.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        else:
+            out.append(re.escape(char))
+            i += 1
+    return ''.join(out)
+
+
+def read_exclude_file(path: str) -> List[str]:
+    """Read patterns from a .gitignore-style file."""
+    patterns = []
+    for line in Path(path).read_text(encoding='utf-8').splitlines():
+        line = line.rstrip()
+        if line.endswith('\\'):
+            line += ' '
+        if line and not line.startswith('#'):
+            patterns.append(line)
+    return patterns
+
+
+class PatternBlock:
+    """Consecutive patterns with the same sign, compiled into one matcher."""
+
+    def __init__(self, negate: bool):
+        self.negate = negate
+        self.names = set()          # literal names at any depth
+        self.dir_names = set()
+        self.paths = set()          # literal anchored paths
+        self.dir_paths = set()
+        self.name_regexes: List[str] = []
+        self.dir_name_regexes: List[str] = []
+        self.path_regexes: List[str] = []
+        self.dir_path_regexes: List[str] = []
+
+    def add(self, pattern: str):
+        dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        anchored = '/' in pattern
+        pattern = pattern.lstrip('/')
+        literal = not (GLOB_CHARS & set(pattern))
+
+        if anchored:
+            if literal:
+                (self.dir_paths if dir_only else self.paths).add(pattern)
+            else:
+                (self.dir_path_regexes if dir_only else self.path_regexes).append(glob_to_regex(pattern))
+        else:
+            if literal:
+                (self.dir_names if dir_only else self.names).add(pattern)
+            else:
+                (self.dir_name_regexes if dir_only else self.name_regexes).append(glob_to_regex(pattern))
+
+    def compile(self):
+        def combined(regexes):
+            return re.compile('(?:' + '|'.join(regexes) + r')\Z') if regexes else None
+
+        self.name_regex = combined(self.name_regexes)
+        self.dir_name_regex = combined(self.dir_name_regexes)
+        self.path_regex = combined(self.path_regexes)
+        self.dir_path_regex = combined(self.dir_path_regexes)
+
+    def matches(self, path: str, name: str, is_dir: bool) -> bool:
+        if name in self.names or path in self.paths:
+            return True
+        if self.name_regex and self.name_regex.match(name):
+            return True
+        if self.path_regex and self.path_regex.match(path):
+            return True
+        if is_dir:
+            if name in self.dir_names or path in self.dir_paths:
+                return True
+            if self.dir_name_regex and self.dir_name_regex.match(name):
+                return True
+            if self.dir_path_regex and self.dir_path_regex.match(path):
+                return True
+        return False
+
+
+class ExcludeMatcher:
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+        self.blocks: List[PatternBlock] = []
+
+        for pattern in self.patterns:
+            negate = pattern.startswith('!')
+            if negate:
+                pattern = pattern[1:]
+            elif pattern.startswith('\\!') or pattern.startswith('\\#'):
+                pattern = pattern[1:]
+            if not pattern.strip('/'):
+                continue
+
+            if not self.blocks or self.blocks[-1].negate != negate:
+                self.blocks.append(PatternBlock(negate))
+            self.blocks[-1].add(pattern)
+
+        for block in self.blocks:
+            block.compile()
+
+        self.dir_cache: Dict[str, bool] = {}
+
+    def matches(self, path: str, is_dir: bool = False) -> bool:
+        """Whether path itself is excluded (ignoring its parent directories)."""
+        name = path.rsplit('/', 1)[-1]
+        # Last matching pattern wins, so check blocks from the end
+        for block in reversed(self.blocks):
+            if block.matches(path, name, is_dir):
+                return not block.negate
+        return False
+
+    def excludes_dir(self, relative_dir: str) -> bool:
+        """Whether a directory (and so its whole subtree) is excluded."""
+        relative_dir = relative_dir.replace(os.sep, '/')
+        cached = self.dir_cache.get(relative_dir)
+        if cached is None:
+            parent = relative_dir.rsplit('/', 1)[0] if '/' in relative_dir else ''
+            cached = (bool(parent) and self.excludes_dir(parent)) or self.matches(relative_dir, is_dir=True)
+            self.dir_cache[relative_dir] = cached
+        return cached
+
+    def is_excluded(self, relative_path: str) -> bool:
+        """Whether a file is excluded, either directly or through a parent directory."""
+        relative_path = relative_path.replace(os.sep, '/')
+        if '/' in relative_path and self.excludes_dir(relative_path.rsplit('/', 1)[0]):
+            return True
+        return self.matches(relative_path)
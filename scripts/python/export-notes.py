@@ -5,105 +5,321 @@ Export Obsidian notes to various formats
 
 Usage:
     python export-notes.py --vault /path/to/vault --format markdown --output ./export/
+    python export-notes.py --vault /path/to/vault --format markdown --output ./export/ --clean-links
     python export-notes.py --vault /path/to/vault --format html --output ./export/ --filter "tag:project"
+    python export-notes.py --vault /path/to/vault --format json --output ./export/ --filter "folder:Work AND NOT tag:archived AND modified>2024-01-01"
+    python export-notes.py --vault /path/to/vault --format markdown --output ./export/ --filter=-tag:draft
     python export-notes.py --vault /path/to/vault --format pdf --output ./export/ --single-file
+    python export-notes.py --vault /path/to/vault --format jsonl --output ./export/
+    python export-notes.py --vault /path/to/vault --format html --output ./export/ --workers 8
+    python export-notes.py --vault /path/to/vault --format html --output ./site/ --incremental
+    python export-notes.py --vault /mnt/nfs/vault --format json --output ./export/ --read-ahead 64
 
 Supports:
-- Markdown (with cleaned links)
-- HTML (styled)
+- Markdown (wiki links optionally rewritten to relative links)
+- HTML (styled, wiki links point to the exported pages)
+- Attachments that exported notes link to or embed are copied into the
+  output (HTML, and Markdown with --clean-links)
 - PDF (requires wkhtmltopdf)
-- JSON (structured data)
+- JSON (structured data, streamed note by note)
+- JSON Lines (one note per line)
 - Plain text
 """
 
 import argparse
 import os
-import re
 import json
-import yaml
+import hashlib
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import shutil
 
+import copy_engine
+from export_links import ExportLinks, markdown_anchor
+from note_frontmatter import parse_frontmatter, read_frontmatter
+from note_query import compile_query
+from note_transforms import clean_text, strip_frontmatter
+from read_ahead import DEFAULT_READ_AHEAD, read_ahead, read_note, read_note_with_stat
+from vault_index import VaultIndex, json_default
+
+
+HTML_EXTENSIONS = ['extra', 'codehilite', 'toc']
+
+# Written to the output directory by --incremental; bump the version when the
+# rendered output of any format changes so old exports are regenerated
+EXPORT_MANIFEST = '.export-manifest.json'
+EXPORT_MANIFEST_VERSION = 3
+
+# Per-process Markdown renderer and link map, set once by init_html_worker
+_markdown_renderer = None
+_export_links: Optional[ExportLinks] = None
+
+# (source file, vault-relative path, output file or None, title)
+HtmlTask = Tuple[str, str, Optional[str], str]
+
+
+def init_html_worker(links: Optional[ExportLinks] = None):
+    """Create this process's Markdown renderer (process pool initializer)."""
+    global _markdown_renderer, _export_links
+    import markdown
+    _markdown_renderer = markdown.Markdown(extensions=HTML_EXTENSIONS)
+    _export_links = links
+
+
+def render_html_batch(batch: List[HtmlTask], max_in_flight: int = 1) -> List[Optional[str]]:
+    """Process pool task: render a batch of notes, see render_html_tasks."""
+    return list(render_html_tasks(batch, max_in_flight))
+
+
+def render_html_tasks(tasks: Iterable[HtmlTask], max_in_flight: int = 1) -> Iterator[Optional[str]]:
+    """Render notes with this process's renderer, rewriting wiki links with its link map.
+    
+    Notes with an output path are written directly and yield None; the others
+    yield a fragment for the single-file export. Sources are read up to
+    max_in_flight notes ahead of rendering.
+    """
+    md = _markdown_renderer
+    links = _export_links
+    
+    for (source, relative_path, output, title), content in read_ahead(tasks, lambda task: read_note(task[0]), max_in_flight):
+        content = strip_frontmatter(content)
+        if links is not None:
+            content = links.rewrite(content, relative_path)
+        body = md.convert(content)
+        md.reset()
+        
+        if output is None:
+            section = f' id="{links.section_id(relative_path)}"' if links is not None else ''
+            yield f"<h1{section}>{title}</h1>\n" + body + "<hr>\n"
+        else:
+            output_file = Path(output)
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            output_file.write_text(generate_html_header(title) + body + "</body></html>", encoding='utf-8')
+            yield None
+
 
 class ObsidianExporter:
-    def __init__(self, vault_path: str, output_path: str):
+    def __init__(self, vault_path: str, output_path: str, index_path: Optional[str] = None,
+                 read_ahead: int = DEFAULT_READ_AHEAD):
         self.vault_path = Path(vault_path)
         self.output_path = Path(output_path)
         self.output_path.mkdir(parents=True, exist_ok=True)
+        self.read_ahead = read_ahead
+        self.index = VaultIndex(vault_path, index_path, read_ahead=read_ahead)
+        self.export_manifest: Optional[Dict] = None
+        self.links: Optional[ExportLinks] = None
         
     def get_all_notes(self, filter_str: Optional[str] = None) -> List[Path]:
         """Get all markdown files in vault, optionally filtered."""
-        notes = list(self.vault_path.rglob("*.md"))
-        
         if filter_str:
-            notes = self.filter_notes(notes, filter_str)
+            # Only the matching notes are materialized, not the whole vault
+            matches = compile_query(filter_str).evaluate(self.index)
+            return [self.vault_path / path for path in sorted(matches)]
         
-        return notes
+        return [self.vault_path / entry.path for entry in self.index.notes()]
     
     def filter_notes(self, notes: List[Path], filter_str: str) -> List[Path]:
-        """Filter notes based on criteria."""
-        filtered = []
+        """Filter notes with a query expression (see note_query.py for the syntax)."""
+        matches = compile_query(filter_str).evaluate(self.index)
+        return [note for note in notes if str(note.relative_to(self.vault_path)) in matches]
+    
+    def get_metadata(self, note: Path) -> Optional[Dict]:
+        """Get a note's frontmatter from the vault index, parsing the file if it is not indexed."""
+        try:
+            entry = self.index.get(str(note.relative_to(self.vault_path)))
+        except ValueError:
+            entry = None
         
-        for note in notes:
-            content = note.read_text(encoding='utf-8')
-            
-            # Parse frontmatter
-            metadata = self.parse_frontmatter(content)
-            
-            if filter_str.startswith("tag:"):
-                tag = filter_str.split(":", 1)[1]
-                if metadata and 'tags' in metadata:
-                    tags = metadata['tags']
-                    if isinstance(tags, list) and tag in tags:
-                        filtered.append(note)
-                    elif isinstance(tags, str) and tag in tags:
-                        filtered.append(note)
-            
-            elif filter_str.startswith("folder:"):
-                folder = filter_str.split(":", 1)[1]
-                if folder in str(note):
-                    filtered.append(note)
-            
-            elif filter_str.startswith("type:"):
-                note_type = filter_str.split(":", 1)[1]
-                if metadata and metadata.get('type') == note_type:
-                    filtered.append(note)
+        if entry is not None:
+            return entry.frontmatter
         
-        return filtered
+        # Not indexed: read only the header, never the note body
+        return read_frontmatter(note)
     
     def parse_frontmatter(self, content: str) -> Optional[Dict]:
         """Parse YAML frontmatter from note."""
-        if not content.startswith("---"):
-            return None
+        return parse_frontmatter(content)
+    
+    def build_link_map(self, notes: List[Path], export_format: str, single_file: bool = False) -> ExportLinks:
+        """Map every vault file to its output path, once per run, for rewriting wiki links.
         
-        try:
-            parts = content.split("---", 2)
-            if len(parts) >= 3:
-                return yaml.safe_load(parts[1])
-        except:
-            pass
+        notes are all the notes of the export, including unchanged ones in an
+        incremental run, so links to them still resolve.
+        """
+        if export_format == 'html':
+            try:
+                # Anchors must match the ids the toc extension gives headings
+                from markdown.extensions.toc import slugify
+                slugify = partial(slugify, separator='-')
+            except ImportError:
+                slugify = markdown_anchor
+            suffix = '.html'
+        else:
+            slugify = markdown_anchor
+            suffix = '.md'
+        
+        self.index.ensure_fresh()
+        self.links = ExportLinks([entry.path for entry in self.index.files()],
+                                 (str(note.relative_to(self.vault_path)) for note in notes),
+                                 suffix, slugify, single_file)
+        return self.links
+    
+    def copy_attachments(self, notes: List[Path]) -> int:
+        """Copy the attachments linked or embedded by notes into the export, at their vault paths.
+        
+        Needs the link map (build_link_map). Copies already in the output
+        with the same size and mtime are kept; returns the number copied.
+        """
+        nodes = set()
+        for note in notes:
+            relative_path = str(note.relative_to(self.vault_path))
+            entry = self.index.get(relative_path)
+            if entry is not None:
+                nodes.update(self.links.attachments(relative_path, entry.references))
+        
+        tasks = []
+        for node in sorted(nodes):
+            entry = self.index.get(self.links.graph.paths[node])
+            output = self.links.outputs[node]
+            if entry is not None and not copy_engine.same_stat(self.output_path / output,
+                                                               entry.size, entry.mtime_ns):
+                tasks.append((self.index.full_path(entry), output, entry.size, entry.mtime_ns))
         
-        return None
+        if not tasks:
+            return 0
+        return copy_engine.copy_files(tasks, self.output_path, max(1, self.read_ahead), hash_files=False)['copied']
+    
+    def output_files(self, relative_path: str, export_format: str, single_file: bool = False) -> List[str]:
+        """Output files (relative to the output directory) produced for a note."""
+        if export_format in ('json', 'jsonl'):
+            return [f"export.{export_format}"]
+        if export_format == 'html' and single_file:
+            return ["export.html"]
+        
+        suffix = {'markdown': '.md', 'html': '.html', 'text': '.txt'}[export_format]
+        return [str(Path(relative_path).with_suffix(suffix))]
+    
+    def plan_incremental_export(self, notes: List[Path], export_format: str,
+                                options: Dict) -> Tuple[List[Path], int]:
+        """Compare notes with the last export's manifest.
+        
+        Returns the notes whose content changed and the number of notes that
+        were removed (or filtered out) since then. Outputs that no current note
+        produces are deleted. If the format or options differ from the last
+        run, every note counts as changed, and with a link map (see
+        build_link_map) so does a note whose links now point elsewhere. Call
+        save_export_manifest() once the export has been written.
+        """
+        manifest_file = self.output_path / EXPORT_MANIFEST
+        previous = {}
+        
+        if manifest_file.exists():
+            try:
+                previous = json.loads(manifest_file.read_text(encoding='utf-8'))
+            except ValueError:
+                pass
+        
+        # Old entries are always used to find stale outputs, but only reused
+        # for change detection when the export settings are the same
+        stale = previous.get('notes', {})
+        previous_notes = stale
+        if stale and (previous.get('version') != EXPORT_MANIFEST_VERSION
+                      or previous.get('format') != export_format
+                      or previous.get('options') != options):
+            print("♻️  Export format or options changed, re-exporting all notes")
+            previous_notes = {}
+        
+        self.index.ensure_fresh()
+        
+        def check(note: Path) -> Tuple[str, int, int, str, Optional[str]]:
+            relative_path = str(note.relative_to(self.vault_path))
+            entry = self.index.get(relative_path)
+            if entry is not None:
+                size, mtime_ns = entry.size, entry.mtime_ns
+            else:
+                stat = note.stat()
+                size, mtime_ns = stat.st_size, stat.st_mtime_ns
+            links = self.links.digest(relative_path, entry.references) if self.links and entry else None
+            
+            old = previous_notes.get(relative_path)
+            if old and old['size'] == size and old['mtime_ns'] == mtime_ns:
+                return relative_path, size, mtime_ns, old['hash'], links
+            content_hash = hashlib.blake2b(note.read_bytes(), digest_size=16).hexdigest()
+            return relative_path, size, mtime_ns, content_hash, links
+        
+        current = {}
+        changed = []
+        
+        # Stats and hashes of modified notes are read ahead of this loop
+        for note, (relative_path, size, mtime_ns, content_hash, links) in read_ahead(notes, check, self.read_ahead):
+            old = previous_notes.get(relative_path)
+            if not old or old['hash'] != content_hash or old.get('links') != links:
+                changed.append(note)
+            
+            current[relative_path] = {
+                'size': size,
+                'mtime_ns': mtime_ns,
+                'hash': content_hash,
+                'links': links,
+                'outputs': self.output_files(relative_path, export_format, options.get('single_file', False)),
+            }
+        
+        # Delete outputs whose sources are gone (or belong to a previous format)
+        live_outputs = {output for record in current.values() for output in record['outputs']}
+        output_root = self.output_path.resolve()
+        removed = 0
+        for relative_path, record in stale.items():
+            if relative_path not in current:
+                removed += 1
+            for output in record.get('outputs', []):
+                if output in live_outputs:
+                    continue
+                # The manifest is only trusted for files inside the output directory
+                output_file = (output_root / output).resolve()
+                if output_root not in output_file.parents:
+                    print(f"⚠️  Skipping stale output outside the export: {output}")
+                    continue
+                output_file.unlink(missing_ok=True)
+        
+        self.export_manifest = {
+            'version': EXPORT_MANIFEST_VERSION,
+            'format': export_format,
+            'options': options,
+            'exported': datetime.now().isoformat(),
+            'notes': current,
+        }
+        
+        return changed, removed
+    
+    def save_export_manifest(self):
+        """Write the manifest prepared by plan_incremental_export."""
+        if self.export_manifest is None:
+            return
+        
+        manifest_file = self.output_path / EXPORT_MANIFEST
+        tmp_file = manifest_file.with_name(manifest_file.name + '.tmp')
+        tmp_file.write_text(json.dumps(self.export_manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_file, manifest_file)
     
     def export_to_markdown(self, notes: List[Path], clean_links: bool = True):
         """Export notes to clean markdown."""
         print(f"Exporting {len(notes)} notes to Markdown...")
         
-        for note in notes:
-            content = note.read_text(encoding='utf-8')
+        links = None
+        if clean_links:
+            links = self.links or self.build_link_map(notes, 'markdown')
+        
+        for note, content in read_ahead(notes, read_note, self.read_ahead):
+            relative_path = note.relative_to(self.vault_path)
             
-            if clean_links:
-                # Convert [[wiki links]] to [wiki links](wiki-links.md)
-                content = re.sub(
-                    r'\[\[([^\]|]+)(?:\|([^\]]+))?\]\]',
-                    lambda m: f"[{m.group(2) or m.group(1)}]({m.group(1).replace(' ', '-').lower()}.md)",
-                    content
-                )
+            if links is not None:
+                # [[Note#Heading|alias]] -> [alias](../Folder/Note.md#heading)
+                content = links.rewrite(content, str(relative_path))
             
             # Create output path maintaining folder structure
-            relative_path = note.relative_to(self.vault_path)
             output_file = self.output_path / relative_path
             output_file.parent.mkdir(parents=True, exist_ok=True)
             
@@ -111,58 +327,124 @@ class ObsidianExporter:
         
         print(f"✅ Exported to {self.output_path}")
     
-    def export_to_html(self, notes: List[Path], single_file: bool = False):
-        """Export notes to HTML."""
+    def export_to_html(self, notes: List[Path], single_file: bool = False, workers: int = 1):
+        """Export notes to HTML, rendering on a process pool when workers > 1."""
         print(f"Exporting {len(notes)} notes to HTML...")
         
+        # Check before starting workers, which create their own renderers
         try:
             import markdown
         except ImportError:
             print("❌ Error: 'markdown' package required. Install: pip install markdown")
             return
         
-        md = markdown.Markdown(extensions=['extra', 'codehilite', 'toc'])
+        links = self.links or self.build_link_map(notes, 'html', single_file)
+        
+        tasks = []
+        for note in notes:
+            relative_path = note.relative_to(self.vault_path)
+            output = None if single_file else str(self.output_path / relative_path.with_suffix('.html'))
+            tasks.append((str(note), str(relative_path), output, note.stem))
+        
+        fragments = self.render_html(tasks, links, workers)
         
         if single_file:
-            html_content = self.generate_html_header("Obsidian Export")
-            
-            for note in notes:
-                content = note.read_text(encoding='utf-8')
-                # Remove frontmatter
-                content = re.sub(r'^---.*?---\s*', '', content, flags=re.DOTALL)
-                
-                html_content += f"<h1>{note.stem}</h1>\n"
-                html_content += md.convert(content)
-                html_content += "<hr>\n"
-                md.reset()
-            
-            html_content += "</body></html>"
-            
             output_file = self.output_path / "export.html"
-            output_file.write_text(html_content, encoding='utf-8')
-            
+            with open(output_file, 'w', encoding='utf-8', buffering=1024 * 1024) as f:
+                f.write(self.generate_html_header("Obsidian Export"))
+                for fragment in fragments:
+                    f.write(fragment)
+                f.write("</body></html>")
         else:
-            for note in notes:
-                content = note.read_text(encoding='utf-8')
-                # Remove frontmatter
-                content = re.sub(r'^---.*?---\s*', '', content, flags=re.DOTALL)
-                
-                html_content = self.generate_html_header(note.stem)
-                html_content += md.convert(content)
-                html_content += "</body></html>"
-                md.reset()
-                
-                relative_path = note.relative_to(self.vault_path)
-                output_file = self.output_path / relative_path.with_suffix('.html')
-                output_file.parent.mkdir(parents=True, exist_ok=True)
-                
-                output_file.write_text(html_content, encoding='utf-8')
+            # Each note's file is written by the renderer; just drain the results
+            for _ in fragments:
+                pass
         
         print(f"✅ Exported to {self.output_path}")
     
+    def render_html(self, tasks: List[HtmlTask], links: Optional[ExportLinks] = None,
+                    workers: int = 1) -> Iterator[Optional[str]]:
+        """Render HTML tasks in batches, yielding results in the original order."""
+        if workers <= 1:
+            init_html_worker(links)
+            yield from render_html_tasks(tasks, self.read_ahead)
+            return
+        
+        batch_size = max(1, min(64, len(tasks) // (workers * 8)))
+        batches = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+        
+        # The link map is sent to each worker once, not with every batch
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_html_worker, initargs=(links,)) as pool:
+            render_batch = partial(render_html_batch, max_in_flight=self.read_ahead)
+            for results in pool.map(render_batch, batches):
+                yield from results
+    
     def generate_html_header(self, title: str) -> str:
         """Generate HTML header with styling."""
-        return f"""<!DOCTYPE html>
+        return generate_html_header(title)
+    
+    def export_to_json(self, notes: List[Path], json_lines: bool = False):
+        """Export notes to JSON (or JSON Lines) with metadata.
+        
+        Notes are written one at a time, so memory use is bounded by the
+        largest note rather than the size of the vault.
+        """
+        print(f"Exporting {len(notes)} notes to {'JSON Lines' if json_lines else 'JSON'}...")
+        
+        output_file = self.output_path / ("export.jsonl" if json_lines else "export.json")
+        
+        with open(output_file, 'w', encoding='utf-8', buffering=1024 * 1024) as f:
+            if not json_lines:
+                f.write("[")
+            
+            prefetched = read_ahead(notes, read_note_with_stat, self.read_ahead)
+            for i, (note, (content, stat)) in enumerate(prefetched):
+                metadata = self.parse_frontmatter(content)
+                
+                note_data = {
+                    'filename': note.name,
+                    'path': str(note.relative_to(self.vault_path)),
+                    'metadata': metadata,
+                    'content': strip_frontmatter(content),
+                    'created': stat.st_ctime,
+                    'modified': stat.st_mtime,
+                }
+                
+                if json_lines:
+                    f.write(json.dumps(note_data, ensure_ascii=False, default=json_default))
+                    f.write("\n")
+                else:
+                    # Same layout as json.dumps(list, indent=2), one element at a time
+                    element = json.dumps(note_data, indent=2, ensure_ascii=False, default=json_default)
+                    f.write(",\n  " if i else "\n  ")
+                    f.write(element.replace("\n", "\n  "))
+            
+            if not json_lines:
+                f.write("\n]" if notes else "]")
+        
+        print(f"✅ Exported to {output_file}")
+    
+    def export_to_text(self, notes: List[Path]):
+        """Export notes to plain text."""
+        print(f"Exporting {len(notes)} notes to plain text...")
+        
+        for note, content in read_ahead(notes, read_note, self.read_ahead):
+            
+            # Remove frontmatter and markdown formatting (code blocks are kept as-is)
+            content = clean_text(strip_frontmatter(content))
+            
+            relative_path = note.relative_to(self.vault_path)
+            output_file = self.output_path / relative_path.with_suffix('.txt')
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            
+            output_file.write_text(content, encoding='utf-8')
+        
+        print(f"✅ Exported to {self.output_path}")
+
+
+def generate_html_header(title: str) -> str:
+    """Generate HTML header with styling."""
+    return f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -221,93 +503,83 @@ class ObsidianExporter:
 </head>
 <body>
 """
-    
-    def export_to_json(self, notes: List[Path]):
-        """Export notes to JSON with metadata."""
-        print(f"Exporting {len(notes)} notes to JSON...")
-        
-        data = []
-        
-        for note in notes:
-            content = note.read_text(encoding='utf-8')
-            metadata = self.parse_frontmatter(content)
-            
-            # Remove frontmatter from content
-            clean_content = re.sub(r'^---.*?---\s*', '', content, flags=re.DOTALL)
-            
-            note_data = {
-                'filename': note.name,
-                'path': str(note.relative_to(self.vault_path)),
-                'metadata': metadata,
-                'content': clean_content,
-                'created': note.stat().st_ctime,
-                'modified': note.stat().st_mtime,
-            }
-            
-            data.append(note_data)
-        
-        output_file = self.output_path / "export.json"
-        output_file.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding='utf-8')
-        
-        print(f"✅ Exported to {output_file}")
-    
-    def export_to_text(self, notes: List[Path]):
-        """Export notes to plain text."""
-        print(f"Exporting {len(notes)} notes to plain text...")
-        
-        for note in notes:
-            content = note.read_text(encoding='utf-8')
-            
-            # Remove frontmatter
-            content = re.sub(r'^---.*?---\s*', '', content, flags=re.DOTALL)
-            
-            # Remove markdown formatting
-            content = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', content)  # Links
-            content = re.sub(r'\[\[([^\]]+)\]\]', r'\1', content)  # Wiki links
-            content = re.sub(r'[*_]{1,2}([^*_]+)[*_]{1,2}', r'\1', content)  # Bold/italic
-            content = re.sub(r'^#+\s+', '', content, flags=re.MULTILINE)  # Headers
-            
-            relative_path = note.relative_to(self.vault_path)
-            output_file = self.output_path / relative_path.with_suffix('.txt')
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            output_file.write_text(content, encoding='utf-8')
-        
-        print(f"✅ Exported to {self.output_path}")
 
 
 def main():
     parser = argparse.ArgumentParser(description='Export Obsidian notes to various formats')
     parser.add_argument('--vault', required=True, help='Path to Obsidian vault')
     parser.add_argument('--format', required=True, 
-                       choices=['markdown', 'html', 'json', 'text'],
+                       choices=['markdown', 'html', 'json', 'jsonl', 'text'],
                        help='Export format')
     parser.add_argument('--output', required=True, help='Output directory')
-    parser.add_argument('--filter', help='Filter notes (e.g., "tag:project", "folder:Work", "type:task")')
+    parser.add_argument('--filter',
+                       help='Filter notes, e.g. "tag:project", "folder:Work AND NOT type:task", '
+                            '"(tag:a OR tag:b) created>=2024-01-01", "modified>2024-05-01". '
+                            'A filter starting with "-" must be attached with "=", e.g. --filter=-tag:draft '
+                            '(or write "NOT tag:draft")')
     parser.add_argument('--single-file', action='store_true', help='Combine all notes into single file (HTML only)')
-    parser.add_argument('--clean-links', action='store_true', help='Clean wiki links in markdown export')
+    parser.add_argument('--clean-links', action='store_true',
+                       help='Rewrite wiki links to relative links between the exported files (markdown export)')
+    parser.add_argument('--workers', type=int, default=1, help='Processes used to render HTML')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Only re-export notes changed since the last export to this output directory')
+    parser.add_argument('--read-ahead', type=int, default=DEFAULT_READ_AHEAD,
+                       help='Files read concurrently ahead of processing; raise it on network filesystems (1 = off)')
+    parser.add_argument('--index', help='Path to the vault index database (default: user cache dir)')
     
     args = parser.parse_args()
     
-    exporter = ObsidianExporter(args.vault, args.output)
+    exporter = ObsidianExporter(args.vault, args.output, index_path=args.index, read_ahead=args.read_ahead)
     
     print(f"📂 Scanning vault: {args.vault}")
-    notes = exporter.get_all_notes(args.filter)
+    try:
+        notes = exporter.get_all_notes(args.filter)
+    except ValueError as e:
+        print(f"❌ Invalid filter: {e}")
+        return
     print(f"Found {len(notes)} notes")
     
     if len(notes) == 0:
         print("No notes found matching criteria")
         return
     
+    if args.format == 'html' or (args.format == 'markdown' and args.clean_links):
+        # Built from every exported note, before --incremental narrows the list
+        exporter.build_link_map(notes, args.format, args.single_file)
+        # Links to attachments point at their vault paths under the output
+        copied = exporter.copy_attachments(notes)
+        if copied:
+            print(f"📎 Copied {copied} attachments")
+    
+    if args.incremental:
+        options = {'single_file': args.single_file, 'clean_links': args.clean_links}
+        changed, removed = exporter.plan_incremental_export(notes, args.format, options)
+        print(f"♻️  {len(changed)} changed, {removed} removed since the last export")
+        
+        single_output = args.format in ('json', 'jsonl') or (args.format == 'html' and args.single_file)
+        if single_output:
+            # One combined file: rewrite it all, but only when something changed
+            notes = notes if changed or removed else []
+        else:
+            notes = changed
+        
+        if not notes:
+            exporter.save_export_manifest()
+            print("\n✨ Export is up to date!")
+            return
+    
     if args.format == 'markdown':
         exporter.export_to_markdown(notes, clean_links=args.clean_links)
     elif args.format == 'html':
-        exporter.export_to_html(notes, single_file=args.single_file)
+        exporter.export_to_html(notes, single_file=args.single_file, workers=args.workers)
     elif args.format == 'json':
         exporter.export_to_json(notes)
+    elif args.format == 'jsonl':
+        exporter.export_to_json(notes, json_lines=True)
     elif args.format == 'text':
         exporter.export_to_text(notes)
     
+    exporter.save_export_manifest()
     print("\n✨ Export complete!")
 
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+export_links.py
+Wiki link rewriting for export-notes.py
+
+Built once per export run. Every vault file's output path is known up front
+(exported notes keep their folder and get the format's suffix, attachments
+keep their vault path; export-notes.py copies the attachments that exported
+notes reference into the output, see attachments()), and link targets are resolved the way Obsidian does
+through link_graph.LinkGraph's path and basename hash maps, so each link
+costs a dict lookup however large the vault is:
+
+- [[Note]], [[Note|alias]]  -> [alias](../Folder/Note.md)
+- [[Note#Heading]]          -> [Note > Heading](../Folder/Note.md#heading)
+- [[#Heading]]              -> [Heading](#heading)
+- ![[image.png]]            -> ![image.png](../attachments/image.png)
+- ![[Note]]                 -> a link to the note (there is no transclusion)
+
+Links to notes outside the export (filtered out) or to nothing keep their
+label as plain text. In a single-file export, links point to each note's
+section of the page.
+"""
+
+import hashlib
+import posixpath
+import re
+from typing import Callable, Iterable, Iterator, List, Match, Optional
+from urllib.parse import quote
+
+from link_graph import LinkGraph, link_key
+from note_transforms import rewrite_references
+
+ANCHOR_DROP_PATTERN = re.compile(r'[^\w\- ]')
+
+
+def markdown_anchor(heading: str) -> str:
+    """GitHub-style heading anchor: lower case, punctuation dropped, spaces to '-'."""
+    return ANCHOR_DROP_PATTERN.sub('', heading.strip().lower()).replace(' ', '-')
+
+
+def relative_url(path: str, base_dir: str) -> str:
+    """'/'-separated path relative to base_dir (both relative to the output root)."""
+    if not base_dir:
+        return path
+    base = base_dir.split('/')
+    parts = path.split('/')
+    common = 0
+    while common < len(base) and common < len(parts) - 1 and base[common] == parts[common]:
+        common += 1
+    return '../' * (len(base) - common) + '/'.join(parts[common:])
+
+
+class ExportLinks:
+    def __init__(self, paths: List[str], exported: Iterable[str], suffix: str,
+                 slugify: Callable[[str], str] = markdown_anchor, single_file: bool = False):
+        """paths: every vault file; exported: the notes being exported (vault-relative)."""
+        exported = {link_key(path) for path in exported}
+        self.graph = LinkGraph(paths, ())
+        self.slugify = slugify
+        self.single_file = single_file
+        self.outputs: List[Optional[str]] = []
+        self.is_note: List[bool] = []
+        for path, key in zip(paths, self.graph.keys):
+            path = path.replace('\\', '/')
+            is_note = path.endswith('.md')
+            self.is_note.append(is_note)
+            if not is_note:
+                self.outputs.append(path)
+            elif key in exported:
+                self.outputs.append(path[:-3] + suffix)
+            else:
+                self.outputs.append(None)
+
+    def node(self, relative_path: str) -> Optional[int]:
+        return self.graph.by_path.get(link_key(relative_path))
+
+    def section_id(self, relative_path: str) -> str:
+        """Id of a note's section in a single-file export."""
+        return 'note-' + markdown_anchor(link_key(relative_path).replace('/', '-'))
+
+    def url(self, node: Optional[int], heading: Optional[str], source: Optional[int]) -> Optional[str]:
+        """Relative URL of a link from source to node, or None if node is not in the export."""
+        if node is None or self.outputs[node] is None:
+            return None
+        # Block ids (^id) have no anchor in the output, so they link to the note
+        anchor = '#' + quote(self.slugify(heading)) if heading and not heading.startswith('^') else ''
+        if node == source and anchor:
+            return anchor
+
+        if self.single_file:
+            if self.is_note[node]:
+                return '#' + self.section_id(self.graph.paths[node])
+            base = ''
+        else:
+            base = posixpath.dirname(self.outputs[source]) if source is not None and self.outputs[source] else ''
+        return quote(relative_url(self.outputs[node], base)) + anchor
+
+    def rewrite(self, content: str, relative_path: str) -> str:
+        """Replace a note's wiki links and embeds with markdown links to the export's files."""
+        source = self.node(relative_path)
+
+        def replace(match: Match) -> str:
+            target = match.group('target').strip()
+            heading = match.group('heading')
+            node = self.graph.resolve(target, source)
+            url = self.url(node, heading, source)
+            if url and match.group('embed') and not self.is_note[node]:
+                return f"![{posixpath.basename(target)}]({url})"
+            label = match.group('alias') or (f"{target} > {heading}" if target and heading else target or heading)
+            return f"[{label}]({url})" if url else label
+
+        return rewrite_references(content, replace)
+
+    def attachments(self, relative_path: str, references: List[List]) -> Iterator[int]:
+        """Nodes of the attachments a note links to or embeds, to copy into the export."""
+        source = self.node(relative_path)
+        for target, _, _ in references:
+            node = self.graph.resolve(target, source)
+            if node is not None and not self.is_note[node]:
+                yield node
+
+    def digest(self, relative_path: str, references: List[List]) -> str:
+        """Hash of where a note's links point, to re-export it when a target moves or appears."""
+        source = self.node(relative_path)
+        urls = '\n'.join(self.url(self.graph.resolve(target, source), heading, source) or ''
+                         for target, heading, _ in references)
+        return hashlib.blake2b(urls.encode('utf-8'), digest_size=8).hexdigest()
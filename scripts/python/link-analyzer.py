@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+link-analyzer.py
+Analyze the wikilink graph of an Obsidian vault
+
+Usage:
+    python link-analyzer.py --vault /path/to/vault
+    python link-analyzer.py --vault /path/to/vault --output links-report.md
+    python link-analyzer.py --vault /path/to/vault --backlinks "Project Plan"
+    python link-analyzer.py --vault /path/to/vault --broken
+    python link-analyzer.py --vault /path/to/vault --orphans --components
+
+Features:
+- Backlinks of any note
+- Broken links (missing notes, attachments, headings and ^blocks)
+- Orphan notes (no links in or out)
+- Connected components (islands of notes)
+- Obsidian link resolution: vault paths, note names, partial paths
+- Built from the shared vault index, so unchanged notes are never re-read
+"""
+
+import argparse
+import time
+from pathlib import Path
+from datetime import datetime
+from typing import List
+
+from link_graph import LinkGraph
+from read_ahead import DEFAULT_READ_AHEAD
+from vault_index import VaultIndex
+
+
+class LinkAnalyzer:
+    def __init__(self, vault_path: str, index_path: str = None, workers: int = 1,
+                 read_ahead: int = DEFAULT_READ_AHEAD):
+        self.vault_path = Path(vault_path)
+        self.index = VaultIndex(vault_path, index_path, workers=workers, read_ahead=read_ahead)
+        self.graph: LinkGraph = None
+
+    def build_graph(self) -> LinkGraph:
+        """Build the link graph from the vault index."""
+        print(f"📂 Scanning vault: {self.vault_path}")
+        self.index.ensure_fresh()
+
+        start = time.perf_counter()
+        self.graph = LinkGraph.build(self.index)
+        elapsed = time.perf_counter() - start
+
+        print(f"🔗 {len(self.graph.notes)} notes, {self.graph.link_count} links, "
+              f"{len(self.graph.broken)} broken ({elapsed:.2f}s, "
+              f"{self.graph.memory_bytes() / 1024:.0f} KB of adjacency)")
+        return self.graph
+
+    def names(self, nodes: List[int]) -> List[str]:
+        return [self.graph.paths[node] for node in nodes]
+
+    def print_backlinks(self, note: str):
+        node = self.graph.node(note)
+        if node is None:
+            print(f"❌ No note matches '{note}'")
+            return
+        backlinks = self.names(self.graph.backlinks(node))
+        print(f"\n⬅️  {len(backlinks)} notes link to {self.graph.paths[node]}:\n")
+        for path in sorted(backlinks):
+            print(f"- {path}")
+
+    def print_broken(self):
+        print(f"\n💔 {len(self.graph.broken)} broken links:\n")
+        for link in sorted(self.graph.broken, key=lambda l: (self.graph.paths[l.source], l.text)):
+            print(f"- {self.graph.paths[link.source]}: [[{link.text}]] ({link.reason})")
+
+    def print_orphans(self):
+        orphans = sorted(self.names(self.graph.orphans()))
+        print(f"\n🍃 {len(orphans)} orphan notes:\n")
+        for path in orphans:
+            print(f"- {path}")
+
+    def print_components(self, limit: int = 20):
+        components = self.graph.components()
+        print(f"\n🏝️  {len(components)} connected components:\n")
+        for component in components[:limit]:
+            print(f"- {len(component)} notes, e.g. {self.graph.paths[component[0]]}")
+        if len(components) > limit:
+            print(f"... and {len(components) - limit} more")
+
+    def generate_report(self, output_path: str = None, limit: int = 20):
+        """Generate a markdown report of the link graph."""
+        print("\n📊 Generating report...")
+        graph = self.graph
+        components = graph.components()
+        orphans = sorted(self.names(graph.orphans()))
+        most_linked = sorted(graph.notes, key=lambda node: (-graph.in_degree(node), graph.paths[node]))[:limit]
+
+        report = f"""---
+type: link-analysis
+created: {datetime.now().strftime("%Y-%m-%d %H:%M")}
+tags:
+  - meta
+  - analysis
+---
+
+# 🔗 Link Analysis Report
+
+**Generated**: {datetime.now().strftime("%Y-%m-%d %H:%M")}
+**Vault**: {self.vault_path}
+
+---
+
+## 📊 Overview
+
+| Metric | Value |
+|--------|-------|
+| **Notes** | {len(graph.notes)} |
+| **Links** | {graph.link_count} |
+| **Distinct Note Connections** | {len(graph.out_targets)} |
+| **Broken Links** | {len(graph.broken)} |
+| **Orphan Notes** | {len(orphans)} |
+| **Connected Components** | {len(components)} |
+| **Largest Component** | {len(components[0]) if components else 0} notes |
+
+---
+
+## 🔥 Most Linked Notes
+
+| Rank | Note | Backlinks | Outgoing |
+|------|------|-----------|----------|
+"""
+
+        for i, node in enumerate(most_linked, 1):
+            report += f"| {i} | `{graph.paths[node]}` | {graph.in_degree(node)} | {graph.out_degree(node)} |\n"
+
+        if graph.broken:
+            report += f"""
+---
+
+## 💔 Broken Links
+
+Found {len(graph.broken)} links that do not resolve:
+
+| Note | Link | Problem |
+|------|------|---------|
+"""
+            for link in graph.broken[:limit * 5]:
+                report += f"| `{graph.paths[link.source]}` | `[[{link.text}]]` | {link.reason} |\n"
+            if len(graph.broken) > limit * 5:
+                report += f"\n... and {len(graph.broken) - limit * 5} more\n"
+
+        if orphans:
+            report += f"""
+---
+
+## 🍃 Orphan Notes
+
+{len(orphans)} notes have no links to or from other notes:
+
+"""
+            for path in orphans[:limit * 5]:
+                report += f"- `{path}`\n"
+            if len(orphans) > limit * 5:
+                report += f"\n... and {len(orphans) - limit * 5} more\n"
+
+        report += f"""
+---
+
+## 🏝️ Connected Components
+
+| Notes | Example |
+|-------|---------|
+"""
+        for component in components[:limit]:
+            report += f"| {len(component)} | `{graph.paths[component[0]]}` |\n"
+
+        report += """
+---
+
+*This report was automatically generated. Review suggestions before making changes.*
+"""
+
+        if output_path:
+            Path(output_path).write_text(report, encoding='utf-8')
+            print(f"✅ Report saved to: {output_path}")
+        else:
+            print(report)
+
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze links in Obsidian vault')
+    parser.add_argument('--vault', required=True, help='Path to Obsidian vault')
+    parser.add_argument('--output', help='Output file for report (markdown)')
+    parser.add_argument('--backlinks', metavar='NOTE', help='List the notes linking to NOTE (name or path)')
+    parser.add_argument('--broken', action='store_true', help='List broken links')
+    parser.add_argument('--orphans', action='store_true', help='List notes with no links to or from other notes')
+    parser.add_argument('--components', action='store_true', help='List connected components')
+    parser.add_argument('--limit', type=int, default=20, help='Rows per report section (default: 20)')
+    parser.add_argument('--index', help='Path to the vault index database (default: user cache dir)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Processes used to parse new or changed notes')
+    parser.add_argument('--read-ahead', type=int, default=DEFAULT_READ_AHEAD,
+                       help='Files stat()ed and read concurrently; raise it on network filesystems (1 = off)')
+
+    args = parser.parse_args()
+
+    analyzer = LinkAnalyzer(args.vault, index_path=args.index, workers=args.workers,
+                            read_ahead=args.read_ahead)
+    analyzer.build_graph()
+
+    if args.backlinks or args.broken or args.orphans or args.components:
+        if args.backlinks:
+            analyzer.print_backlinks(args.backlinks)
+        if args.broken:
+            analyzer.print_broken()
+        if args.orphans:
+            analyzer.print_orphans()
+        if args.components:
+            analyzer.print_components(args.limit)
+    else:
+        analyzer.generate_report(output_path=args.output, limit=args.limit)
+
+    print("\n✨ Analysis complete!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+link_graph.py
+Resolved wikilink graph of a vault, built from the vault index
+
+Used by link-analyzer.py. The vault index already holds every note's
+[[target#heading|alias]] and ![[embed]] references and its headings (see
+note_transforms.py), so building the graph reads no notes.
+
+Targets are resolved the way Obsidian does: an exact vault path wins,
+otherwise the file is found by name through a basename -> files hash index
+(case-insensitive, '.md' optional). A partial path ('Projects/Plan') must
+match the end of the file's path. When several files share a name, the one
+in the linking note's folder is preferred, then the one with the shortest
+path.
+
+Edges are kept as compact integer arrays in CSR form (offsets + targets,
+one array('I') each for outgoing and incoming links), so a 200k-note vault
+needs a few MB for the whole graph.
+
+Usage:
+    from link_graph import LinkGraph
+
+    graph = LinkGraph.build(VaultIndex('/path/to/vault'))
+    plan = graph.node('Projects/Plan')
+    print([graph.paths[node] for node in graph.backlinks(plan)], len(graph.broken))
+"""
+
+import os
+import re
+import posixpath
+from array import array
+from typing import Dict, Iterable, List, Optional, Union
+
+from vault_index import VaultIndex
+
+# Heading text as Obsidian compares it: case and repeated whitespace ignored
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_heading(heading: str) -> str:
+    return WHITESPACE_PATTERN.sub(' ', heading).strip().lower()
+
+
+def link_key(path: str) -> str:
+    """Lookup key of a vault file: lower-case '/' path, without '.md' for notes."""
+    key = path.replace(os.sep, '/').lower()
+    return key[:-3] if key.endswith('.md') else key
+
+
+class BrokenLink:
+    __slots__ = ('source', 'target', 'heading', 'reason')
+
+    def __init__(self, source: int, target: str, heading: Optional[str], reason: str):
+        self.source = source
+        self.target = target
+        self.heading = heading
+        self.reason = reason
+
+    @property
+    def text(self) -> str:
+        return self.target + (f"#{self.heading}" if self.heading is not None else '')
+
+
+class LinkGraph:
+    def __init__(self, paths: List[str], notes: Iterable[int]):
+        self.paths = paths
+        self.notes = array('I', notes)
+        self.is_note = bytearray(len(paths))
+        for node in self.notes:
+            self.is_note[node] = 1
+        self.keys = [link_key(path) for path in paths]
+        self.by_path: Dict[str, int] = {key: node for node, key in enumerate(self.keys)}
+        self.by_name: Dict[str, List[int]] = {}
+        for node, key in enumerate(self.keys):
+            self.by_name.setdefault(key.rsplit('/', 1)[-1], []).append(node)
+
+        self.out_offsets = array('I', [0])
+        self.out_targets = array('I')
+        self.in_offsets = array('I')
+        self.in_sources = array('I')
+        self.broken: List[BrokenLink] = []
+        self.link_count = 0
+        # link -> node, None, or the candidate list when the link is ambiguous
+        self._resolved: Dict[str, Union[int, None, List[int]]] = {}
+
+    @classmethod
+    def build(cls, index: VaultIndex) -> 'LinkGraph':
+        """Resolve every reference of every indexed note."""
+        entries = index.files()
+        graph = cls([entry.path for entry in entries],
+                    (node for node, entry in enumerate(entries) if entry.is_note))
+        anchors: Dict[int, set] = {}
+
+        def has_anchor(node: int, heading: str) -> bool:
+            if node not in anchors:
+                anchors[node] = {normalize_heading(h) for h in entries[node].headings}
+            return normalize_heading(heading) in anchors[node]
+
+        for node, entry in enumerate(entries):
+            targets = set()
+            if entry.is_note:
+                for target, heading, _ in entry.references:
+                    graph.link_count += 1
+                    resolved = graph.resolve(target, node)
+                    if resolved is None:
+                        graph.broken.append(BrokenLink(node, target, heading, 'missing file'))
+                        continue
+                    if heading and entries[resolved].is_note and not has_anchor(resolved, heading):
+                        reason = 'missing block' if heading.startswith('^') else 'missing heading'
+                        graph.broken.append(BrokenLink(node, target, heading, reason))
+                    if resolved != node:
+                        targets.add(resolved)
+            graph.out_targets.extend(sorted(targets))
+            graph.out_offsets.append(len(graph.out_targets))
+
+        graph.build_incoming()
+        return graph
+
+    def build_incoming(self):
+        """Transpose the outgoing CSR arrays (counting sort, no per-node lists)."""
+        n = len(self.paths)
+        counts = array('I', [0]) * (n + 1)
+        for target in self.out_targets:
+            counts[target + 1] += 1
+        for node in range(n):
+            counts[node + 1] += counts[node]
+        self.in_offsets = array('I', counts)
+
+        self.in_sources = array('I', [0]) * len(self.out_targets)
+        fill = array('I', counts)
+        for source in range(n):
+            for i in range(self.out_offsets[source], self.out_offsets[source + 1]):
+                target = self.out_targets[i]
+                self.in_sources[fill[target]] = source
+                fill[target] += 1
+
+    def resolve(self, target: str, source: Optional[int] = None) -> Optional[int]:
+        """Node a link target points to from source, or None if no file matches."""
+        link = target.strip().replace('\\', '/')
+        if not link:
+            return source  # [[#heading]] in the same note
+        source_dir = posixpath.dirname(self.keys[source]) if source is not None else ''
+
+        lower = link.lower()
+        if lower.startswith(('./', '../')):
+            lower = posixpath.normpath(posixpath.join(source_dir, lower))
+        lower = lower.lstrip('/')
+        if lower.endswith('.md'):
+            lower = lower[:-3]
+
+        if lower in self._resolved:
+            resolved = self._resolved[lower]
+        else:
+            resolved = self.by_path.get(lower)
+            if resolved is None:
+                candidates = self.by_name.get(lower.rsplit('/', 1)[-1], [])
+                if '/' in lower:
+                    suffix = '/' + lower
+                    candidates = [c for c in candidates if self.keys[c].endswith(suffix)]
+                resolved = candidates[0] if len(candidates) == 1 else (candidates or None)
+            self._resolved[lower] = resolved
+
+        if isinstance(resolved, list):
+            # Same name in several folders: prefer the linking note's folder, then the shortest path
+            return min(resolved, key=lambda c: (posixpath.dirname(self.keys[c]) != source_dir,
+                                                self.keys[c].count('/'), self.keys[c]))
+        return resolved
+
+    def node(self, name: str) -> Optional[int]:
+        """Node for a vault path or a link-style note name."""
+        return self.resolve(name)
+
+    def outlinks(self, node: int) -> List[int]:
+        return list(self.out_targets[self.out_offsets[node]:self.out_offsets[node + 1]])
+
+    def backlinks(self, node: int) -> List[int]:
+        return list(self.in_sources[self.in_offsets[node]:self.in_offsets[node + 1]])
+
+    def in_degree(self, node: int) -> int:
+        return self.in_offsets[node + 1] - self.in_offsets[node]
+
+    def out_degree(self, node: int) -> int:
+        return self.out_offsets[node + 1] - self.out_offsets[node]
+
+    def links_to_notes(self, node: int) -> bool:
+        """Whether a node links to at least one other note."""
+        is_note = self.is_note
+        return any(is_note[self.out_targets[i]] for i in range(self.out_offsets[node], self.out_offsets[node + 1]))
+
+    def orphans(self) -> List[int]:
+        """Notes that link to no other note and that no note links to.
+
+        Attachments are not part of the note graph: a note that only embeds
+        images is still an orphan. (Only notes have outgoing links, so every
+        backlink comes from a note.)
+        """
+        return [node for node in self.notes if not self.in_degree(node) and not self.links_to_notes(node)]
+
+    def components(self) -> List[List[int]]:
+        """Connected groups of notes (note-to-note links followed in both directions), largest first.
+
+        Links to attachments are ignored, so two notes embedding the same
+        image are not joined through it.
+        """
+        parent = array('I', range(len(self.paths)))
+
+        def find(node: int) -> int:
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        is_note = self.is_note
+        for source in range(len(self.paths)):
+            for i in range(self.out_offsets[source], self.out_offsets[source + 1]):
+                target = self.out_targets[i]
+                if not is_note[target]:
+                    continue
+                a, b = find(source), find(target)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+
+        groups: Dict[int, List[int]] = {}
+        for node in self.notes:
+            groups.setdefault(find(node), []).append(node)
+        return sorted(groups.values(), key=lambda group: (-len(group), self.paths[group[0]]))
+
+    def memory_bytes(self) -> int:
+        """Size of the adjacency arrays."""
+        return sum(a.itemsize * len(a) for a in (self.out_offsets, self.out_targets,
+                                                 self.in_offsets, self.in_sources))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+note_frontmatter.py
+Fast YAML frontmatter reading shared by the vault scripts
+
+The header is located without splitting (and so copying) the whole note,
+files are only read up to the closing '---' delimiter, and YAML is parsed
+with the C-accelerated loader when PyYAML was built with libyaml.
+
+Usage:
+    from note_frontmatter import read_frontmatter
+
+    metadata = read_frontmatter(Path('note.md'))
+"""
+
+import yaml
+from pathlib import Path
+from typing import Optional, Set
+
+# libyaml-backed loader when available, same results as SafeLoader
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+DELIMITER = "---"
+
+# Stop looking for the closing delimiter after this many characters
+MAX_FRONTMATTER_CHARS = 256 * 1024
+READ_CHUNK_CHARS = 4096
+
+
+def load_yaml(text: str):
+    return yaml.load(text, Loader=YAML_LOADER)
+
+
+def frontmatter_text(content: str) -> Optional[str]:
+    """Return the raw frontmatter block of a note, or None.
+
+    Equivalent to content.split("---", 2)[1] but only slices the header.
+    """
+    if not content.startswith(DELIMITER):
+        return None
+
+    end = content.find(DELIMITER, len(DELIMITER))
+    if end < 0:
+        return None
+
+    return content[len(DELIMITER):end]
+
+
+def parse_frontmatter(content: str):
+    """Parse YAML frontmatter from note content, or return None."""
+    header = frontmatter_text(content)
+    if header is None:
+        return None
+
+    try:
+        return load_yaml(header)
+    except:
+        return None
+
+
+def read_frontmatter_text(path: Path, max_chars: int = MAX_FRONTMATTER_CHARS) -> Optional[str]:
+    """Read a note's raw frontmatter, stopping at the closing delimiter.
+
+    The note body is never read. Returns None when there is no frontmatter
+    or its closing delimiter is not within max_chars.
+    """
+    with open(path, encoding='utf-8') as f:
+        buffer = f.read(len(DELIMITER))
+        if buffer != DELIMITER:
+            return None
+
+        search_from = len(DELIMITER)
+        while len(buffer) < max_chars:
+            chunk = f.read(READ_CHUNK_CHARS)
+            if not chunk:
+                return None
+            buffer += chunk
+
+            end = buffer.find(DELIMITER, search_from)
+            if end >= 0:
+                return buffer[len(DELIMITER):end]
+            # The delimiter may straddle two chunks
+            search_from = max(len(DELIMITER), len(buffer) - len(DELIMITER) + 1)
+
+    return None
+
+
+def read_frontmatter(path: Path):
+    """Read and parse a note's frontmatter without reading its body."""
+    try:
+        header = read_frontmatter_text(path)
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    if header is None:
+        return None
+
+    try:
+        return load_yaml(header)
+    except:
+        return None
+
+
+def frontmatter_tags(frontmatter) -> Set[str]:
+    """Tags listed in parsed frontmatter, without leading '#'."""
+    tags = set()
+
+    if isinstance(frontmatter, dict) and 'tags' in frontmatter:
+        fm_tags = frontmatter['tags']
+        try:
+            if isinstance(fm_tags, list):
+                for tag in fm_tags:
+                    tags.add(tag.strip('#'))
+            elif isinstance(fm_tags, str):
+                tags.add(fm_tags.strip('#'))
+        except AttributeError:
+            # Non-string entries end the list, as the original parser did
+            pass
+
+    return tags
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+note_query.py
+Filter expressions for selecting notes, evaluated against the vault index
+
+Used by export-notes.py --filter. An expression is compiled once into a
+small tree and evaluated with set operations over the index's inverted
+tables, so a selective filter only touches the notes it matches.
+
+Syntax:
+    tag:project                   frontmatter tag
+    type:meeting                  frontmatter type
+    folder:Work/Clients           notes in a folder or its subfolders
+    created>=2024-01-01           frontmatter date fields: > >= < <= =
+    due:2024-01-01..2024-03-31    inclusive date range (either end optional)
+    modified>2024-05-01           file modification time
+    A AND B, A OR B, NOT A, -A, ( ... )
+    Adjacent terms are joined with AND; use quotes for spaces: tag:"my tag"
+
+On the command line, a filter that starts with "-" would be read as an
+option: pass it as --filter=-tag:draft, or use NOT tag:draft instead.
+
+Example:
+    (tag:project OR type:meeting) AND folder:Work AND NOT tag:archived AND modified>2024-01-01
+"""
+
+import re
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Set, Tuple
+
+TERM_FIELDS = {'tag', 'type', 'folder'}
+
+TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|((?:[^\s()"]|"[^"]*")+))')
+PREDICATE_PATTERN = re.compile(r'^([A-Za-z_][\w\-]*)(>=|<=|>|<|=|:)(.*)$', re.DOTALL)
+
+
+class Node(ABC):
+    @abstractmethod
+    def evaluate(self, index) -> Set[str]:
+        """Relative paths of the notes matching this node."""
+
+
+class Term(Node):
+    def __init__(self, kind: str, value: str):
+        self.kind = kind
+        self.value = value
+
+    def evaluate(self, index) -> Set[str]:
+        return index.term_paths(self.kind, self.value)
+
+
+class DateRange(Node):
+    """Frontmatter date field within [low, high) ISO bounds (inclusivity configurable)."""
+
+    def __init__(self, field: str, low: Optional[str], high: Optional[str],
+                 low_inclusive: bool = True, high_inclusive: bool = False):
+        self.field = field
+        self.low = low
+        self.high = high
+        self.low_inclusive = low_inclusive
+        self.high_inclusive = high_inclusive
+
+    def evaluate(self, index) -> Set[str]:
+        check_date_field(index, self.field)
+        return index.date_paths(self.field, self.low, self.high, self.low_inclusive, self.high_inclusive)
+
+
+class InvalidDate(Node):
+    """field:value whose value is not a date: an unknown field, or a bad date for a date field."""
+
+    def __init__(self, field: str, error: ValueError):
+        self.field = field
+        self.error = error
+
+    def evaluate(self, index) -> Set[str]:
+        check_date_field(index, self.field)
+        raise self.error
+
+
+def check_date_field(index, field: str):
+    """Reject fields that are neither a term field nor a frontmatter date in any note."""
+    if field not in index.date_fields():
+        raise ValueError(f"Unknown filter field {field!r} (use {', '.join(sorted(TERM_FIELDS))}, "
+                         f"modified or a frontmatter date field)")
+
+
+class Modified(Node):
+    """File modification time within [low_ns, high_ns)."""
+
+    def __init__(self, low_ns: Optional[int], high_ns: Optional[int]):
+        self.low_ns = low_ns
+        self.high_ns = high_ns
+
+    def evaluate(self, index) -> Set[str]:
+        return index.modified_paths(self.low_ns, self.high_ns)
+
+
+class Not(Node):
+    def __init__(self, child: Node):
+        self.child = child
+
+    def evaluate(self, index) -> Set[str]:
+        return index.note_paths() - self.child.evaluate(index)
+
+
+class And(Node):
+    def __init__(self, children: List[Node]):
+        self.children = children
+
+    def evaluate(self, index) -> Set[str]:
+        positives = [child for child in self.children if not isinstance(child, Not)]
+        negatives = [child.child for child in self.children if isinstance(child, Not)]
+
+        # Intersect the positive terms and subtract the negated ones, so the
+        # complement of the whole vault is only needed for all-NOT clauses
+        if positives:
+            results = sorted((child.evaluate(index) for child in positives), key=len)
+            result = results[0].intersection(*results[1:])
+        else:
+            result = index.note_paths()
+
+        for child in negatives:
+            if not result:
+                break
+            result -= child.evaluate(index)
+
+        return result
+
+
+class Or(Node):
+    def __init__(self, children: List[Node]):
+        self.children = children
+
+    def evaluate(self, index) -> Set[str]:
+        result = set()
+        for child in self.children:
+            result |= child.evaluate(index)
+        return result
+
+
+def tokenize(expression: str) -> List[str]:
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = TOKEN_PATTERN.match(expression, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Unexpected character at position {pos}: {expression[pos:]!r}")
+        tokens.append(match.group(1) or match.group(2) or match.group(3))
+        pos = match.end()
+        while pos < len(expression) and expression[pos].isspace():
+            pos += 1
+    return tokens
+
+
+def parse_bound(value: str) -> Tuple[datetime, bool]:
+    """Parse a date or datetime; returns (value, whether it was a whole day)."""
+    try:
+        return datetime.combine(date.fromisoformat(value), datetime.min.time()), True
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value), False
+    except ValueError:
+        raise ValueError(f"Invalid date: {value!r} (use YYYY-MM-DD or YYYY-MM-DDTHH:MM)")
+
+
+def comparison_bounds(op: str, value: str) -> Tuple[Optional[datetime], bool, Optional[datetime], bool]:
+    """Turn 'op value' into (low, low_inclusive, high, high_inclusive).
+
+    A whole-day value covers the entire day, so '<=' and '=' include it and
+    '>' starts the day after.
+    """
+    if '..' in value and op == ':':
+        start, end = value.split('..', 1)
+        low = high = None
+        high_inclusive = False
+        if start:
+            low, _ = parse_bound(start)
+        if end:
+            high, whole_day = parse_bound(end)
+            if whole_day:
+                high += timedelta(days=1)
+            else:
+                high_inclusive = True
+        return low, True, high, high_inclusive
+
+    bound, whole_day = parse_bound(value)
+    day_after = bound + timedelta(days=1)
+
+    if op == '>':
+        return (day_after, True, None, False) if whole_day else (bound, False, None, False)
+    if op == '>=':
+        return bound, True, None, False
+    if op == '<':
+        return None, False, bound, False
+    if op == '<=':
+        return (None, False, day_after, False) if whole_day else (None, False, bound, True)
+    # '=' or ':' with a single value
+    return (bound, True, day_after, False) if whole_day else (bound, True, bound, True)
+
+
+def iso(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.time() == datetime.min.time() and value.tzinfo is None:
+        return value.date().isoformat()
+    return value.isoformat()
+
+
+def to_ns(value: Optional[datetime]) -> Optional[int]:
+    return None if value is None else int(value.timestamp() * 1_000_000_000)
+
+
+def parse_predicate(token: str) -> Node:
+    match = PREDICATE_PATTERN.match(token)
+    if not match:
+        raise ValueError(f"Invalid filter term: {token!r} (expected e.g. tag:project)")
+
+    field, op, value = match.groups()
+    value = value.replace('"', '')
+    if not value:
+        raise ValueError(f"Missing value in filter term: {token!r}")
+
+    if field in TERM_FIELDS:
+        if op != ':':
+            raise ValueError(f"Invalid filter term: {token!r} ({field} only supports {field}:value)")
+        if field == 'tag':
+            value = value.lstrip('#')
+        elif field == 'folder':
+            value = value.strip('/')
+        return Term(field, value)
+
+    try:
+        low, low_inclusive, high, high_inclusive = comparison_bounds(op, value)
+    except ValueError as e:
+        if field == 'modified':
+            raise
+        # Only the index knows whether field is a date field (bad date) or not a field at all
+        return InvalidDate(field, e)
+
+    if field == 'modified':
+        # Half-open [low, high) in nanoseconds
+        low_ns = to_ns(low)
+        high_ns = to_ns(high)
+        if low_ns is not None and not low_inclusive:
+            low_ns += 1
+        if high_ns is not None and high_inclusive:
+            high_ns += 1
+        return Modified(low_ns, high_ns)
+
+    return DateRange(field, iso(low), iso(high), low_inclusive, high_inclusive)
+
+
+class Parser:
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self) -> str:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self) -> Node:
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected {self.peek()!r} in filter")
+        return node
+
+    def parse_or(self) -> Node:
+        children = [self.parse_and()]
+        while self.peek() is not None and self.peek().upper() == 'OR':
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self) -> Node:
+        children = [self.parse_not()]
+        while self.peek() is not None and self.peek() != ')' and self.peek().upper() != 'OR':
+            if self.peek().upper() == 'AND':
+                self.take()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_not(self) -> Node:
+        token = self.peek()
+        if token is None:
+            raise ValueError("Filter ends unexpectedly")
+        if token.upper() == 'NOT':
+            self.take()
+            return Not(self.parse_not())
+        if token.startswith('-') and len(token) > 1:
+            self.tokens[self.pos] = token[1:]
+            return Not(self.parse_atom())
+        return self.parse_atom()
+
+    def parse_atom(self) -> Node:
+        token = self.take() if self.peek() is not None else None
+        if token is None:
+            raise ValueError("Filter ends unexpectedly")
+        if token == '(':
+            node = self.parse_or()
+            if self.peek() != ')':
+                raise ValueError("Missing ')' in filter")
+            self.take()
+            return node
+        if token == ')' or token.upper() in ('AND', 'OR', 'NOT'):
+            raise ValueError(f"Unexpected {token!r} in filter")
+        return parse_predicate(token)
+
+
+def compile_query(expression: str) -> Node:
+    """Compile a filter expression; raises ValueError when it is invalid."""
+    tokens = tokenize(expression)
+    if not tokens:
+        raise ValueError("Empty filter")
+    return Parser(tokens).parse()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+note_transforms.py
+Pre-compiled text transforms shared by the vault scripts
+
+Used by export-notes.py, export_links.py and vault_index.py, so that every
+script treats notes the same way. Patterns are compiled once at import time:
+
+- strip_frontmatter: drop the leading YAML block
+- clean_text: plain-text export cleanup (links, wiki links, bold/italic and
+  heading markers) as one combined alternation instead of a pass per rule
+- rewrite_references: replace each wiki link / embed, e.g. with the export's
+  resolved relative URL (see export_links.py)
+- inline_tags / references / headings: #tags, [[target#heading|alias]] and
+  ![[embed]] references, and heading / ^block anchors for the vault index
+
+Fenced code blocks (``` or ~~~) are cut out first and left untouched, so
+'#include' or '[[x]]' inside code is neither rewritten nor reported as a tag
+or link. Notes without fences (a plain substring test) skip that step.
+That is a correctness fix, not a speed-up: the fence check makes tag and
+link extraction slower than a bare findall (see benchmarks/bench_transforms.py).
+"""
+
+import re
+from typing import Callable, Iterator, List, Match
+
+FRONTMATTER_PATTERN = re.compile(r'^---.*?---\s*', re.DOTALL)
+
+# A fence runs to the matching closing fence, or to the end of the note
+FENCE_PATTERN = re.compile(r'^[ \t]*(`{3,}|~{3,})[^\n]*\n.*?(?:^[ \t]*\1[ \t]*$|\Z)',
+                           re.MULTILINE | re.DOTALL)
+
+INLINE_TAG_PATTERN = re.compile(r'#([\w/\-]+)')
+
+TEXT_CLEANUP_PATTERN = re.compile(
+    r'\[(?P<label>[^\]]+)\]\([^\)]+\)'        # Links
+    r'|\[\[(?P<wiki>[^\]]+)\]\]'              # Wiki links
+    r'|[*_]{1,2}(?P<emphasis>[^*_]+)[*_]{1,2}'  # Bold/italic
+    r'|^\#+\s+',                              # Headers
+    re.MULTILINE
+)
+
+# [[target#heading|alias]], ![[embed]] and [[#heading in the same note]]
+REFERENCE_PATTERN = re.compile(r'(?P<embed>!?)\[\[(?P<target>[^\]|#]*)(?:#(?P<heading>[^\]|]*))?'
+                               r'(?:\|(?P<alias>[^\]]*))?\]\]')
+
+# ATX headings and ^block-id anchors, the targets of #heading references
+ANCHOR_PATTERN = re.compile(r'^\#{1,6}[ \t]+(?P<heading>.+?)[ \t#]*$|[ \t]\^(?P<block>[\w\-]+)[ \t]*$',
+                            re.MULTILINE)
+
+# Characters that can start markup inside a link label or emphasis
+NESTED_MARKUP = frozenset('[*_')
+
+
+def has_fences(content: str) -> bool:
+    return '```' in content or '~~~' in content
+
+
+def text_segments(content: str) -> Iterator[str]:
+    """The parts of a note outside fenced code blocks."""
+    if not has_fences(content):
+        yield content
+        return
+    position = 0
+    for fence in FENCE_PATTERN.finditer(content):
+        yield content[position:fence.start()]
+        position = fence.end()
+    yield content[position:]
+
+
+def outside_fences(content: str, transform: Callable[[str], str]) -> str:
+    """Apply transform to the text between fenced code blocks, keeping the blocks as they are."""
+    if not has_fences(content):
+        return transform(content)
+    parts = []
+    position = 0
+    for fence in FENCE_PATTERN.finditer(content):
+        parts.append(transform(content[position:fence.start()]))
+        parts.append(fence.group(0))
+        position = fence.end()
+    parts.append(transform(content[position:]))
+    return ''.join(parts)
+
+
+def strip_frontmatter(content: str) -> str:
+    return FRONTMATTER_PATTERN.sub('', content, count=1)
+
+
+def _clean_match(match: Match) -> str:
+    kind = match.lastgroup
+    if kind is None:
+        return ''  # Heading marker
+    # Markup nested inside a link or emphasis is cleaned too, as the
+    # separate passes used to do
+    inner = match.group(kind)
+    return inner if NESTED_MARKUP.isdisjoint(inner) else _clean(inner)
+
+
+def _clean(text: str) -> str:
+    return TEXT_CLEANUP_PATTERN.sub(_clean_match, text)
+
+
+def clean_text(content: str) -> str:
+    """Remove markdown links, wiki link brackets, bold/italic and heading markers."""
+    return outside_fences(content, _clean)
+
+
+def rewrite_references(content: str, replace: Callable[[Match], str]) -> str:
+    """Replace every REFERENCE_PATTERN match outside code blocks with replace(match)."""
+    return outside_fences(content, lambda text: REFERENCE_PATTERN.sub(replace, text))
+
+
+def inline_tags(content: str) -> List[str]:
+    """#tags in a note's text, in order, ignoring code blocks."""
+    return [tag for text in text_segments(content) for tag in INLINE_TAG_PATTERN.findall(text)]
+
+
+def references(content: str) -> List[List]:
+    """[target, heading or None, is embed] of every wiki link and embed, in order, ignoring code."""
+    return [[match.group('target').strip(), match.group('heading'), bool(match.group('embed'))]
+            for text in text_segments(content) for match in REFERENCE_PATTERN.finditer(text)]
+
+
+def headings(content: str) -> List[str]:
+    """Headings and ('^'-prefixed) block ids a reference can point into, ignoring code."""
+    return [match.group('heading') if match.group('heading') is not None else '^' + match.group('block')
+            for text in text_segments(content) for match in ANCHOR_PATTERN.finditer(text)]
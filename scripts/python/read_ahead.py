@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+read_ahead.py
+Bounded-concurrency prefetching of file reads and stats
+
+Used by vault_index.py and export-notes.py. On network filesystems (NFS,
+SMB) every stat() and read costs a round trip, so issuing them one after
+another makes a scan take (files x latency). read_ahead() runs the I/O on a
+small thread pool, at most max_in_flight calls ahead of the consumer, and
+yields results in the original order so the parse/render stage is unchanged.
+
+Usage:
+    from read_ahead import read_ahead, read_note
+
+    for path, content in read_ahead(paths, read_note, max_in_flight=32):
+        ...
+"""
+
+import os
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Tuple, TypeVar
+
+# Calls kept in flight by default; raise it (--read-ahead) on high-latency mounts
+DEFAULT_READ_AHEAD = 8
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def read_ahead(items: Iterable[T], load: Callable[[T], R],
+               max_in_flight: int = DEFAULT_READ_AHEAD, batch_size: int = 1) -> Iterator[Tuple[T, R]]:
+    """Yield (item, load(item)) in input order, running up to max_in_flight loads ahead.
+
+    items is consumed lazily, so it can itself be a generator (e.g. a
+    directory walk). Cheap loads such as stat() can be grouped batch_size
+    items per task to amortize the thread hand-off. An exception raised by
+    load is re-raised when its item (or batch) is reached, as it would be in
+    a plain loop. With max_in_flight <= 1 the loads run inline without a thread pool.
+    """
+    if max_in_flight <= 1:
+        for item in items:
+            yield item, load(item)
+        return
+
+    def load_batch(batch: List[T]) -> List[R]:
+        return [load(item) for item in batch]
+
+    iterator = iter(items)
+    batches = iter(lambda: list(islice(iterator, batch_size)), [])
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        try:
+            for batch in batches:
+                pending.append((batch, pool.submit(load_batch, batch)))
+                if len(pending) >= max_in_flight:
+                    break
+
+            while pending:
+                batch, future = pending.popleft()
+                # Top the window up before waiting, so the pool never idles
+                for next_batch in batches:
+                    pending.append((next_batch, pool.submit(load_batch, next_batch)))
+                    break
+                yield from zip(batch, future.result())
+        finally:
+            # Consumer stopped early or a load failed: drop queued work
+            for _, future in pending:
+                future.cancel()
+
+
+def read_note(path: Path) -> str:
+    return Path(path).read_text(encoding='utf-8')
+
+
+def read_note_with_stat(path: Path) -> Tuple[str, os.stat_result]:
+    path = Path(path)
+    return path.read_text(encoding='utf-8'), path.stat()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+source_snapshot.py
+Snapshot of the vault tree as it was when a backup was taken
+
+Used by backup-vault.py. Every backup writes <backup>_snapshot.json next to
+it, mapping each backed-up file to its size, mtime_ns, inode and (when the
+backup recorded one) content hash. An incremental backup diffs the current
+vault index against its base's snapshot in memory, so:
+
+- unchanged files are hard-linked to the base without stat()ing the base
+  or reading its file manifest
+- renamed or moved files are recognised by inode (or by content hash when
+  the inode changed, e.g. after a sync tool re-created the file) and
+  linked from their old location instead of being copied again
+- deleted files are reported
+
+Only added and modified files are read.
+"""
+
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from vault_index import IndexEntry
+
+SNAPSHOT_SUFFIX = '_snapshot.json'
+SNAPSHOT_VERSION = 1
+
+# path -> (size, mtime_ns, inode, content hash or None)
+SnapshotFiles = Dict[str, Tuple[int, int, int, Optional[str]]]
+
+
+class SnapshotDiff:
+    """Changes between a snapshot and the current vault files."""
+
+    def __init__(self):
+        self.unchanged: List[str] = []
+        self.added: List[str] = []
+        self.modified: List[str] = []
+        # current path -> path in the snapshot
+        self.renamed: Dict[str, str] = {}
+        self.deleted: List[str] = []
+
+    def counts(self) -> Dict[str, int]:
+        return {'unchanged': len(self.unchanged), 'added': len(self.added),
+                'modified': len(self.modified), 'renamed': len(self.renamed),
+                'deleted': len(self.deleted)}
+
+
+class SourceSnapshot:
+    def __init__(self, backup: str, files: SnapshotFiles):
+        self.backup = backup
+        self.files = files
+
+    @staticmethod
+    def path_for(backup_path: Path) -> Path:
+        return backup_path.parent / f"{backup_path.name}{SNAPSHOT_SUFFIX}"
+
+    @classmethod
+    def from_entries(cls, backup: str, entries: Iterable[IndexEntry],
+                     hashes: Optional[Dict[str, Dict]] = None) -> 'SourceSnapshot':
+        """Snapshot of index entries; hashes is a backup file manifest (path -> {'hash': ...})."""
+        hashes = hashes or {}
+        files = {}
+        for entry in entries:
+            info = hashes.get(entry.path)
+            files[entry.path] = (entry.size, entry.mtime_ns, entry.inode,
+                                 info.get('hash') if info else None)
+        return cls(backup, files)
+
+    @classmethod
+    def load(cls, backup_path: Path) -> Optional['SourceSnapshot']:
+        """Snapshot written with a backup, or None for backups made without one."""
+        try:
+            data = json.loads(cls.path_for(backup_path).read_text())
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != SNAPSHOT_VERSION:
+            return None
+        return cls(data['backup'], {path: tuple(info) for path, info in data['files'].items()})
+
+    def save(self, backup_path: Path):
+        data = {'version': SNAPSHOT_VERSION, 'backup': self.backup, 'hash': 'blake2b-128',
+                'files': self.files}
+        self.path_for(backup_path).write_text(json.dumps(data, separators=(',', ':')))
+
+    def hashes(self) -> Dict[str, str]:
+        return {path: info[3] for path, info in self.files.items() if info[3] is not None}
+
+    def diff(self, entries: Iterable[IndexEntry],
+             hash_file: Optional[Callable[[str], str]] = None) -> SnapshotDiff:
+        """Compare current entries with the snapshot.
+
+        A file whose path is new but whose inode, size and mtime match a
+        file that disappeared is a rename. Otherwise, if hash_file(path) is
+        given, new files with the size of a disappeared file are hashed and
+        matched by content; only those candidates are read.
+        """
+        diff = SnapshotDiff()
+        new: List[IndexEntry] = []
+        seen = set()
+
+        for entry in entries:
+            old = self.files.get(entry.path)
+            if old is None:
+                new.append(entry)
+                continue
+            seen.add(entry.path)
+            if old[0] == entry.size and old[1] == entry.mtime_ns and old[2] == entry.inode:
+                diff.unchanged.append(entry.path)
+            else:
+                diff.modified.append(entry.path)
+
+        gone = {path: info for path, info in self.files.items() if path not in seen}
+        by_inode = {info[2]: path for path, info in gone.items() if info[2]}
+        by_size: Dict[int, List[str]] = {}
+        for path, info in gone.items():
+            if info[3] is not None:
+                by_size.setdefault(info[0], []).append(path)
+
+        for entry in new:
+            old_path = by_inode.get(entry.inode) if entry.inode else None
+            if old_path is not None and old_path in gone:
+                size, mtime_ns, _, _ = gone[old_path]
+                if size == entry.size and mtime_ns == entry.mtime_ns:
+                    diff.renamed[entry.path] = old_path
+                    del gone[old_path]
+                    continue
+
+            candidates = [path for path in by_size.get(entry.size, ()) if path in gone]
+            if candidates and hash_file is not None:
+                digest = hash_file(entry.path)
+                match = next((path for path in candidates if gone[path][3] == digest), None)
+                if match is not None:
+                    diff.renamed[entry.path] = match
+                    del gone[match]
+                    continue
+
+            diff.added.append(entry.path)
+
+        diff.deleted = sorted(gone)
+        return diff
@@ -7,6 +7,11 @@ Usage:
     python tag-analyzer.py --vault /path/to/vault
     python tag-analyzer.py --vault /path/to/vault --min-count 3
     python tag-analyzer.py --vault /path/to/vault --suggest-merges --output report.md
+    python tag-analyzer.py --vault /path/to/vault --workers 8
+    python tag-analyzer.py --vault /path/to/vault --cooccurrence --min-support 3
+    python tag-analyzer.py --vault /path/to/vault --output report.md --json tags.json --csv tags.csv
+    python tag-analyzer.py --vault /path/to/vault --json - | jq .overview
+    python tag-analyzer.py --vault /mnt/nfs/vault --read-ahead 64
 
 Features:
 - Count tag usage
@@ -14,78 +19,74 @@ Features:
 - Identify orphan tags
 - Suggest tag consolidation
 - Generate hierarchy recommendations
+- Tag co-occurrence: associated tags, candidate parents and clusters
+  (see tag_cooccurrence.py; faster with NumPy and SciPy installed)
+- Markdown report plus JSON / CSV outputs, streamed (see tag_report.py);
+  while one of them goes to stdout, progress messages go to stderr
+- Incremental scans through the shared vault index (see vault_index.py)
 """
 
 import argparse
-import re
-import yaml
+import math
+import sys
+import time
+from contextlib import redirect_stdout
 from pathlib import Path
 from collections import Counter, defaultdict
-from typing import List, Dict, Set, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 from difflib import SequenceMatcher
-from datetime import datetime
+
+from read_ahead import DEFAULT_READ_AHEAD
+from tag_cooccurrence import DEFAULT_CLUSTER_JACCARD, DEFAULT_MIN_SUPPORT, TagCooccurrence
+from tag_postings import TagPostings
+from tag_report import TagReport
+from vault_index import VaultIndex, extract_tags
 
 
 class TagAnalyzer:
-    def __init__(self, vault_path: str):
+    def __init__(self, vault_path: str, index_path: str = None, workers: int = 1,
+                 read_ahead: int = DEFAULT_READ_AHEAD):
         self.vault_path = Path(vault_path)
+        self.index = VaultIndex(vault_path, index_path, workers=workers, read_ahead=read_ahead)
         self.tags: Counter = Counter()
-        self.tag_files: Dict[str, List[str]] = defaultdict(list)
+        # Each note's path is stored once; tags keep postings of note ids into it
+        self.paths: List[str] = []
+        self.tag_files = TagPostings()
         self.hierarchical_tags: Dict[str, Set[str]] = defaultdict(set)
+        self.note_count = 0
         
     def scan_vault(self):
         """Scan vault and collect all tags."""
         print(f"📂 Scanning vault: {self.vault_path}")
         
-        markdown_files = list(self.vault_path.rglob("*.md"))
-        print(f"Found {len(markdown_files)} markdown files")
+        notes = self.index.notes()
+        print(f"Found {len(notes)} markdown files")
+        self.note_count = len(notes)
         
-        for file_path in markdown_files:
-            try:
-                content = file_path.read_text(encoding='utf-8')
-                tags = self.extract_tags(content)
+        for note in notes:
+            note_id = len(self.paths)
+            self.paths.append(note.path)
+            for tag in note.tags:
+                self.tags[tag] += 1
+                self.tag_files.add(tag, note_id)
                 
-                for tag in tags:
-                    self.tags[tag] += 1
-                    self.tag_files[tag].append(str(file_path.relative_to(self.vault_path)))
-                    
-                    # Track hierarchical relationships
-                    parts = tag.split('/')
-                    for i in range(1, len(parts)):
-                        parent = '/'.join(parts[:i])
-                        child = '/'.join(parts[:i+1])
-                        self.hierarchical_tags[parent].add(child)
-                        
-            except Exception as e:
-                print(f"⚠️  Error reading {file_path}: {e}")
+                # Track hierarchical relationships
+                parts = tag.split('/')
+                for i in range(1, len(parts)):
+                    parent = '/'.join(parts[:i])
+                    child = '/'.join(parts[:i+1])
+                    self.hierarchical_tags[parent].add(child)
         
         print(f"✅ Found {len(self.tags)} unique tags")
         print(f"📊 Total tag occurrences: {sum(self.tags.values())}")
     
+    def files_for(self, tag: str) -> List[str]:
+        """Relative paths of the notes carrying a tag."""
+        return [self.paths[note_id] for note_id in self.tag_files.get(tag, ())]
+    
     def extract_tags(self, content: str) -> Set[str]:
         """Extract tags from note content."""
-        tags = set()
-        
-        # Extract from frontmatter
-        if content.startswith("---"):
-            try:
-                parts = content.split("---", 2)
-                if len(parts) >= 3:
-                    frontmatter = yaml.safe_load(parts[1])
-                    if isinstance(frontmatter, dict) and 'tags' in frontmatter:
-                        fm_tags = frontmatter['tags']
-                        if isinstance(fm_tags, list):
-                            tags.update(tag.strip('#') for tag in fm_tags)
-                        elif isinstance(fm_tags, str):
-                            tags.add(fm_tags.strip('#'))
-            except:
-                pass
-        
-        # Extract inline tags (#tag)
-        inline_tags = re.findall(r'#([\w/\-]+)', content)
-        tags.update(inline_tags)
-        
-        return tags
+        return extract_tags(content)
     
     def get_tag_statistics(self) -> Dict:
         """Generate tag statistics."""
@@ -106,19 +107,100 @@ class TagAnalyzer:
         similar_pairs = []
         tag_list = list(self.tags.keys())
         
-        for i, tag1 in enumerate(tag_list):
-            for tag2 in tag_list[i+1:]:
-                similarity = self.calculate_similarity(tag1, tag2)
-                if similarity >= threshold:
-                    similar_pairs.append((tag1, tag2, similarity))
+        for i, j in sorted(self.similar_tag_candidates(tag_list, threshold)):
+            similarity = self.calculate_similarity(tag_list[i], tag_list[j])
+            if similarity >= threshold:
+                similar_pairs.append((tag_list[i], tag_list[j], similarity))
         
         return sorted(similar_pairs, key=lambda x: x[2], reverse=True)
     
+    def similar_tag_candidates(self, tag_list: List[str], threshold: float) -> Set[Tuple[int, int]]:
+        """Return index pairs (i < j) of tags that could reach the similarity threshold.
+        
+        SequenceMatcher.ratio() never exceeds the Dice coefficient of the two
+        strings' character multisets (its quick_ratio), so pairs are generated
+        with a prefix-filtered similarity join on (character, occurrence)
+        tokens instead of comparing every pair. No pair at or above the
+        threshold is ever dropped; the survivors are scored exactly.
+        """
+        n = len(tag_list)
+        if threshold <= 0:
+            return {(i, j) for i in range(n) for j in range(i + 1, n)}
+        if threshold > 1:
+            return set()
+        
+        eps = 1e-9
+        tokenized = []
+        for tag in tag_list:
+            seen = Counter()
+            tokens = []
+            for char in self.normalize_tag(tag):
+                seen[char] += 1
+                tokens.append((char, seen[char]))
+            tokenized.append(tokens)
+        
+        # Order tokens from rarest to most common so prefixes are selective
+        frequency = Counter(token for tokens in tokenized for token in tokens)
+        rank = {token: r for r, (token, _) in
+                enumerate(sorted(frequency.items(), key=lambda x: (x[1], x[0])))}
+        records = [sorted(rank[token] for token in tokens) for tokens in tokenized]
+        record_sets = [frozenset(record) for record in records]
+        
+        candidates = set()
+        empty = [i for i, record in enumerate(records) if not record]
+        # Two empty normalized forms compare as identical (ratio 1.0)
+        candidates.update((i, j) for a, i in enumerate(empty) for j in empty[a + 1:])
+        
+        index: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        
+        for x in sorted(range(n), key=lambda i: len(records[i])):
+            record_x = records[x]
+            len_x = len(record_x)
+            if len_x == 0:
+                continue
+            
+            # Shorter partners must satisfy the length filter, and a shared
+            # token must appear within both records' prefixes
+            min_len = threshold * len_x / (2 - threshold) - eps
+            probe_len = len_x - math.ceil(threshold * len_x / (2 - threshold) - eps) + 1
+            overlaps: Dict[int, int] = {}
+            
+            for pos_x in range(probe_len):
+                for y, pos_y in index[record_x[pos_x]]:
+                    len_y = len(records[y])
+                    if len_y < min_len:
+                        continue
+                    overlap = overlaps.get(y, 0)
+                    if overlap < 0:
+                        continue
+                    required = math.ceil(threshold * (len_x + len_y) / 2 - eps)
+                    if overlap + 1 + min(len_x - pos_x - 1, len_y - pos_y - 1) >= required:
+                        overlaps[y] = overlap + 1
+                    else:
+                        overlaps[y] = -1
+            
+            for y, overlap in overlaps.items():
+                if overlap <= 0:
+                    continue
+                total = len_x + len(records[y])
+                if 2 * len(record_sets[x] & record_sets[y]) >= threshold * total - eps:
+                    candidates.add((x, y) if x < y else (y, x))
+            
+            index_len = len_x - math.ceil(threshold * len_x - eps) + 1
+            for pos_x in range(index_len):
+                index[record_x[pos_x]].append((x, pos_x))
+        
+        return candidates
+    
+    def normalize_tag(self, tag: str) -> str:
+        """Normalize a tag for similarity comparison."""
+        return tag.lower().replace('-', '').replace('_', '')
+    
     def calculate_similarity(self, str1: str, str2: str) -> float:
         """Calculate similarity between two strings."""
         # Normalize
-        s1 = str1.lower().replace('-', '').replace('_', '')
-        s2 = str2.lower().replace('-', '').replace('_', '')
+        s1 = self.normalize_tag(str1)
+        s2 = self.normalize_tag(str2)
         
         return SequenceMatcher(None, s1, s2).ratio()
     
@@ -179,233 +261,102 @@ class TagAnalyzer:
         
         return hierarchy_info
     
-    def generate_report(self, output_path: str = None, suggest_merges: bool = False):
-        """Generate comprehensive analysis report."""
+    def analyze_cooccurrence(self) -> TagCooccurrence:
+        """Build the tag x note incidence matrix of the (count-filtered) tags."""
+        start = time.perf_counter()
+        cooccurrence = TagCooccurrence({tag: self.tag_files[tag] for tag in self.tags}, self.note_count)
+        pairs = len(cooccurrence.pairs()[0])
+        print(f"🔗 Co-occurrence: {len(cooccurrence.tags)} tags x {cooccurrence.notes} notes, "
+              f"{pairs} tag pairs ({cooccurrence.backend_name}, {time.perf_counter() - start:.2f}s)")
+        return cooccurrence
+    
+    def generate_report(self, output_path: str = None, suggest_merges: bool = False,
+                        similarity_threshold: float = 0.75, cooccurrence: bool = False,
+                        min_support: int = DEFAULT_MIN_SUPPORT,
+                        cluster_threshold: float = DEFAULT_CLUSTER_JACCARD,
+                        json_path: str = None, csv_path: str = None, stdout=None) -> Optional[str]:
+        """Generate comprehensive analysis report.
+        
+        The Markdown report is streamed to output_path (stdout if None);
+        json_path and csv_path add machine-readable copies. Each analysis
+        runs once, when the first output that needs it is written. Outputs
+        sent to stdout ('-') are written to stdout if given, else sys.stdout.
+        
+        Returns the Markdown report text when it was printed to stdout, or
+        None when it was streamed to output_path (or not requested).
+        """
         print("\n📊 Generating report...")
         
-        stats = self.get_tag_statistics()
-        similar_tags = self.find_similar_tags(threshold=0.75)
-        hierarchy = self.analyze_hierarchy()
+        report = TagReport(self, suggest_merges=suggest_merges, similarity_threshold=similarity_threshold,
+                           cooccurrence=cooccurrence, min_support=min_support,
+                           cluster_threshold=cluster_threshold, stdout=stdout)
         
-        report = f"""---
-type: tag-analysis
-created: {datetime.now().strftime("%Y-%m-%d %H:%M")}
-tags:
-  - meta
-  - analysis
----
-
-# 🏷️ Tag Analysis Report
-
-**Generated**: {datetime.now().strftime("%Y-%m-%d %H:%M")}  
-**Vault**: {self.vault_path}
-
----
-
-## 📊 Overview
-
-| Metric | Value |
-|--------|-------|
-| **Total Tags** | {stats['unique_tags']} |
-| **Total Occurrences** | {stats['total_occurrences']} |
-| **Average per Tag** | {stats['average_per_tag']:.1f} |
-| **Orphan Tags** | {len(stats['orphan_tags'])} |
-| **Hierarchical Tags** | {len(hierarchy['hierarchical_tags'])} |
-| **Root Tags** | {len(hierarchy['root_tags'])} |
-| **Max Hierarchy Depth** | {hierarchy['max_depth']} |
-
----
-
-## 🔥 Most Used Tags
-
-| Rank | Tag | Count | Usage |
-|------|-----|-------|-------|
-"""
-        
-        for i, (tag, count) in enumerate(stats['most_common'], 1):
-            percentage = (count / stats['total_occurrences']) * 100
-            report += f"| {i} | `{tag}` | {count} | {percentage:.1f}% |\n"
-        
-        report += f"""
----
-
-## 🌱 Least Used Tags
-
-| Tag | Count |
-|-----|-------|
-"""
-        
-        for tag, count in stats['least_common']:
-            report += f"| `{tag}` | {count} |\n"
+        markdown = None
+        if output_path or not (json_path or csv_path):
+            markdown = report.write(output_path)
+        if json_path:
+            report.write(json_path, 'json')
+        if csv_path:
+            report.write(csv_path, 'csv')
         
-        report += f"""
----
-
-## 🔍 Tag Hierarchy Analysis
-
-### Root Tags ({len(hierarchy['root_tags'])})
-
-| Tag | Count | Children |
-|-----|-------|----------|
-"""
-        
-        for tag, count in sorted(hierarchy['root_tags'], key=lambda x: x[1], reverse=True):
-            children = len(self.hierarchical_tags.get(tag, set()))
-            report += f"| `{tag}` | {count} | {children} |\n"
-        
-        if hierarchy['inconsistencies']:
-            report += f"""
----
-
-### ⚠️ Hierarchy Inconsistencies
-
-Found {len(hierarchy['inconsistencies'])} tags with missing parent tags:
-
-| Child Tag | Missing Parent |
-|-----------|----------------|
-"""
-            
-            for inconsistency in hierarchy['inconsistencies'][:20]:
-                report += f"| `{inconsistency['tag']}` | `{inconsistency['missing_parent']}` |\n"
-        
-        if similar_tags:
-            report += f"""
----
-
-## 🔄 Similar Tags (Potential Duplicates)
-
-Found {len(similar_tags)} similar tag pairs:
-
-| Tag 1 | Tag 2 | Similarity | Count 1 | Count 2 |
-|-------|-------|------------|---------|---------|
-"""
-            
-            for tag1, tag2, similarity in similar_tags[:20]:
-                count1 = self.tags[tag1]
-                count2 = self.tags[tag2]
-                report += f"| `{tag1}` | `{tag2}` | {similarity:.1%} | {count1} | {count2} |\n"
-        
-        if suggest_merges and similar_tags:
-            merge_suggestions = self.suggest_tag_merges(similar_tags)
-            
-            report += f"""
----
-
-## 💡 Merge Suggestions
-
-Based on similarity analysis, consider these merges:
-
-| Keep | Merge Into It | Similarity | Total Usage |
-|------|---------------|------------|-------------|
-"""
-            
-            for suggestion in merge_suggestions[:15]:
-                report += f"| `{suggestion['keep']}` | `{suggestion['merge']}` | "
-                report += f"{suggestion['similarity']:.1%} | "
-                report += f"{suggestion['total_count']} |\n"
-        
-        if stats['orphan_tags']:
-            report += f"""
----
-
-## 🍃 Orphan Tags (Used Once)
-
-{len(stats['orphan_tags'])} tags are used only once. Consider removing or consolidating:
-
-"""
-            orphan_chunks = [stats['orphan_tags'][i:i+5] for i in range(0, len(stats['orphan_tags']), 5)]
-            for chunk in orphan_chunks[:10]:
-                report += "- " + ", ".join(f"`{tag}`" for tag in chunk) + "\n"
-            
-            if len(orphan_chunks) > 10:
-                report += f"\n... and {len(orphan_chunks) - 10} more groups\n"
-        
-        report += f"""
----
-
-## 📋 Recommendations
-
-### 1. Tag Consolidation
-- Review similar tags and merge where appropriate
-- Consider establishing naming conventions
-- Use hierarchical tags consistently
-
-### 2. Hierarchy Improvements
-- Add missing parent tags for consistency
-- Consider reorganizing flat tags into hierarchies
-- Maximum recommended depth: 3-4 levels
-
-### 3. Orphan Tag Cleanup
-- Review single-use tags
-- Either use them more or remove them
-- Consider if they should be merged with existing tags
-
-### 4. Naming Conventions
-- Use lowercase for consistency
-- Use hyphens or slashes consistently
-- Avoid abbreviations unless standard
-- Keep tags concise but descriptive
-
----
-
-## 🔗 Tag Distribution by Category
-
-"""
-        
-        # Group tags by first level
-        categories = defaultdict(list)
-        for tag, count in self.tags.items():
-            category = tag.split('/')[0] if '/' in tag else tag
-            categories[category].append((tag, count))
-        
-        for category in sorted(categories.keys(), key=lambda x: sum(c for _, c in categories[x]), reverse=True)[:10]:
-            total = sum(count for _, count in categories[category])
-            report += f"\n### `{category}` ({total} total uses)\n\n"
-            
-            for tag, count in sorted(categories[category], key=lambda x: x[1], reverse=True)[:5]:
-                report += f"- `{tag}`: {count}\n"
-        
-        report += """
----
-
-*This report was automatically generated. Review suggestions before making changes.*
-"""
-        
-        if output_path:
-            output_file = Path(output_path)
-            output_file.write_text(report, encoding='utf-8')
-            print(f"✅ Report saved to: {output_path}")
-        else:
-            print(report)
-        
-        return report
+        return markdown
 
 
 def main():
     parser = argparse.ArgumentParser(description='Analyze tags in Obsidian vault')
     parser.add_argument('--vault', required=True, help='Path to Obsidian vault')
-    parser.add_argument('--output', help='Output file for report (markdown)')
+    parser.add_argument('--output', help="Output file for report (markdown, default: stdout; '-' for stdout)")
+    parser.add_argument('--json', metavar='PATH', help="Also write the analysis as JSON ('-' for stdout)")
+    parser.add_argument('--csv', metavar='PATH', help="Also write per-tag statistics as CSV ('-' for stdout)")
     parser.add_argument('--min-count', type=int, default=1, help='Minimum tag count to include')
     parser.add_argument('--suggest-merges', action='store_true', help='Include merge suggestions')
     parser.add_argument('--similarity-threshold', type=float, default=0.75, 
                        help='Similarity threshold for finding duplicates (0.0-1.0)')
+    parser.add_argument('--cooccurrence', action='store_true',
+                       help='Include tag associations, candidate parent tags and tag clusters')
+    parser.add_argument('--min-support', type=int, default=DEFAULT_MIN_SUPPORT,
+                       help='Notes two tags must share to count as associated (default: 2)')
+    parser.add_argument('--cluster-threshold', type=float, default=DEFAULT_CLUSTER_JACCARD,
+                       help='Jaccard similarity joining two tags into a cluster (0.0-1.0)')
+    parser.add_argument('--index', help='Path to the vault index database (default: user cache dir)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Processes used to parse new or changed notes')
+    parser.add_argument('--read-ahead', type=int, default=DEFAULT_READ_AHEAD,
+                       help='Files stat()ed and read concurrently; raise it on network filesystems (1 = off)')
     
     args = parser.parse_args()
     
-    analyzer = TagAnalyzer(args.vault)
-    analyzer.scan_vault()
-    
-    # Filter by minimum count
-    if args.min_count > 1:
-        analyzer.tags = Counter({tag: count for tag, count in analyzer.tags.items() 
-                                if count >= args.min_count})
-    
-    analyzer.generate_report(
-        output_path=args.output,
-        suggest_merges=args.suggest_merges
-    )
+    # The Markdown report goes to stdout unless --output or another format is given
+    markdown_path = args.output or (None if args.json or args.csv else '-')
+    stdout_outputs = [path for path in (markdown_path, args.json, args.csv) if path == '-']
+    if len(stdout_outputs) > 1:
+        parser.error("only one of the Markdown report, --json and --csv can be written to stdout")
     
-    print("\n✨ Analysis complete!")
+    # Keep progress messages out of a report written to stdout
+    stdout = sys.stdout
+    with redirect_stdout(sys.stderr if stdout_outputs else stdout):
+        analyzer = TagAnalyzer(args.vault, index_path=args.index, workers=args.workers,
+                               read_ahead=args.read_ahead)
+        analyzer.scan_vault()
+        
+        # Filter by minimum count
+        if args.min_count > 1:
+            analyzer.tags = Counter({tag: count for tag, count in analyzer.tags.items() 
+                                    if count >= args.min_count})
+        
+        analyzer.generate_report(
+            output_path=args.output,
+            suggest_merges=args.suggest_merges,
+            similarity_threshold=args.similarity_threshold,
+            cooccurrence=args.cooccurrence,
+            min_support=args.min_support,
+            cluster_threshold=args.cluster_threshold,
+            json_path=args.json,
+            csv_path=args.csv,
+            stdout=stdout
+        )
+        
+        print("\n✨ Analysis complete!")
 
 
 if __name__ == '__main__':
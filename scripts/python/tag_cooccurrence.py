@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+tag_cooccurrence.py
+Which tags travel together: co-occurrence, Jaccard / PMI and tag clusters
+
+Used by tag-analyzer.py --cooccurrence. Tags and notes are interned to
+integer ids and the tag x note incidence matrix is kept in CSR form (offsets
++ note ids, one array('I') each). With NumPy and SciPy installed, all pair
+counts come from one sparse product (A @ A.T) and every score, filter and
+cluster is computed on whole arrays; without them the pairs are counted note
+by note in pure Python, with the same results.
+
+For tags a and b, on n_a and n_b of N notes and together on n_ab:
+- Jaccard  n_ab / (n_a + n_b - n_ab)
+- PMI      log2(n_ab * N / (n_a * n_b)), > 0 when they meet more than chance
+- a is a candidate child of b when most of a's notes also carry b
+  (n_ab / n_a >= min_confidence) and b is the broader tag (n_b > n_a)
+- clusters are the connected groups of pairs with Jaccard >= a threshold
+
+Only pairs found together on at least min_support notes are reported.
+
+Usage:
+    from tag_cooccurrence import TagCooccurrence
+
+    cooccurrence = TagCooccurrence({'python': ['a.md', 'b.md'], 'code': ['a.md']})
+    print(cooccurrence.associations(min_support=1))
+"""
+
+import heapq
+import math
+from array import array
+from collections import Counter
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_MIN_SUPPORT = 2
+DEFAULT_MIN_CONFIDENCE = 0.8
+DEFAULT_CLUSTER_JACCARD = 0.3
+
+
+def load_sparse():
+    """NumPy and scipy.sparse, or None to use the pure-Python fallback."""
+    try:
+        import numpy
+        from scipy import sparse
+    except ImportError:
+        return None
+    return numpy, sparse
+
+
+class TagCooccurrence:
+    def __init__(self, tag_notes: Dict[str, Iterable], note_count: Optional[int] = None,
+                 use_sparse: bool = True):
+        """tag_notes: the notes (paths or ids) carrying each tag; note_count: notes in the vault (N)."""
+        self.tags: List[str] = sorted(tag_notes)
+        note_ids: Dict[object, int] = {}
+        self.offsets = array('I', [0])
+        self.note_ids = array('I')
+        for tag in self.tags:
+            ids = {note_ids.setdefault(note, len(note_ids)) for note in tag_notes[tag]}
+            self.note_ids.extend(sorted(ids))
+            self.offsets.append(len(self.note_ids))
+
+        self.notes = len(note_ids)
+        self.note_count = note_count or self.notes
+        self.counts = array('I', (self.offsets[i + 1] - self.offsets[i] for i in range(len(self.tags))))
+        self.backend = load_sparse() if use_sparse else None
+        self._pairs = None
+
+    @property
+    def backend_name(self) -> str:
+        return 'NumPy/SciPy' if self.backend else 'pure Python'
+
+    def pairs(self):
+        """(tag a, tag b, notes with both) arrays for every pair a < b that shares a note."""
+        if self._pairs is None:
+            self._pairs = self._sparse_pairs() if self.backend else self._python_pairs()
+        return self._pairs
+
+    def _sparse_pairs(self):
+        np, sparse = self.backend
+        incidence = sparse.csr_matrix((np.ones(len(self.note_ids), dtype=np.int32),
+                                       np.frombuffer(self.note_ids, dtype=np.uint32),
+                                       np.frombuffer(self.offsets, dtype=np.uint32)),
+                                      shape=(len(self.tags), self.notes))
+        together = sparse.triu(incidence @ incidence.T, k=1).tocoo()
+        return together.row, together.col, together.data
+
+    def _python_pairs(self):
+        n_tags = len(self.tags)
+
+        # Transpose to note -> tags with a counting sort; tags come out ascending
+        note_offsets = array('I', [0]) * (self.notes + 1)
+        for note in self.note_ids:
+            note_offsets[note + 1] += 1
+        for note in range(self.notes):
+            note_offsets[note + 1] += note_offsets[note]
+        note_tags = array('I', [0]) * len(self.note_ids)
+        fill = array('I', note_offsets)
+        for tag in range(n_tags):
+            for i in range(self.offsets[tag], self.offsets[tag + 1]):
+                note = self.note_ids[i]
+                note_tags[fill[note]] = tag
+                fill[note] += 1
+
+        # Pairs keyed as a single int, a * n_tags + b
+        counts: Counter = Counter()
+        for note in range(self.notes):
+            tags = note_tags[note_offsets[note]:note_offsets[note + 1]]
+            if len(tags) > 1:
+                counts.update(a * n_tags + b for a, b in combinations(tags, 2))
+
+        rows, cols, together = array('I'), array('I'), array('I')
+        for pair in sorted(counts):
+            a, b = divmod(pair, n_tags)
+            rows.append(a)
+            cols.append(b)
+            together.append(counts[pair])
+        return rows, cols, together
+
+    def scores(self, min_support: int = DEFAULT_MIN_SUPPORT):
+        """(a, b, together, jaccard, pmi) for the pairs seen on at least min_support notes."""
+        a, b, together = self.pairs()
+        n = self.note_count
+
+        if self.backend:
+            np, _ = self.backend
+            keep = together >= min_support
+            a, b, together = a[keep], b[keep], together[keep]
+            counts = np.frombuffer(self.counts, dtype=np.uint32).astype(np.float64)
+            n_a, n_b, n_ab = counts[a], counts[b], together.astype(np.float64)
+            return a, b, together, n_ab / (n_a + n_b - n_ab), np.log2(n_ab * n / (n_a * n_b))
+
+        counts = self.counts
+        keep = [i for i in range(len(together)) if together[i] >= min_support]
+        a = [a[i] for i in keep]
+        b = [b[i] for i in keep]
+        together = [together[i] for i in keep]
+        jaccard = [n_ab / (counts[x] + counts[y] - n_ab) for x, y, n_ab in zip(a, b, together)]
+        pmi = [math.log2(n_ab * n / (counts[x] * counts[y])) for x, y, n_ab in zip(a, b, together)]
+        return a, b, together, jaccard, pmi
+
+    def associations(self, min_support: int = DEFAULT_MIN_SUPPORT,
+                     limit: int = 20) -> List[Tuple[str, str, int, float, float]]:
+        """Strongest (tag, tag, notes together, jaccard, pmi) pairs, by Jaccard then support."""
+        a, b, together, jaccard, pmi = self.scores(min_support)
+
+        if self.backend:
+            np, _ = self.backend
+            order = np.lexsort((-together, -jaccard))[:limit]
+        else:
+            order = heapq.nlargest(limit, range(len(together)), key=lambda i: (jaccard[i], together[i]))
+
+        return [(self.tags[a[i]], self.tags[b[i]], int(together[i]), float(jaccard[i]), float(pmi[i]))
+                for i in order]
+
+    def parent_candidates(self, min_support: int = DEFAULT_MIN_SUPPORT,
+                          min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+                          limit: int = 20) -> List[Tuple[str, str, int, float]]:
+        """(tag, candidate parent, notes together, share of the tag's notes with the parent).
+
+        Pairs that already form a hierarchy (parent/tag) are skipped.
+        """
+        a, b, together, _, _ = self.scores(min_support)
+
+        if self.backend:
+            np, _ = self.backend
+            counts = np.frombuffer(self.counts, dtype=np.uint32)
+            child = np.where(counts[a] <= counts[b], a, b)
+            parent = np.where(counts[a] <= counts[b], b, a)
+            confidence = together / counts[child]
+            keep = (confidence >= min_confidence) & (counts[parent] > counts[child])
+            child, parent, together, confidence = child[keep], parent[keep], together[keep], confidence[keep]
+            order = np.lexsort((-together, -confidence))
+        else:
+            counts = self.counts
+            child = [x if counts[x] <= counts[y] else y for x, y in zip(a, b)]
+            parent = [y if counts[x] <= counts[y] else x for x, y in zip(a, b)]
+            confidence = [n_ab / counts[c] for c, n_ab in zip(child, together)]
+            order = sorted((i for i in range(len(child))
+                            if confidence[i] >= min_confidence and counts[parent[i]] > counts[child[i]]),
+                           key=lambda i: (-confidence[i], -together[i]))
+
+        candidates = []
+        for i in order:
+            tag, parent_tag = self.tags[child[i]], self.tags[parent[i]]
+            if tag.startswith(parent_tag + '/'):
+                continue
+            candidates.append((tag, parent_tag, int(together[i]), float(confidence[i])))
+            if len(candidates) >= limit:
+                break
+        return candidates
+
+    def clusters(self, min_support: int = DEFAULT_MIN_SUPPORT,
+                 min_jaccard: float = DEFAULT_CLUSTER_JACCARD) -> List[List[str]]:
+        """Groups of tags joined by pairs with Jaccard >= min_jaccard, largest first.
+
+        Tags in a cluster are listed from most to least used.
+        """
+        a, b, _, jaccard, _ = self.scores(min_support)
+        n_tags = len(self.tags)
+
+        if self.backend:
+            np, sparse = self.backend
+            keep = jaccard >= min_jaccard
+            edges = sparse.coo_matrix((np.ones(int(keep.sum()), dtype=np.int8), (a[keep], b[keep])),
+                                      shape=(n_tags, n_tags))
+            _, labels = sparse.csgraph.connected_components(edges, directed=False)
+            sizes = np.bincount(labels)
+            members = np.flatnonzero(sizes[labels] > 1)
+            groups: Dict[int, List[int]] = {}
+            for tag, label in zip(members.tolist(), labels[members].tolist()):
+                groups.setdefault(label, []).append(tag)
+        else:
+            parent = array('I', range(n_tags))
+
+            def find(tag: int) -> int:
+                while parent[tag] != tag:
+                    parent[tag] = parent[parent[tag]]
+                    tag = parent[tag]
+                return tag
+
+            for x, y, score in zip(a, b, jaccard):
+                if score >= min_jaccard:
+                    root_x, root_y = find(x), find(y)
+                    if root_x != root_y:
+                        parent[max(root_x, root_y)] = min(root_x, root_y)
+
+            groups = {}
+            for tag in range(n_tags):
+                groups.setdefault(find(tag), []).append(tag)
+
+        clusters = [sorted(group, key=lambda tag: (-self.counts[tag], self.tags[tag]))
+                    for group in groups.values() if len(group) > 1]
+        clusters.sort(key=lambda group: (-len(group), self.tags[group[0]]))
+        return [[self.tags[tag] for tag in group] for group in clusters]
+
+    def memory_bytes(self) -> int:
+        """Size of the incidence arrays."""
+        return sum(a.itemsize * len(a) for a in (self.offsets, self.note_ids, self.counts))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+tag_postings.py
+Compact tag -> notes postings for TagAnalyzer.tag_files
+
+Notes are referred to by integer ids (indexes into the analyzer's path
+table), so a path string is stored once however many tags its note has.
+While scanning, each (tag, note) occurrence is appended to two flat
+array('I')s; the first lookup sorts them into CSR form (per-tag offsets +
+note ids), which costs 4 bytes per occurrence and 4 per tag instead of a
+list object per tag and a pointer per occurrence.
+
+Usage:
+    postings = TagPostings()
+    postings.add('project', 0)
+    postings.add('project', 7)
+    list(postings['project'])  # [0, 7]
+"""
+
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterator, List
+
+
+class TagPostings(Mapping):
+    def __init__(self):
+        self.tag_ids: Dict[str, int] = {}
+        self.tag_names: List[str] = []
+        self.offsets = array('I', [0])
+        self.note_ids = array('I')
+        # Occurrences added since the last lookup
+        self._pending_tags = array('I')
+        self._pending_notes = array('I')
+
+    def add(self, tag: str, note_id: int):
+        tag_id = self.tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self.tag_ids[tag] = len(self.tag_names)
+            self.tag_names.append(tag)
+        self._pending_tags.append(tag_id)
+        self._pending_notes.append(note_id)
+
+    def _build(self):
+        """Merge pending occurrences into the CSR arrays (counting sort by tag, stable)."""
+        n_tags = len(self.tag_names)
+        counts = array('I', [0]) * (n_tags + 1)
+        for tag_id in range(len(self.offsets) - 1):
+            counts[tag_id + 1] = self.offsets[tag_id + 1] - self.offsets[tag_id]
+        for tag_id in self._pending_tags:
+            counts[tag_id + 1] += 1
+        for tag_id in range(n_tags):
+            counts[tag_id + 1] += counts[tag_id]
+
+        note_ids = array('I', [0]) * counts[n_tags]
+        fill = array('I', counts)
+        for tag_id in range(len(self.offsets) - 1):
+            for i in range(self.offsets[tag_id], self.offsets[tag_id + 1]):
+                note_ids[fill[tag_id]] = self.note_ids[i]
+                fill[tag_id] += 1
+        for tag_id, note_id in zip(self._pending_tags, self._pending_notes):
+            note_ids[fill[tag_id]] = note_id
+            fill[tag_id] += 1
+
+        self.offsets = counts
+        self.note_ids = note_ids
+        self._pending_tags = array('I')
+        self._pending_notes = array('I')
+
+    def __getitem__(self, tag: str) -> array:
+        """Note ids of a tag, in the order they were added."""
+        tag_id = self.tag_ids[tag]
+        if self._pending_tags:
+            self._build()
+        return self.note_ids[self.offsets[tag_id]:self.offsets[tag_id + 1]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tag_names)
+
+    def __len__(self) -> int:
+        return len(self.tag_names)
+
+    def __contains__(self, tag) -> bool:
+        return tag in self.tag_ids
+
+    def memory_bytes(self) -> int:
+        """Size of the postings arrays."""
+        return sum(a.itemsize * len(a) for a in (self.offsets, self.note_ids,
+                                                 self._pending_tags, self._pending_notes))
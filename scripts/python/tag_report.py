@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+tag_report.py
+Streaming Markdown, JSON and CSV reports for tag-analyzer.py
+
+The Markdown report is a sequence of section generators whose text is
+written straight to a buffered file (or stdout) as it is produced, so no
+report string is ever built up in memory. Each analysis (statistics,
+hierarchy, similar tags, co-occurrence) runs the first time a section
+needs it and is shared with the other sections and output formats of the
+same run; similar tags are only searched for when a section shows them.
+
+- Markdown: the human-readable report
+- JSON: the same analyses in full (no row limits), streamed element by element
+- CSV: one row per tag with its count, share, depth and hierarchy data
+
+Usage:
+    report = TagReport(analyzer, suggest_merges=True)
+    report.write('report.md')
+    report.write('tags.json', 'json')
+"""
+
+import csv
+import json
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import cached_property
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+from tag_cooccurrence import DEFAULT_CLUSTER_JACCARD, DEFAULT_MIN_CONFIDENCE, DEFAULT_MIN_SUPPORT
+
+FORMATS = ['markdown', 'json', 'csv']
+
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+@contextmanager
+def open_output(output_path: Optional[str], newline: Optional[str] = None,
+                stdout: Optional[TextIO] = None) -> Iterator[TextIO]:
+    """A buffered output file, or stdout (sys.stdout by default) for None / '-'."""
+    if output_path in (None, '-'):
+        yield stdout or sys.stdout
+        return
+    with open(output_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE, newline=newline) as f:
+        yield f
+
+
+class TagReport:
+    def __init__(self, analyzer, suggest_merges: bool = False, similarity_threshold: float = 0.75,
+                 cooccurrence: bool = False, min_support: int = DEFAULT_MIN_SUPPORT,
+                 cluster_threshold: float = DEFAULT_CLUSTER_JACCARD, stdout: Optional[TextIO] = None):
+        self.analyzer = analyzer
+        self.suggest_merges = suggest_merges
+        self.similarity_threshold = similarity_threshold
+        self.cooccurrence = cooccurrence
+        self.min_support = min_support
+        self.cluster_threshold = cluster_threshold
+        # Where None / '-' outputs go, so progress can be kept off it
+        self.stdout = stdout
+        self.generated = datetime.now()
+
+    # Analyses, each computed on first use
+
+    @cached_property
+    def stats(self) -> Dict:
+        return self.analyzer.get_tag_statistics()
+
+    @cached_property
+    def hierarchy(self) -> Dict:
+        return self.analyzer.analyze_hierarchy()
+
+    @cached_property
+    def similar_tags(self):
+        return self.analyzer.find_similar_tags(threshold=self.similarity_threshold)
+
+    @cached_property
+    def merge_suggestions(self) -> List[Dict]:
+        return self.analyzer.suggest_tag_merges(self.similar_tags) if self.suggest_merges else []
+
+    @cached_property
+    def cooccurrence_results(self) -> Optional[Dict]:
+        if not self.cooccurrence:
+            return None
+        cooccurrence = self.analyzer.analyze_cooccurrence()
+        return {
+            'associations': cooccurrence.associations(self.min_support),
+            'parents': cooccurrence.parent_candidates(self.min_support),
+            'clusters': cooccurrence.clusters(self.min_support, self.cluster_threshold),
+        }
+
+    def write(self, output_path: Optional[str] = None, output_format: str = 'markdown') -> Optional[str]:
+        """Write the report in one of FORMATS to output_path (stdout for None or '-').
+
+        Returns the Markdown text when the Markdown report went to stdout, else None.
+        """
+        to_stdout = output_path in (None, '-')
+        # A report written to stdout is also kept for the caller, as print(report) used to
+        shown = [] if to_stdout and output_format == 'markdown' else None
+        with open_output(output_path, '' if output_format == 'csv' else None, self.stdout) as out:
+            if output_format == 'json':
+                self.write_json(out)
+            elif output_format == 'csv':
+                self.write_csv(out)
+            else:
+                for section in self.markdown_sections():
+                    for text in section:
+                        out.write(text)
+                        if shown is not None:
+                            shown.append(text)
+                if to_stdout:
+                    out.write("\n")
+
+        if not to_stdout:
+            print(f"✅ Report saved to: {output_path}")
+        return ''.join(shown) if shown is not None else None
+
+    # Markdown
+
+    def markdown_sections(self) -> Iterator[Iterable[str]]:
+        yield self.header_section()
+        yield self.most_used_section()
+        yield self.least_used_section()
+        yield self.hierarchy_section()
+        yield self.similar_section()
+        if self.suggest_merges:
+            yield self.merge_section()
+        if self.cooccurrence:
+            yield self.cooccurrence_section()
+        yield self.orphan_section()
+        yield self.recommendations_section()
+        yield self.category_section()
+        yield ["""
+---
+
+*This report was automatically generated. Review suggestions before making changes.*
+"""]
+
+    def header_section(self) -> Iterator[str]:
+        stats, hierarchy = self.stats, self.hierarchy
+        generated = self.generated.strftime("%Y-%m-%d %H:%M")
+        yield f"""---
+type: tag-analysis
+created: {generated}
+tags:
+  - meta
+  - analysis
+---
+
+# 🏷️ Tag Analysis Report
+
+**Generated**: {generated}  
+**Vault**: {self.analyzer.vault_path}
+
+---
+
+## 📊 Overview
+
+| Metric | Value |
+|--------|-------|
+| **Total Tags** | {stats['unique_tags']} |
+| **Total Occurrences** | {stats['total_occurrences']} |
+| **Average per Tag** | {stats['average_per_tag']:.1f} |
+| **Orphan Tags** | {len(stats['orphan_tags'])} |
+| **Hierarchical Tags** | {len(hierarchy['hierarchical_tags'])} |
+| **Root Tags** | {len(hierarchy['root_tags'])} |
+| **Max Hierarchy Depth** | {hierarchy['max_depth']} |
+"""
+
+    def most_used_section(self) -> Iterator[str]:
+        yield """
+---
+
+## 🔥 Most Used Tags
+
+| Rank | Tag | Count | Usage |
+|------|-----|-------|-------|
+"""
+        for i, (tag, count) in enumerate(self.stats['most_common'], 1):
+            percentage = (count / self.stats['total_occurrences']) * 100
+            yield f"| {i} | `{tag}` | {count} | {percentage:.1f}% |\n"
+
+    def least_used_section(self) -> Iterator[str]:
+        yield """
+---
+
+## 🌱 Least Used Tags
+
+| Tag | Count |
+|-----|-------|
+"""
+        for tag, count in self.stats['least_common']:
+            yield f"| `{tag}` | {count} |\n"
+
+    def hierarchy_section(self) -> Iterator[str]:
+        hierarchy = self.hierarchy
+        yield f"""
+---
+
+## 🔍 Tag Hierarchy Analysis
+
+### Root Tags ({len(hierarchy['root_tags'])})
+
+| Tag | Count | Children |
+|-----|-------|----------|
+"""
+        for tag, count in sorted(hierarchy['root_tags'], key=lambda x: x[1], reverse=True):
+            children = len(self.analyzer.hierarchical_tags.get(tag, set()))
+            yield f"| `{tag}` | {count} | {children} |\n"
+
+        if hierarchy['inconsistencies']:
+            yield f"""
+---
+
+### ⚠️ Hierarchy Inconsistencies
+
+Found {len(hierarchy['inconsistencies'])} tags with missing parent tags:
+
+| Child Tag | Missing Parent |
+|-----------|----------------|
+"""
+            for inconsistency in hierarchy['inconsistencies'][:20]:
+                yield f"| `{inconsistency['tag']}` | `{inconsistency['missing_parent']}` |\n"
+
+    def similar_section(self) -> Iterator[str]:
+        similar_tags = self.similar_tags
+        if not similar_tags:
+            return
+        yield f"""
+---
+
+## 🔄 Similar Tags (Potential Duplicates)
+
+Found {len(similar_tags)} similar tag pairs:
+
+| Tag 1 | Tag 2 | Similarity | Count 1 | Count 2 |
+|-------|-------|------------|---------|---------|
+"""
+        tags = self.analyzer.tags
+        for tag1, tag2, similarity in similar_tags[:20]:
+            yield f"| `{tag1}` | `{tag2}` | {similarity:.1%} | {tags[tag1]} | {tags[tag2]} |\n"
+
+    def merge_section(self) -> Iterator[str]:
+        if not self.merge_suggestions:
+            return
+        yield """
+---
+
+## 💡 Merge Suggestions
+
+Based on similarity analysis, consider these merges:
+
+| Keep | Merge Into It | Similarity | Total Usage |
+|------|---------------|------------|-------------|
+"""
+        for suggestion in self.merge_suggestions[:15]:
+            yield (f"| `{suggestion['keep']}` | `{suggestion['merge']}` | "
+                   f"{suggestion['similarity']:.1%} | {suggestion['total_count']} |\n")
+
+    def cooccurrence_section(self) -> Iterator[str]:
+        results = self.cooccurrence_results
+        yield f"""
+---
+
+## 🔗 Tag Associations
+
+Tag pairs found together on at least {self.min_support} notes, strongest first:
+
+| Tag 1 | Tag 2 | Notes Together | Jaccard | PMI |
+|-------|-------|----------------|---------|-----|
+"""
+        for tag1, tag2, together, jaccard, pmi in results['associations']:
+            yield f"| `{tag1}` | `{tag2}` | {together} | {jaccard:.1%} | {pmi:.2f} |\n"
+
+        if results['parents']:
+            yield f"""
+---
+
+### 🌳 Candidate Parent Tags
+
+At least {DEFAULT_MIN_CONFIDENCE:.0%} of the notes with the tag also carry the broader tag:
+
+| Tag | Candidate Parent | Notes Together | Confidence | Suggested Tag |
+|-----|------------------|----------------|------------|---------------|
+"""
+            for tag, parent, together, confidence in results['parents']:
+                suggested = f"{parent}/{tag.rsplit('/', 1)[-1]}"
+                yield f"| `{tag}` | `{parent}` | {together} | {confidence:.1%} | `{suggested}` |\n"
+
+        clusters = results['clusters']
+        if clusters:
+            yield f"""
+---
+
+### 🧩 Tag Clusters
+
+{len(clusters)} groups of tags used together (Jaccard >= {self.cluster_threshold:.0%}):
+
+"""
+            for cluster in clusters[:15]:
+                shown = ", ".join(f"`{tag}`" for tag in cluster[:10])
+                more = f" and {len(cluster) - 10} more" if len(cluster) > 10 else ""
+                yield f"- **{len(cluster)} tags**: {shown}{more}\n"
+
+    def orphan_section(self) -> Iterator[str]:
+        orphan_tags = self.stats['orphan_tags']
+        if not orphan_tags:
+            return
+        yield f"""
+---
+
+## 🍃 Orphan Tags (Used Once)
+
+{len(orphan_tags)} tags are used only once. Consider removing or consolidating:
+
+"""
+        # Groups of five, only the first ten shown
+        for i in range(0, min(len(orphan_tags), 50), 5):
+            yield "- " + ", ".join(f"`{tag}`" for tag in orphan_tags[i:i + 5]) + "\n"
+
+        groups = (len(orphan_tags) + 4) // 5
+        if groups > 10:
+            yield f"\n... and {groups - 10} more groups\n"
+
+    def recommendations_section(self) -> Iterator[str]:
+        yield """
+---
+
+## 📋 Recommendations
+
+### 1. Tag Consolidation
+- Review similar tags and merge where appropriate
+- Consider establishing naming conventions
+- Use hierarchical tags consistently
+
+### 2. Hierarchy Improvements
+- Add missing parent tags for consistency
+- Consider reorganizing flat tags into hierarchies
+- Maximum recommended depth: 3-4 levels
+
+### 3. Orphan Tag Cleanup
+- Review single-use tags
+- Either use them more or remove them
+- Consider if they should be merged with existing tags
+
+### 4. Naming Conventions
+- Use lowercase for consistency
+- Use hyphens or slashes consistently
+- Avoid abbreviations unless standard
+- Keep tags concise but descriptive
+"""
+
+    def category_section(self) -> Iterator[str]:
+        yield """
+---
+
+## 🔗 Tag Distribution by Category
+
+"""
+        # Group tags by first level
+        categories = defaultdict(list)
+        for tag, count in self.analyzer.tags.items():
+            category = tag.split('/')[0] if '/' in tag else tag
+            categories[category].append((tag, count))
+
+        for category in sorted(categories.keys(), key=lambda x: sum(c for _, c in categories[x]), reverse=True)[:10]:
+            total = sum(count for _, count in categories[category])
+            yield f"\n### `{category}` ({total} total uses)\n\n"
+
+            for tag, count in sorted(categories[category], key=lambda x: x[1], reverse=True)[:5]:
+                yield f"- `{tag}`: {count}\n"
+
+    # Machine-readable outputs
+
+    def tag_rows(self) -> Iterator[Dict]:
+        """One record per tag, most used first."""
+        tags = self.analyzer.tags
+        total = self.stats['total_occurrences']
+        missing_parents = {item['tag'] for item in self.hierarchy['inconsistencies']}
+        for tag, count in tags.most_common():
+            yield {
+                'tag': tag,
+                'count': count,
+                'share': round(count / total, 6) if total else 0,
+                'depth': tag.count('/') + 1,
+                'children': len(self.analyzer.hierarchical_tags.get(tag, ())),
+                'missing_parent': tag in missing_parents,
+            }
+
+    def write_csv(self, out: TextIO):
+        writer = csv.DictWriter(out, fieldnames=['tag', 'count', 'share', 'depth', 'children', 'missing_parent'])
+        writer.writeheader()
+        writer.writerows(self.tag_rows())
+
+    def json_sections(self) -> Iterator:
+        """(key, value) pairs of the JSON report; list values are streamed."""
+        stats, hierarchy = self.stats, self.hierarchy
+        yield 'vault', str(self.analyzer.vault_path)
+        yield 'generated', self.generated.isoformat(timespec='seconds')
+        yield 'overview', {
+            'unique_tags': stats['unique_tags'],
+            'total_occurrences': stats['total_occurrences'],
+            'average_per_tag': stats['average_per_tag'],
+            'orphan_tags': len(stats['orphan_tags']),
+            'hierarchical_tags': len(hierarchy['hierarchical_tags']),
+            'root_tags': len(hierarchy['root_tags']),
+            'max_depth': hierarchy['max_depth'],
+        }
+        yield 'tags', self.tag_rows()
+        yield 'hierarchy_inconsistencies', iter(hierarchy['inconsistencies'])
+        yield 'similar_tags', ({'tag1': tag1, 'tag2': tag2, 'similarity': similarity}
+                               for tag1, tag2, similarity in self.similar_tags)
+        if self.suggest_merges:
+            yield 'merge_suggestions', iter(self.merge_suggestions)
+        if self.cooccurrence:
+            results = self.cooccurrence_results
+            yield 'associations', ({'tag1': tag1, 'tag2': tag2, 'together': together,
+                                    'jaccard': jaccard, 'pmi': pmi}
+                                   for tag1, tag2, together, jaccard, pmi in results['associations'])
+            yield 'parent_candidates', ({'tag': tag, 'parent': parent, 'together': together,
+                                         'confidence': confidence}
+                                        for tag, parent, together, confidence in results['parents'])
+            yield 'clusters', iter(results['clusters'])
+        yield 'orphan_tags', iter(stats['orphan_tags'])
+
+    def write_json(self, out: TextIO):
+        """Write the JSON report, one list element at a time."""
+        out.write("{")
+        for i, (key, value) in enumerate(self.json_sections()):
+            out.write(",\n  " if i else "\n  ")
+            out.write(json.dumps(key) + ": ")
+            if isinstance(value, Iterator):
+                out.write("[")
+                empty = True
+                for element in value:
+                    out.write("\n    " if empty else ",\n    ")
+                    out.write(json.dumps(element, ensure_ascii=False))
+                    empty = False
+                out.write("]" if empty else "\n  ]")
+            else:
+                out.write(json.dumps(value, ensure_ascii=False))
+        out.write("\n}\n")
@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""
+vault_index.py
+Shared vault scanner with a persistent parsed-note index
+
+Used by tag-analyzer.py, export-notes.py and backup-vault.py so the vault is
+walked once with os.scandir and notes are only re-read and re-parsed when
+their size or mtime changed since the previous run.
+
+Usage:
+    from vault_index import VaultIndex
+
+    index = VaultIndex('/path/to/vault').refresh()
+    for entry in index.notes():
+        print(entry.path, entry.tags, entry.links)
+
+The index is a SQLite database stored outside the vault (so it never ends up
+in backups or exports), by default under ~/.cache/obsidian-vault-index/.
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from note_frontmatter import frontmatter_tags, parse_frontmatter
+from note_transforms import headings, inline_tags, references
+from read_ahead import DEFAULT_READ_AHEAD, read_ahead
+
+INDEX_VERSION = 5
+
+# Below this many changed notes a process pool costs more than it saves
+PARALLEL_PARSE_MIN_NOTES = 200
+
+# Files stat()ed per read-ahead task during the walk
+STAT_BATCH_SIZE = 64
+
+# ISO date or datetime, as stored for YAML dates by json_default
+ISO_DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}(?:[T ][\d:.+\-Z]*)?$')
+
+
+
+def default_index_path(vault_path: Path) -> Path:
+    """Return the cache location used for a vault when no index path is given."""
+    cache_root = os.environ.get('XDG_CACHE_HOME') or os.path.join(Path.home(), '.cache')
+    digest = hashlib.sha1(str(vault_path).encode('utf-8')).hexdigest()[:16]
+    return Path(cache_root) / 'obsidian-vault-index' / f"{vault_path.name}-{digest}.sqlite3"
+
+
+def extract_tags(content: str, frontmatter=None) -> Set[str]:
+    """Extract frontmatter and inline tags from note content.
+
+    Pass already parsed frontmatter to avoid parsing the YAML again.
+    """
+    if frontmatter is None:
+        frontmatter = parse_frontmatter(content)
+
+    tags = frontmatter_tags(frontmatter)
+
+    # Extract inline tags (#tag), skipping code blocks
+    tags.update(inline_tags(content))
+
+    return tags
+
+
+def extract_links(content: str) -> List[str]:
+    """Extract [[wiki link]] and ![[embed]] targets in order of appearance, skipping code blocks."""
+    return [target for target, _, _ in references(content)]
+
+
+def read_note_file(full_path: str) -> Optional[str]:
+    """Read a note's text, reporting (not raising) read errors."""
+    try:
+        with open(full_path, encoding='utf-8') as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"⚠️  Error reading {full_path}: {e}")
+        return None
+
+
+def stat_dir_entry(dir_entry: os.DirEntry) -> Optional[os.stat_result]:
+    try:
+        return dir_entry.stat()
+    except OSError as e:
+        print(f"⚠️  Error reading {dir_entry.path}: {e}")
+        return None
+
+
+ParsedNote = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+
+def parse_note_content(content: Optional[str]) -> ParsedNote:
+    """Return a note's frontmatter, tags, link references and headings as JSON text (all None if unreadable)."""
+    if content is None:
+        return None, None, None, None
+
+    frontmatter = parse_frontmatter(content)
+    return (
+        json.dumps(frontmatter, default=json_default, ensure_ascii=False),
+        json.dumps(sorted(extract_tags(content, frontmatter)), ensure_ascii=False),
+        json.dumps(references(content), ensure_ascii=False),
+        json.dumps(headings(content), ensure_ascii=False),
+    )
+
+
+def _parse_note_chunk(full_paths: List[str],
+                      max_in_flight: int = 1) -> List[ParsedNote]:
+    """Parse a chunk of notes, preserving order; reads run up to max_in_flight ahead of parsing."""
+    return [parse_note_content(content)
+            for _, content in read_ahead(full_paths, read_note_file, max_in_flight)]
+
+
+def json_default(value):
+    """Serialize YAML scalars that JSON does not know about."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def note_terms(entry: 'IndexEntry') -> Set[Tuple[str, str]]:
+    """(kind, value) lookup terms of a note: frontmatter tags, type and folders."""
+    terms = set()
+    frontmatter = entry.frontmatter
+
+    if isinstance(frontmatter, dict):
+        fm_tags = frontmatter.get('tags')
+        if isinstance(fm_tags, str):
+            fm_tags = re.split(r'[,\s]+', fm_tags)
+        if isinstance(fm_tags, list):
+            terms.update(('tag', tag.strip('#')) for tag in fm_tags if isinstance(tag, str) and tag.strip('#'))
+
+        note_type = frontmatter.get('type')
+        if isinstance(note_type, (str, int, float)) and not isinstance(note_type, bool):
+            terms.add(('type', str(note_type)))
+
+    parts = entry.path.replace(os.sep, '/').split('/')[:-1]
+    for i in range(1, len(parts) + 1):
+        terms.add(('folder', '/'.join(parts[:i])))
+
+    return terms
+
+
+def note_dates(entry: 'IndexEntry') -> Set[Tuple[str, str]]:
+    """(field, ISO value) pairs for date-valued frontmatter fields."""
+    frontmatter = entry.frontmatter
+    if not isinstance(frontmatter, dict):
+        return set()
+
+    return {
+        (str(field), value) for field, value in frontmatter.items()
+        if isinstance(value, str) and ISO_DATE_PATTERN.match(value)
+    }
+
+
+class IndexEntry:
+    """A file in the vault with its stat data and, for notes, parsed content."""
+
+    __slots__ = ('path', 'size', 'mtime_ns', 'ctime', 'inode', '_frontmatter', '_tags', '_links',
+                 '_headings')
+
+    def __init__(self, path: str, size: int, mtime_ns: int, ctime: float, inode: int = 0,
+                 frontmatter: Optional[str] = None, tags: Optional[str] = None,
+                 links: Optional[str] = None, headings: Optional[str] = None):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.ctime = ctime
+        # Lets backups recognise renamed files (see source_snapshot.py)
+        self.inode = inode
+        # Parsed fields are kept as JSON text and decoded on first access
+        self._frontmatter = frontmatter
+        self._tags = tags
+        self._links = links
+        self._headings = headings
+
+    @property
+    def is_note(self) -> bool:
+        return self.path.endswith('.md')
+
+    @property
+    def mtime(self) -> float:
+        return self.mtime_ns / 1e9
+
+    @property
+    def frontmatter(self):
+        if isinstance(self._frontmatter, str):
+            self._frontmatter = json.loads(self._frontmatter)
+        return self._frontmatter
+
+    @property
+    def tags(self) -> List[str]:
+        if self._tags is None:
+            return []
+        if isinstance(self._tags, str):
+            # The same tags recur across many notes: keep one string per tag
+            self._tags = [sys.intern(tag) for tag in json.loads(self._tags)]
+        return self._tags
+
+    @property
+    def references(self) -> List[List]:
+        """[target, heading or None, is embed] for every wiki link and embed."""
+        if self._links is None:
+            return []
+        if isinstance(self._links, str):
+            self._links = json.loads(self._links)
+        return self._links
+
+    @property
+    def links(self) -> List[str]:
+        return [target for target, _, _ in self.references]
+
+    @property
+    def headings(self) -> List[str]:
+        if self._headings is None:
+            return []
+        if isinstance(self._headings, str):
+            self._headings = json.loads(self._headings)
+        return self._headings
+
+
+class VaultIndex:
+    def __init__(self, vault_path: str, index_path: Optional[str] = None, workers: int = 1,
+                 read_ahead: int = DEFAULT_READ_AHEAD):
+        self.vault_path = Path(vault_path).resolve()
+        self.index_path = Path(index_path) if index_path else default_index_path(self.vault_path)
+        self.workers = max(1, workers)
+        self.read_ahead = read_ahead
+        self.entries: Dict[str, IndexEntry] = {}
+        self.refreshed = False
+        self._query_conn: Optional[sqlite3.Connection] = None
+
+    def connect(self) -> sqlite3.Connection:
+        """Open the index database, recreating it if the schema is outdated."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.index_path))
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or int(row[0]) != INDEX_VERSION:
+            for table in ('files', 'terms', 'dates'):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(INDEX_VERSION),))
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                ctime REAL NOT NULL,
+                inode INTEGER NOT NULL,
+                frontmatter TEXT,
+                tags TEXT,
+                links TEXT,
+                headings TEXT
+            )
+        """)
+        # Inverted indexes used by note filters (see note_query.py)
+        conn.execute("CREATE TABLE IF NOT EXISTS terms (kind TEXT NOT NULL, value TEXT NOT NULL, path TEXT NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS terms_lookup ON terms (kind, value)")
+        conn.execute("CREATE INDEX IF NOT EXISTS terms_path ON terms (path)")
+        conn.execute("CREATE TABLE IF NOT EXISTS dates (field TEXT NOT NULL, value TEXT NOT NULL, path TEXT NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS dates_lookup ON dates (field, value)")
+        conn.execute("CREATE INDEX IF NOT EXISTS dates_path ON dates (path)")
+        conn.execute("CREATE INDEX IF NOT EXISTS files_mtime ON files (mtime_ns)")
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('vault_path', ?)", (str(self.vault_path),))
+        return conn
+
+    def walk(self, skip_dir: Optional[Callable[[str], bool]] = None,
+             skipped: Optional[Set[str]] = None,
+             top: Optional[str] = None) -> Iterator[Tuple[str, os.DirEntry]]:
+        """Walk the vault once with os.scandir, yielding (relative path, entry) for files.
+
+        Directories for which skip_dir(relative path) is true are not entered;
+        their relative paths are added to skipped. top limits the walk to one
+        subdirectory (relative to the vault).
+        """
+        root = str(self.vault_path)
+        stack = [os.path.join(root, top) if top else root]
+
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if skip_dir is not None:
+                                relative_dir = os.path.relpath(entry.path, root)
+                                if skip_dir(relative_dir):
+                                    if skipped is not None:
+                                        skipped.add(relative_dir)
+                                    continue
+                            stack.append(entry.path)
+                        elif entry.is_file():
+                            yield os.path.relpath(entry.path, root), entry
+            except OSError as e:
+                print(f"⚠️  Error scanning {directory}: {e}")
+
+    def refresh(self, skip_dir: Optional[Callable[[str], bool]] = None) -> 'VaultIndex':
+        """Bring the index up to date, re-parsing only new or modified notes.
+
+        Subtrees rejected by skip_dir are not walked; their cached entries are
+        kept as they are so other consumers of the index still see them.
+        """
+        conn = self.connect()
+        try:
+            previous = {
+                row[0]: IndexEntry(*row)
+                for row in conn.execute(
+                    "SELECT path, size, mtime_ns, ctime, inode, frontmatter, tags, links, headings FROM files")
+            }
+
+            entries: Dict[str, IndexEntry] = {}
+            changed: List[IndexEntry] = []
+            to_parse: List[Tuple[IndexEntry, str]] = []
+
+            skipped: Set[str] = set()
+            # stat() is cheap locally, so hand it to the threads in batches
+            walked = read_ahead(self.walk(skip_dir, skipped), lambda item: stat_dir_entry(item[1]),
+                                self.read_ahead, batch_size=STAT_BATCH_SIZE)
+            for (relative_path, dir_entry), stat in walked:
+                if stat is None:
+                    continue
+
+                cached = previous.get(relative_path)
+                if (cached is not None and cached.size == stat.st_size
+                        and cached.mtime_ns == stat.st_mtime_ns and cached.inode == stat.st_ino):
+                    # Keyed by the entry's own path, so each path is stored once
+                    entries[cached.path] = cached
+                    continue
+
+                entry = IndexEntry(relative_path, stat.st_size, stat.st_mtime_ns, stat.st_ctime, stat.st_ino)
+                if entry.is_note:
+                    to_parse.append((entry, dir_entry.path))
+                entries[relative_path] = entry
+                changed.append(entry)
+
+            self.parse_entries(to_parse)
+            for path, entry in previous.items():
+                if path not in entries and self.in_skipped_dir(path, skipped):
+                    entries[path] = entry
+
+            removed = [path for path in previous if path not in entries]
+            self.store(conn, changed, removed)
+        finally:
+            conn.close()
+
+        self.entries = dict(sorted(entries.items()))
+        self.refreshed = True
+
+        print(f"🗂️  Vault index: {len(self.entries)} files "
+              f"({len(changed)} updated, {len(removed)} removed)")
+        return self
+
+    def update_paths(self, paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Re-index only the given relative paths, as reported by a file watcher.
+
+        A path may be a file or a directory (whose files are walked); paths
+        that no longer exist are dropped along with anything below them.
+        Returns the (updated, removed) relative paths.
+        """
+        self.ensure_fresh()
+        entries = self.entries
+        changed: Dict[str, IndexEntry] = {}
+        to_parse: List[Tuple[IndexEntry, str]] = []
+        removed: Set[str] = set()
+
+        def update(relative_path: str, stat: os.stat_result, full_path: str):
+            cached = entries.get(relative_path)
+            if (cached is not None and cached.size == stat.st_size
+                    and cached.mtime_ns == stat.st_mtime_ns and cached.inode == stat.st_ino):
+                return
+            entry = IndexEntry(relative_path, stat.st_size, stat.st_mtime_ns, stat.st_ctime, stat.st_ino)
+            if entry.is_note:
+                to_parse.append((entry, full_path))
+            changed[relative_path] = entry
+
+        for relative_path in set(paths):
+            full_path = os.path.join(str(self.vault_path), relative_path)
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                stat = None
+
+            if stat is not None and os.path.isdir(full_path):
+                present = set()
+                for file_path, dir_entry in self.walk(top=relative_path):
+                    file_stat = stat_dir_entry(dir_entry)
+                    if file_stat is not None:
+                        present.add(file_path)
+                        update(file_path, file_stat, dir_entry.path)
+                prefix = relative_path + os.sep
+                removed.update(p for p in entries if p.startswith(prefix) and p not in present)
+            elif stat is not None:
+                update(relative_path, stat, full_path)
+            else:
+                prefix = relative_path + os.sep
+                removed.update(p for p in entries if p == relative_path or p.startswith(prefix))
+
+        self.parse_entries(to_parse)
+        conn = self.connect()
+        try:
+            self.store(conn, list(changed.values()), sorted(removed))
+        finally:
+            conn.close()
+
+        for path in removed:
+            entries.pop(path, None)
+        entries.update(changed)
+        self.entries = dict(sorted(entries.items()))
+        return sorted(changed), sorted(removed)
+
+    def store(self, conn: sqlite3.Connection, changed: List[IndexEntry], removed: List[str]):
+        """Write changed entries and drop removed paths, in one transaction."""
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(e.path, e.size, e.mtime_ns, e.ctime, e.inode, e._frontmatter, e._tags, e._links, e._headings)
+                 for e in changed]
+            )
+            conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in removed])
+
+            stale = [(p,) for p in removed] + [(e.path,) for e in changed]
+            conn.executemany("DELETE FROM terms WHERE path = ?", stale)
+            conn.executemany("DELETE FROM dates WHERE path = ?", stale)
+            notes = [e for e in changed if e.is_note]
+            conn.executemany(
+                "INSERT INTO terms VALUES (?, ?, ?)",
+                [(kind, value, e.path) for e in notes for kind, value in note_terms(e)]
+            )
+            conn.executemany(
+                "INSERT INTO dates VALUES (?, ?, ?)",
+                [(field, value, e.path) for e in notes for field, value in note_dates(e)]
+            )
+
+    def parse_entries(self, pending: List[Tuple[IndexEntry, str]]):
+        """Parse notes into their entries, across a process pool when workers > 1."""
+        full_paths = [full_path for _, full_path in pending]
+
+        if self.workers > 1 and len(pending) >= PARALLEL_PARSE_MIN_NOTES:
+            # Several chunks per worker keeps the pool busy when note sizes vary
+            chunk_size = max(1, -(-len(full_paths) // (self.workers * 4)))
+            chunks = [full_paths[i:i + chunk_size] for i in range(0, len(full_paths), chunk_size)]
+            parse_chunk = partial(_parse_note_chunk, max_in_flight=self.read_ahead)
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = [parsed for chunk in pool.map(parse_chunk, chunks) for parsed in chunk]
+        else:
+            results = _parse_note_chunk(full_paths, self.read_ahead)
+
+        for (entry, _), (frontmatter, tags, links, note_headings) in zip(pending, results):
+            entry._frontmatter = frontmatter
+            entry._tags = tags
+            entry._links = links
+            entry._headings = note_headings
+
+    @staticmethod
+    def in_skipped_dir(path: str, skipped: Set[str]) -> bool:
+        if not skipped:
+            return False
+        parent = os.path.dirname(path)
+        while parent:
+            if parent in skipped:
+                return True
+            parent = os.path.dirname(parent)
+        return False
+
+    def ensure_fresh(self, skip_dir: Optional[Callable[[str], bool]] = None) -> 'VaultIndex':
+        """Refresh the index once per process."""
+        if not self.refreshed:
+            self.refresh(skip_dir)
+        return self
+
+    def files(self) -> List[IndexEntry]:
+        """All indexed files, sorted by relative path."""
+        return list(self.ensure_fresh().entries.values())
+
+    def notes(self) -> List[IndexEntry]:
+        """All indexed markdown notes, sorted by relative path."""
+        return [entry for entry in self.ensure_fresh().entries.values() if entry.is_note]
+
+    def get(self, relative_path: str) -> Optional[IndexEntry]:
+        return self.ensure_fresh().entries.get(relative_path)
+
+    def full_path(self, entry: IndexEntry) -> Path:
+        return self.vault_path / entry.path
+
+    def query_paths(self, sql: str, params: Tuple = ()) -> Set[str]:
+        """Run a path-returning query against the refreshed index database."""
+        self.ensure_fresh()
+        if self._query_conn is None:
+            self._query_conn = sqlite3.connect(str(self.index_path))
+        return {row[0] for row in self._query_conn.execute(sql, params)}
+
+    def term_paths(self, kind: str, value: str) -> Set[str]:
+        """Notes with a given tag, type or folder term."""
+        return self.query_paths("SELECT path FROM terms WHERE kind = ? AND value = ?", (kind, value))
+
+    def date_paths(self, field: str, low: Optional[str] = None, high: Optional[str] = None,
+                   low_inclusive: bool = True, high_inclusive: bool = False) -> Set[str]:
+        """Notes whose frontmatter date field lies in a range of ISO strings."""
+        sql = "SELECT path FROM dates WHERE field = ?"
+        params: List = [field]
+        if low is not None:
+            sql += " AND value >= ?" if low_inclusive else " AND value > ?"
+            params.append(low)
+        if high is not None:
+            sql += " AND value <= ?" if high_inclusive else " AND value < ?"
+            params.append(high)
+        return self.query_paths(sql, tuple(params))
+
+    def date_fields(self) -> Set[str]:
+        """Frontmatter fields holding a date in at least one note."""
+        return self.query_paths("SELECT DISTINCT field FROM dates")
+
+    def modified_paths(self, low_ns: Optional[int] = None, high_ns: Optional[int] = None) -> Set[str]:
+        """Notes with low_ns <= mtime_ns < high_ns."""
+        sql = "SELECT path FROM files WHERE path GLOB '*.md'"
+        params: List = []
+        if low_ns is not None:
+            sql += " AND mtime_ns >= ?"
+            params.append(low_ns)
+        if high_ns is not None:
+            sql += " AND mtime_ns < ?"
+            params.append(high_ns)
+        return self.query_paths(sql, tuple(params))
+
+    def note_paths(self) -> Set[str]:
+        return {entry.path for entry in self.notes()}
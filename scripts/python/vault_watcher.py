@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+vault_watcher.py
+File change notifications for a vault, for backup-vault.py --watch
+
+On Linux the kernel's inotify API is used directly (through ctypes, no extra
+packages): every directory of the vault gets a watch, and changes are
+reported as paths relative to the vault without rescanning it. Elsewhere,
+or if inotify is unavailable (e.g. the watch limit is reached), a polling
+watcher rescans the vault with os.scandir and compares sizes and mtimes.
+
+Usage:
+    from vault_watcher import open_watcher
+
+    watcher = open_watcher(vault_path, walk, skip_dir)
+    while True:
+        changed = watcher.wait(timeout=2.0)   # set of relative paths
+        if watcher.overflowed:
+            ...  # events were lost: rescan everything
+
+Changed directories (created, moved in, deleted) are reported as the
+directory path; consumers re-read everything below it.
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Set, Tuple
+
+# inotify event bits (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct('iIII')
+READ_SIZE = 64 * 1024
+
+# Seconds between rescans for the polling watcher
+DEFAULT_POLL_INTERVAL = 10.0
+
+# (relative path, DirEntry) for every file of the vault, e.g. VaultIndex.walk
+Walk = Callable[[], Iterator[Tuple[str, os.DirEntry]]]
+
+
+class InotifyWatcher:
+    def __init__(self, vault_path: Path, skip_dir: Optional[Callable[[str], bool]] = None):
+        self.vault_path = Path(vault_path)
+        self.skip_dir = skip_dir
+        self.overflowed = False
+        self.started = False
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        # watch descriptor -> directory relative to the vault ('' for the root)
+        self.watches: Dict[int, str] = {}
+        self.add_tree('')
+        self.started = True
+
+    def add_watch(self, relative_dir: str):
+        path = os.path.join(str(self.vault_path), relative_dir)
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                if not self.started:
+                    raise OSError(error, 'inotify watch limit reached '
+                                         '(raise fs.inotify.max_user_watches)')
+                # New directories can no longer be watched: rescan instead
+                self.overflowed = True
+            return  # Otherwise the directory vanished before it could be watched
+        self.watches[wd] = relative_dir
+
+    def add_tree(self, relative_dir: str):
+        """Watch a directory and every directory below it, except skipped ones."""
+        stack = [relative_dir]
+        while stack:
+            directory = stack.pop()
+            self.add_watch(directory)
+            try:
+                with os.scandir(os.path.join(str(self.vault_path), directory)) as it:
+                    for entry in it:
+                        if not entry.is_dir(follow_symlinks=False):
+                            continue
+                        child = os.path.join(directory, entry.name) if directory else entry.name
+                        if self.skip_dir is None or not self.skip_dir(child):
+                            stack.append(child)
+            except OSError:
+                continue
+
+    def remove_tree(self, relative_dir: str):
+        """Stop watching a directory moved away (it is re-added under its new name if still in the vault)."""
+        prefix = relative_dir + os.sep
+        for wd, directory in list(self.watches.items()):
+            if directory == relative_dir or directory.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+
+    def wait(self, timeout: float) -> Set[str]:
+        """Relative paths changed within timeout seconds (empty if nothing happened)."""
+        changed: Set[str] = set()
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not ready:
+            return changed
+
+        # Drain everything queued so a burst is reported in one call
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            self.parse_events(data, changed)
+        return changed
+
+    def parse_events(self, data: bytes, changed: Set[str]):
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if directory:
+                    changed.add(directory)
+                continue
+
+            path = os.path.join(directory, name) if directory else name
+            if mask & IN_ISDIR:
+                if self.skip_dir is not None and self.skip_dir(path):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add_tree(path)
+                elif mask & IN_MOVED_FROM:
+                    self.remove_tree(path)
+            changed.add(path)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback watcher: rescans the vault every interval seconds."""
+
+    def __init__(self, walk: Walk, interval: float = DEFAULT_POLL_INTERVAL):
+        self.walk = walk
+        self.interval = interval
+        self.overflowed = False
+        self.state = self.scan()
+        self.next_scan = time.monotonic() + interval
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        for relative_path, entry in self.walk():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            state[relative_path] = (stat.st_size, stat.st_mtime_ns)
+        return state
+
+    def wait(self, timeout: float) -> Set[str]:
+        delay = self.next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(max(timeout, 0))
+            return set()
+        time.sleep(max(delay, 0))
+        self.next_scan = time.monotonic() + self.interval
+
+        state = self.scan()
+        previous = self.state
+        self.state = state
+        changed = {path for path, info in state.items() if previous.get(path) != info}
+        changed.update(path for path in previous if path not in state)
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_watcher(vault_path: Path, walk: Walk, skip_dir: Optional[Callable[[str], bool]] = None,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, polling: bool = False):
+    """inotify watcher on Linux, polling watcher elsewhere (or if polling is requested)."""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(vault_path, skip_dir)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(walk, poll_interval)